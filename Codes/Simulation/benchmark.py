@@ -0,0 +1,276 @@
+"""
+Benchmark suite for the simulation's hot paths
+Report ops/sec for each benchmark (and wall time per mission for the
+full headless searches), and compare against a stored baseline
+Example:
+    python benchmark.py --save benchmark_baseline.json
+    python benchmark.py --compare benchmark_baseline.json
+"""
+
+import argparse
+import json
+import sys
+import time
+import timeit
+from myconstants import BARCODE, HOME, UP
+from tuplemath import add_tuple, sub_tuple, mult_tuple, rev
+from mybackend import Backend
+from myscenario import Scenario
+from mysimulator import Simulator
+
+
+# Seeds of the missions used by the mission benchmark
+MISSION_SEEDS = tuple(range(8))
+
+# Registry of (name, setup function). A setup function does all the preparing
+# and returns the zero-argument callable to be timed
+BENCHMARKS = []
+
+
+def benchmark(name):
+    """
+    Decorator to register a benchmark setup function under `name`
+    """
+    def register(setup):
+        BENCHMARKS.append((name, setup))
+        return setup
+    return register
+
+
+def make_backend(seed=0):
+    """
+    Make a seeded backend with the robot sitting in a hallway
+    """
+    backend = Backend(BARCODE[0], scenario=Scenario.generate(seed, HOME[0], BARCODE[0]))
+    backend.robot.set_robot_start(HOME[0])
+    for _ in range(13):
+        backend.robot.step_forward()
+    backend.update_digital_board()
+    return backend
+
+
+@benchmark("tuplemath.add_tuple")
+def bench_add_tuple():
+    return lambda: add_tuple((12, 7), UP)
+
+
+@benchmark("tuplemath.sub_tuple")
+def bench_sub_tuple():
+    return lambda: sub_tuple((12, 10), (12, 7))
+
+
+@benchmark("tuplemath.mult_tuple")
+def bench_mult_tuple():
+    return lambda: mult_tuple(UP, 3)
+
+
+@benchmark("tuplemath.rev")
+def bench_rev():
+    return lambda: rev(UP)
+
+
+@benchmark("Robot.rectangle_coor")
+def bench_rectangle_coor():
+    robot = make_backend().robot
+    return lambda: robot.rectangle_coor
+
+
+@benchmark("Robot.bottomleft")
+def bench_bottomleft():
+    robot = make_backend().robot
+    return lambda: robot.bottomleft
+
+
+@benchmark("Robot.ultrasonic")
+def bench_ultrasonic():
+    robot = make_backend().robot
+    return lambda: robot.ultrasonic
+
+
+@benchmark("Robot.colorsensor")
+def bench_colorsensor():
+    robot = make_backend().robot
+    return lambda: robot.colorsensor
+
+
+@benchmark("Robot.storage")
+def bench_storage():
+    robot = make_backend().robot
+    return lambda: robot.storage
+
+
+@benchmark("Robot.ultrasonic_detection")
+def bench_ultrasonic_detection():
+    backend = make_backend()
+    return lambda: backend.robot.ultrasonic_detection(backend.board)
+
+
+@benchmark("Backend.update_digital_board")
+def bench_update_digital_board():
+    backend = make_backend()
+    robot = backend.robot
+
+    def step_and_update():
+        robot.step_forward()
+        backend.update_digital_board()
+        robot.step_backward()
+        backend.update_digital_board()
+    return step_and_update
+
+
+@benchmark("Backend.rebuild_digital_board")
+def bench_rebuild_digital_board():
+    backend = make_backend()
+    return backend.rebuild_digital_board
+
+
+@benchmark("Backend.box_at")
+def bench_box_at():
+    backend = make_backend()
+    box = backend.box_list[len(backend.box_list) // 2]
+    point = (box.bottomleft[0] + 2, box.bottomleft[1] + 2)
+    return lambda: backend.box_at(point)
+
+
+def make_artist(blit=True):
+    """
+    Make an InvisibleArtist drawing on the non-interactive Agg backend
+    Return None if matplotlib is not available
+    """
+    try:
+        import matplotlib
+    except ImportError:
+        return None
+    matplotlib.use("Agg")
+    from myfrontend import InvisibleArtist
+    return InvisibleArtist(BARCODE[0], blit)
+
+
+@benchmark("InvisibleArtist.render_surface")
+def bench_render_surface():
+    # A whole blitted frame: render_surface draws the robot itself
+    artist = make_artist()
+    if artist is None:
+        return None
+    robot = make_backend().robot
+    return lambda: artist.render_surface(robot)
+
+
+@benchmark("InvisibleArtist.render_surface+draw")
+def bench_render_surface_draw():
+    # A whole frame without blitting: new patches and a full redraw
+    artist = make_artist(blit=False)
+    if artist is None:
+        return None
+    robot = make_backend().robot
+
+    def render_and_draw():
+        artist.render_surface(robot)
+        artist.fig.canvas.draw()
+    return render_and_draw
+
+
+@benchmark("InvisibleArtist.render_background")
+def bench_render_background():
+    artist = make_artist()
+    if artist is None:
+        return None
+    backend = make_backend()
+    return lambda: artist.render_background(backend.box_list, backend.rock_list)
+
+
+def time_callable(func, repeat):
+    """
+    Time a callable with timeit, return the best ops/sec over `repeat` runs
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat, number))
+    return number / best
+
+
+def time_missions(seeds, repeat):
+    """
+    Run a complete headless `search_entire_area` for each seed, `repeat` times
+    Return (missions/sec, mean wall time per mission in ms) of the best round
+    """
+    best = None
+    for _ in range(repeat):
+        total = 0.0
+        for seed in seeds:
+            scenario = Scenario.generate(seed, HOME[seed % 4], BARCODE[seed % 4])
+            game = Simulator.from_scenario(scenario, headless=True)
+            start = time.perf_counter()
+            game.search_entire_area()
+            total += time.perf_counter() - start
+        best = total if best is None else min(best, total)
+    return len(seeds) / best, 1000 * best / len(seeds)
+
+
+def run_benchmarks(selected=None, repeat=5):
+    """
+    Run all registered benchmarks (or the `selected` names only)
+    Return {name: {"ops_per_sec": float}}, missions also have "ms_per_mission"
+    """
+    results = {}
+    for name, setup in BENCHMARKS:
+        if selected and name not in selected:
+            continue
+        func = setup()
+        if func is None:
+            print(f"{name:<40}{'skipped':>16}")
+            continue
+        ops = time_callable(func, repeat)
+        results[name] = {"ops_per_sec": ops}
+        print(f"{name:<40}{ops:>16,.0f} ops/s")
+
+    name = "Simulator.search_entire_area"
+    if not selected or name in selected:
+        ops, ms_per_mission = time_missions(MISSION_SEEDS, repeat)
+        results[name] = {"ops_per_sec": ops, "ms_per_mission": ms_per_mission}
+        print(f"{name:<40}{ops:>16,.2f} ops/s{ms_per_mission:>12.1f} ms/mission")
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results against a baseline. A benchmark regresses if its ops/sec
+    drops more than `tolerance` (a fraction) below the baseline's
+    Return the list of regressed benchmark names
+    """
+    regressions = []
+    print(f"\n{'benchmark':<40}{'baseline':>14}{'current':>14}{'speedup':>10}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]["ops_per_sec"]
+        new = result["ops_per_sec"]
+        ratio = new / old
+        flag = ""
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<40}{old:>14,.1f}{new:>14,.1f}{ratio:>9.2f}x{flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", metavar="FILE", help="store results as a baseline")
+    parser.add_argument("--compare", metavar="FILE", help="compare against a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="allowed fractional slowdown before failing (default 0.1)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("names", nargs="*", help="only run these benchmarks")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.names, args.repeat)
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(results, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
@@ -0,0 +1,116 @@
+"""
+Export program for recorded ENED missions
+Render a mission log's frames offline with the Agg backend, in parallel
+over a process pool, into a PNG image sequence and/or an animated GIF
+Example:
+    python export.py mission.log --out frames --gif mission.gif --step 2
+"""
+
+import argparse
+import os
+from multiprocessing import Pool
+import matplotlib
+matplotlib.use("Agg")  # Offline rendering, before pyplot is ever imported
+import numpy as np
+from PIL import Image
+from myfrontend import InvisibleArtist
+from myrecorder import MissionReplay
+
+
+def frame_path(out_dir, frame):
+    """
+    Path of a frame's image in the image sequence
+    """
+    return os.path.join(out_dir, f"frame_{frame:06d}.png")
+
+
+def render_chunk(job):
+    """
+    Render the frames `start` to `end` of a log, every `step`-th one,
+    into PNG images. Runs in a worker process with its own artist
+    """
+    log, out_dir, start, end, step = job
+    replay = MissionReplay(log)
+    artist = InvisibleArtist(replay.target_barcode, blit=False, layout=replay.layout)
+    canvas = artist.fig.canvas
+    last_picked = None
+    paths = []
+    for frame, robot, picked in replay.frames(start, end):
+        if (frame - start) % step:
+            continue
+        if picked != last_picked:
+            artist.render_background(replay.box_list(picked), replay.rock_list())
+            last_picked = picked
+        artist.render_surface(robot)
+        canvas.draw()
+        path = frame_path(out_dir, frame)
+        Image.fromarray(np.asarray(canvas.buffer_rgba())).convert("RGB").save(path)
+        paths.append(path)
+    replay.close()
+    return paths
+
+
+def export_frames(log, out_dir, start=0, end=None, step=1, workers=None):
+    """
+    Split the frame range into chunks and render them over a process pool
+    Return the paths of the rendered images, in frame order
+    Raise ValueError if the range has no frame of the log
+    """
+    if step < 1:
+        raise ValueError(f"Frame step must be at least 1, not {step}")
+    replay = MissionReplay(log)
+    end = replay.num_frames if end is None else min(end, replay.num_frames)
+    replay.close()
+    if not 0 <= start <= end:
+        raise ValueError(f"No frames between {start} and {end} (the log has "
+                         f"frames 0 to {replay.num_frames})")
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Contiguous chunks (so each worker plays its frames in order), a few
+    # per worker so that uneven chunks still balance out
+    frames = range(start, end + 1, step)
+    num_chunks = min(len(frames), 4 * (workers or os.cpu_count() or 1))
+    chunk_size = -(-len(frames) // num_chunks)
+    jobs = []
+    for i in range(0, len(frames), chunk_size):
+        chunk = frames[i:i + chunk_size]
+        jobs.append((log, out_dir, chunk[0], chunk[-1], step))
+
+    with Pool(workers) as pool:
+        chunk_paths = pool.map(render_chunk, jobs)
+    return [path for paths in chunk_paths for path in paths]
+
+
+def stitch_gif(paths, gif_path, fps):
+    """
+    Stitch an image sequence into an animated GIF
+    """
+    images = (Image.open(path) for path in paths)
+    first = next(images)
+    first.save(gif_path, save_all=True, append_images=images,
+               duration=int(1000 / fps), loop=0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="mission log to export")
+    parser.add_argument("--out", default="frames", help="image sequence directory")
+    parser.add_argument("--gif", help="also stitch the frames into this GIF")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--end", type=int, default=None)
+    parser.add_argument("--step", type=int, default=1, help="export every n-th frame")
+    parser.add_argument("--fps", type=float, default=30, help="GIF frame rate")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes (default: all CPUs)")
+    args = parser.parse_args()
+
+    try:
+        paths = export_frames(args.log, args.out, args.start, args.end,
+                              args.step, args.workers)
+    except ValueError as error:
+        parser.error(str(error))
+    print(f"Rendered {len(paths)} frames into {args.out}")
+    if args.gif:
+        stitch_gif(paths, args.gif, args.fps)
+        print(f"Wrote {args.gif}")
@@ -6,12 +6,16 @@ while also avoid obstacles and update IPS info
 
 from myconstants import BARCODE, HOME
 from mysimulator import Simulator
+from mytrace import configure, DEBUG
 
 if __name__ == "__main__":
     target_barode = [1, 1, 1, 1]  # Invalid barcode
     start_pos = HOME[0]
+    # Print the whole mission's trace as it goes
+    configure(DEBUG, echo=True)
 
-    game = Simulator(start_pos, target_barode)
+    # Skip frames down to 30 FPS so the whole search only takes seconds
+    game = Simulator(start_pos, target_barode, fps=30)
 
     game.frontend.render_background(game.backend.box_list, game.backend.rock_list)
     game.frontend.render_surface(game.backend.robot)
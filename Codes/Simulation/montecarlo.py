@@ -0,0 +1,205 @@
+"""
+Monte Carlo program to evaluate the ENED simulation
+Run many seeded headless missions over a process pool, each with a random
+home start and a random target barcode, and report how well the search does
+Example: python montecarlo.py --episodes 1000 --workers 4
+An episode that runs past --timeout wall-clock seconds is stopped and
+counted as a "timeout" failure, so one hung mission can't hang the whole run
+Scenarios can also come from a corpus file made by myscenario:
+    python montecarlo.py --make-corpus corpus.bin --episodes 1000
+    python montecarlo.py --corpus corpus.bin
+"""
+
+import argparse
+import functools
+import itertools
+import signal
+from multiprocessing import Pool
+from myscenario import Scenario, generate_corpus, iter_corpus
+from mysimulator import Simulator
+from mytrace import TRACER, DEBUG, INFO, configure
+
+
+# Per-episode metrics that get aggregated
+METRICS = ("steps", "turns", "boxes_scanned")
+
+# Wall-clock seconds an episode may run for
+EPISODE_TIMEOUT = 60
+
+
+class EpisodeTimeout(BaseException):
+    """
+    Raised in an episode that ran out of wall-clock time. Not an Exception,
+    so that nothing in the mission can swallow it
+    """
+
+
+def raise_timeout(signum, frame):
+    """
+    SIGALRM handler of the episode timeout
+    """
+    raise EpisodeTimeout
+
+
+class RunningStats:
+    """
+    Online mean/variance/min/max (Welford's algorithm), so that memory stays
+    the same no matter how many values are added
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        """
+        Add one value to the statistics
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def std(self):
+        """
+        Sample standard deviation
+        """
+        return (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else 0.0
+
+
+def run_episode(scenario, timeout=EPISODE_TIMEOUT):
+    """
+    Run one headless mission of a scenario, or of the scenario generated from
+    a seed if an int is given
+    The mission is stopped after `timeout` wall-clock seconds (None = never),
+    with a SIGALRM timer on the platforms that have one
+    Return a dict of the episode's metrics and outcome
+    """
+    if isinstance(scenario, int):
+        scenario = Scenario.generate(scenario)
+    result = {"seed": scenario.seed}
+    game = None
+    TRACER.clear()
+    guarded = bool(timeout) and hasattr(signal, "setitimer")
+    if guarded:
+        signal.signal(signal.SIGALRM, raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        try:
+            game = Simulator.from_scenario(scenario, headless=True)
+            target_exists = bool(game.backend.boxes_with_barcode(scenario.target_barcode))
+            game.search_entire_area()
+            if not game.robot.storage_empty:
+                result["outcome"] = "found"
+            elif target_exists:
+                result["outcome"] = "missed"
+            else:
+                result["outcome"] = "no_target"
+        finally:
+            # Disarm the timer before any recovery work, so dumping the
+            # trace can't get cut short by it
+            if guarded:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+    except (Exception, EpisodeTimeout) as error:  # Crashed or hung missions are failure modes too
+        if isinstance(error, EpisodeTimeout):
+            result["outcome"] = "timeout"
+        else:
+            result["outcome"] = f"error:{type(error).__name__}"
+        # Keep the trace that led to the failure
+        if TRACER.enabled:
+            result["trace"] = f"trace_{scenario.seed}.log"
+            TRACER.dump(result["trace"])
+    finally:
+        if guarded:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    result["steps"] = game.num_steps if game else 0
+    result["turns"] = game.num_turns if game else 0
+    result["boxes_scanned"] = game.num_boxes_scanned if game else 0
+    return result
+
+
+def run_many(episodes, workers=None, chunksize=16, trace_failures=False,
+             timeout=EPISODE_TIMEOUT):
+    """
+    Fan out the `episodes` (seeds or scenarios) over a process pool and
+    aggregate their results as they arrive. Each episode gets `timeout`
+    wall-clock seconds (see run_episode)
+    If `trace_failures`, the episodes are traced, and the trace of each
+    crashed or timed out one is dumped into trace_<seed>.log
+    Return (number of episodes, outcome counts,
+    {metric: overall RunningStats}, {metric: RunningStats over found episodes only})
+    """
+    num_episodes = 0
+    outcomes = {}
+    overall = {metric: RunningStats() for metric in METRICS}
+    when_found = {metric: RunningStats() for metric in METRICS}
+    initargs = (DEBUG,) if trace_failures else (INFO, ())
+    with Pool(workers, initializer=configure, initargs=initargs) as pool:
+        episode = functools.partial(run_episode, timeout=timeout)
+        for result in pool.imap_unordered(episode, episodes, chunksize):
+            num_episodes += 1
+            outcome = result["outcome"]
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+            for metric in METRICS:
+                overall[metric].add(result[metric])
+                if outcome == "found":
+                    when_found[metric].add(result[metric])
+    return num_episodes, outcomes, overall, when_found
+
+
+def print_report(num_episodes, outcomes, overall, when_found):
+    """
+    Print the aggregated results
+    """
+    print(f"Episodes: {num_episodes}")
+    for outcome, count in sorted(outcomes.items()):
+        print(f"  {outcome:<20}{count:>10}{100 * count / num_episodes:>9.2f}%")
+    for title, stats in (("All episodes", overall), ("Found episodes", when_found)):
+        print(title)
+        print(f"  {'metric':<20}{'mean':>10}{'std':>10}{'min':>8}{'max':>8}")
+        for metric in METRICS:
+            stat = stats[metric]
+            if stat.count == 0:
+                continue
+            print(f"  {metric:<20}{stat.mean:>10.1f}{stat.std:>10.1f}"
+                  f"{stat.min:>8}{stat.max:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--episodes", type=int, default=None,
+                        help="number of episodes (default: 1000, or the whole corpus)")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first episode")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of processes (default: all CPUs)")
+    parser.add_argument("--chunksize", type=int, default=16)
+    parser.add_argument("--corpus", help="run the scenarios of this corpus file")
+    parser.add_argument("--make-corpus", metavar="FILE",
+                        help="only generate a corpus of --episodes seeded scenarios")
+    parser.add_argument("--timeout", type=float, default=EPISODE_TIMEOUT,
+                        help="wall-clock seconds per episode before it counts as a "
+                             f"timeout (default {EPISODE_TIMEOUT}, 0 = none)")
+    parser.add_argument("--trace-failures", action="store_true",
+                        help="dump the trace of each crashed or timed out episode into "
+                             "trace_<seed>.log")
+    args = parser.parse_args()
+
+    num_episodes = 1000 if args.episodes is None else args.episodes
+    if args.make_corpus:
+        generate_corpus(args.make_corpus, num_episodes, args.seed)
+        print(f"Wrote {num_episodes} scenarios to {args.make_corpus}")
+    else:
+        if args.corpus:
+            episodes = iter_corpus(args.corpus)
+            if args.episodes is not None:
+                episodes = itertools.islice(episodes, args.episodes)
+        else:
+            episodes = range(args.seed, args.seed + num_episodes)
+        print_report(*run_many(episodes, args.workers, args.chunksize,
+                               args.trace_failures, args.timeout))
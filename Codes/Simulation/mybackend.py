@@ -4,11 +4,14 @@ robot's movement logic, data scanning, ultrasonic detection, box generation, etc
 """
 
 import random
+import numpy as np
 from tuplemath import add_tuple, sub_tuple, mult_tuple, rev
 from myconstants import *
 from myrobot import Robot
-from mybox import Box
+from mybox import Box, BoxIndex
 from myrock import Rock, RockFactory
+from mylayout import STANDARD_LAYOUT
+from mytrace import TRACER, INFO, SCANNING
 
 
 # Digital respresentation
@@ -16,33 +19,114 @@ ROBOT = 15
 EDGE = 10
 ROCK = 11
 
+# Range of the ultrasonic when nothing is on the way
+NO_DETECTION = 1 << 20
+# Range field cells whose line has not been computed yet
+UNKNOWN_RANGE = -1
+
+
+def distance_field(mask, direction):
+    """
+    For each cell, count the steps along `direction` to the nearest True cell
+    of `mask` strictly ahead of it (NO_DETECTION if there is none)
+    `mask` can be any number of whole lines along `direction`
+    """
+    dx, dy = direction
+    lines = mask if dx else mask.T
+    # Flip so that ahead is always towards lower indexes along axis 0
+    if dx + dy > 0:
+        lines = lines[::-1]
+    index = np.arange(lines.shape[0], dtype=np.int32).reshape(-1, 1)
+    # Index of the nearest True cell at or before each cell, then strictly before
+    nearest = np.where(lines, index, np.int32(-NO_DETECTION))
+    np.maximum.accumulate(nearest, axis=0, out=nearest)
+    behind = np.empty_like(nearest)
+    behind[0] = -NO_DETECTION
+    behind[1:] = nearest[:-1]
+    field = index - behind
+    field[behind == -NO_DETECTION] = NO_DETECTION
+    if dx + dy > 0:
+        field = field[::-1]
+    return field if dx else field.T
+
+
+def slices_overlap(area, other_area):
+    """
+    Check if two (x, y) slice pair areas of the 2D array have a cell in common
+    """
+    return all(max(a.start, b.start) < min(a.stop, b.stop)
+               for a, b in zip(area, other_area))
+
+
+def shifted_slices(length, shift):
+    """
+    Return the (destination, source) slices that shift a line of `length`
+    cells by `shift` cells, so that destination[i] = source[i + shift]
+    """
+    return (slice(max(-shift, 0), length - max(shift, 0)),
+            slice(max(shift, 0), length - max(-shift, 0)))
+
 
 class Backend:
     """
     Backend class to deal with data accessing and processing for robot
-    Representated as a 2D array of data points
+    Representated as a 2D NumPy array of data points
     """
 
-    def __init__(self, target_barcode):
-        self.row = 108      # Row corresponds to matplot x-axis
-        self.col = 132      # Col cooresoinds to matplot y-axis
-        self.board = self.create_empty_board()
-        self.box_list = self.generate_all_boxes(target_barcode)
-        self.rock_list = RockFactory().randomize_rocks(NUM_ROCKS)
+    def __init__(self, target_barcode, seed=None, scenario=None, layout=None):
+        """
+        Generate boxes and rocks with the global `random`, or with a
+        random.Random(seed) if `seed` is given, so the layout can be reproduced
+        If a `scenario` (myscenario.Scenario) is given, load its layout instead
+        The warehouse is `layout` (mylayout.Layout), by default the
+        scenario's, or else the competition field
+        """
+        if layout is None:
+            layout = STANDARD_LAYOUT if scenario is None else scenario.layout
+        self.layout = layout
+        self.row = layout.num_rows      # Row corresponds to matplot x-axis
+        self.col = layout.num_cols      # Col cooresoinds to matplot y-axis
+        if scenario is not None:
+            self.box_list = scenario.make_boxes()
+            self.rock_list = scenario.make_rocks()
+        else:
+            rng = random if seed is None else random.Random(seed)
+            self.box_list = self.generate_all_boxes(target_barcode, rng, layout)
+            self.rock_list = RockFactory().randomize_rocks(layout.num_rocks, rng, layout)
+        # Spatial index of the boxes, kept up to date alongside box_list
+        self.box_index = BoxIndex(self.box_list)
         self.robot = Robot()
-        self.digitalize_boxes()
-        self.update_digital_board()
+        # The static board (static layer) only holds things that rarely change:
+        # boxes and rocks. Each robot has its own layer, which is just its
+        # rectangle area. The board is the layers composed: static board with
+        # the robots on top. robot_areas remembers where each robot was
+        # stamped, so it can be erased. More robots can share the board (see
+        # add_robot), `robot` is the first one
+        self.static_board = None
+        self.board = None
+        self.robot_areas = {self.robot: (slice(0, 0), slice(0, 0))}
+        # Ultrasonic range fields over the static board, built on demand
+        # See range_at
+        self.sensor_masks = {}
+        self.range_fields = {}
+        # Bumped whenever the static board changes, so whatever is derived
+        # from it (like the planner's grids) knows to rebuild
+        self.static_version = 0
+        self.rebuild_digital_board()
 
     def create_empty_board(self):
         """
         Create 2D array filled with 0 based on row and column numbers
         """
-        board = [[0 for _ in range(self.col + 1)] for _ in range(self.row + 1)]
+        board = np.zeros((self.row + 1, self.col + 1), dtype=np.int8)
         return board
 
-    def generate_all_boxes(self, target_barcode):
+    @staticmethod
+    def generate_all_boxes(target_barcode, rng=random, layout=STANDARD_LAYOUT):
         """
-        Randomize and return the box tuple coordinates of all 32 boxes
+        Randomize and return the box tuple coordinates of all the boxes of
+        `layout` (32 on the competition field), drawing from `rng` (the
+        global `random` by default)
         """
         # Project 5 specifies that boxes's bottomlefts
         # can only be in rows (12, 20, 36, 44, 60, 68, 84, 92)
@@ -50,21 +134,22 @@ class Backend:
         # In each sub-region, on each row, there are 2 boxes
         # These 2-boxes-pair's positions on a particular row is random,
         # as long as they don't overlap each other
+        # Other layouts have rows along every shelf edge, and a region per shelf
 
         all_boxes = []
-        for y in (12, 20, 36, 44, 60, 68, 84, 92):
+        for y, regions in layout.box_regions.items():
             # Generate two boxes until their bottomlefts are 4in apart (each box is 4in wide)
             # Region A-C: column 12-44
             # Region B-D: column 60-92
-            for region_range in [(12, 44), (60, 92)]:
+            for region_range in regions:
                 while True:
-                    x1, x2 = (random.randrange(*region_range, 1)
+                    x1, x2 = (rng.randrange(*region_range, 1)
                               for _ in range(2))
                     if abs(x1 - x2) >= 4:
                         break
 
-                box_temp1 = Box((x1, y, x1 + 4, y + 4), random.choice(BARCODE))
-                box_temp2 = Box((x2, y, x2 + 4, y + 4), random.choice(BARCODE))
+                box_temp1 = Box((x1, y, x1 + 4, y + 4), rng.choice(BARCODE))
+                box_temp2 = Box((x2, y, x2 + 4, y + 4), rng.choice(BARCODE))
                 if box_temp1.barcode == target_barcode:
                     box_temp1.wanted = True
                 if box_temp2.barcode == target_barcode:
@@ -76,86 +161,270 @@ class Backend:
     def remove_box(self, btmleft_of_box_to_remove):
         """
         Remove the box from the box_list, and consequently, frontend
-        when the box is picked up
+        when the box is picked up. A box 1 inch off to either side counts too
+        Return the removed box, or None if there is no box there
         """
-        for index, box in enumerate(self.box_list):
-            if box.bottomleft == btmleft_of_box_to_remove:
-                del self.box_list[index]
-                print(f"A box at {box.bottomleft} deleted")
-                break
-            if add_tuple(box.bottomleft, (1, 0)) == btmleft_of_box_to_remove:
-                del self.box_list[index]
-                print(
-                    f"A box at {add_tuple(box.bottomleft, (1, 0))} deleted")
-                break
-            if add_tuple(box.bottomleft, (-1, 0)) == btmleft_of_box_to_remove:
-                del self.box_list[index]
-                print(
-                    f"A box at {add_tuple(box.bottomleft, (-1, 0))} deleted")
+        x, y = btmleft_of_box_to_remove
+        # Prefer the box right there, then the one 1 inch to the left, then right
+        for box_x in (x, x - 1, x + 1):
+            box = self.box_index.at_bottomleft((box_x, y))
+            if box is not None:
                 break
+        else:
+            return None
+        self.box_list.remove(box)
+        self.box_index.remove(box)
+        if TRACER.scanning:
+            TRACER.trace(SCANNING, INFO, "A box at {bottomleft} deleted",
+                         bottomleft=box.bottomleft)
+        self.undigitalize_box(box)
+        return box
+
+    def box_at(self, point):
+        """
+        Return the box under `point` (in matplot coordinates), or None
+        """
+        return self.box_index.box_at(point)
+
+    def boxes_with_barcode(self, barcode):
+        """
+        Return the boxes still on the shelves that have this barcode
+        """
+        return self.box_index.with_barcode(barcode)
+
+    def box_area(self, box):
+        """
+        Return the areas a box takes up on the 2D array, which are its edge (10s)
+        and its barcode, as a list of (array index, values) pairs
+        """
+        bottomleft = box.bottomleft
+        if bottomleft[1] in self.layout.bottom_box_rows:
+            x, y = bottomleft[0], bottomleft[1] + DISPLACEMENT
+            # The box's edge is 10s, and the barcode is right behind the edge
+            return [((slice(x, x + 4), y), EDGE),
+                    ((slice(x, x + 4), y + 1), box.barcode)]
+        if bottomleft[1] in self.layout.top_box_rows:
+            # Facing down, so the barcode is read from right to left
+            x, y = bottomleft[0] + 4, bottomleft[1] + 4 + DISPLACEMENT
+            return [((slice(x - 3, x + 1), y), EDGE),
+                    ((slice(x - 3, x + 1), y - 1), box.barcode[::-1])]
+        return []
 
     def digitalize_boxes(self):
         """
-        Assigning 10s indicicating box edge onto the 2D array
+        Assigning 10s indicicating box edge onto the static 2D array
         """
         for box in self.box_list:
-            bottomleft = box.bottomleft
-            if bottomleft[1] in (12, 36, 60, 84):
-                x, y = bottomleft[0], bottomleft[1] + DISPLACEMENT
-                # Assign the box's edge with 10s
-                for i in range(4):
-                    self.board[x + i][y] = EDGE
-                # Assigning the barcode onto the box
-                for i in range(4):
-                    self.board[x + i][y + 1] = box.barcode[i]
-
-            elif bottomleft[1] in (20, 44, 68, 92):
-                x, y = bottomleft[0] + 4, bottomleft[1] + 4 + DISPLACEMENT
-                # Assign the box's edge with 10s
-                for i in range(4):
-                    self.board[x - i][y] = EDGE
-                # Assigning the barcode onto the box
-                for i in range(4):
-                    self.board[x - i][y - 1] = box.barcode[i]
+            for index, values in self.box_area(box):
+                self.static_board[index] = values
+
+    def undigitalize_box(self, box):
+        """
+        Erase a removed box from the board, without rebuilding the whole board
+        """
+        area = self.box_area(box)
+        for index, _ in area:
+            self.static_board[index] = 0
+        # Rocks may have been stamped over the box's edge, so stamp them back
+        self.digitalize_rocks()
+        for index, _ in area:
+            self.board[index] = self.static_board[index]
+        # The robots are always on top
+        for robot_area in self.robot_areas.values():
+            self.board[robot_area] = ROBOT
+        self.update_range_fields(area)
+        self.static_version += 1
 
     def digitalize_rocks(self):
         """
-        Digitalize rocks
+        Digitalize rocks onto the static 2D array
         """
         for rock in self.rock_list:
-            x_max = rock.bottomleft[0] + rock.size
-            y_max = rock.bottomleft[1] + rock.size
-            for x in range(rock.bottomleft[0], x_max + 1):
-                for y in range(rock.bottomleft[1], y_max + 1):
-                    self.board[x][y + DISPLACEMENT] = ROCK
+            x, y = rock.bottomleft[0], rock.bottomleft[1] + DISPLACEMENT
+            # A rock of size n takes up (n + 1) x (n + 1) cells
+            self.static_board[x:x + rock.size + 1, y:y + rock.size + 1] = ROCK
+
+    def sensor_mask(self, spread):
+        """
+        Return where an ultrasonic would detect something, as a boolean array
+        The ultrasonic has 2 cells, `spread` apart, and each cell of the mask
+        is where its first cell would be
+        """
+        mask = self.sensor_masks.get(spread)
+        if mask is None:
+            obstacles = self.static_board > 0
+            mask = obstacles.copy()
+            x_dest, x_src = shifted_slices(mask.shape[0], spread[0])
+            y_dest, y_src = shifted_slices(mask.shape[1], spread[1])
+            mask[x_dest, y_dest] |= obstacles[x_src, y_src]
+            self.sensor_masks[spread] = mask
+        return mask
+
+    def range_at(self, cell, spread, direction, clear=False):
+        """
+        Look up the range field of an ultrasonic of 2 cells `spread` apart,
+        moving along `direction`, at `cell` (an index on the 2D array): the
+        steps until it detects something (or, if `clear`, until it detects
+        nothing). The static board is used, since the robot never detects itself
+        A field line is only computed the first time it is looked up
+        """
+        key = (spread, direction, clear)
+        field = self.range_fields.get(key)
+        if field is None:
+            field = np.full(self.static_board.shape, UNKNOWN_RANGE, dtype=np.int32)
+            self.range_fields[key] = field
+        x, y = cell
+        if field[x, y] == UNKNOWN_RANGE:
+            mask = self.sensor_mask(spread)
+            if clear:
+                mask = ~mask
+            if direction[0]:
+                field[:, y] = distance_field(mask[:, y:y + 1], direction)[:, 0]
+            else:
+                field[x, :] = distance_field(mask[x:x + 1, :], direction)[0]
+        return int(field[x, y])
+
+    def update_range_fields(self, area):
+        """
+        Update the range fields after the static board changed in `area`
+        (a list of (array index, values) pairs, as from box_area)
+        The lines crossing changed cells are forgotten, to be computed again
+        """
+        changed_x, changed_y = set(), set()
+        for (x_index, y_index), _ in area:
+            changed_x.update(range(*x_index.indices(self.row + 1)))
+            changed_y.add(y_index)
+        self.sensor_masks = {}
+        for (spread, direction, _), field in self.range_fields.items():
+            # A mask cell depends on its own cell and the one `spread` after it
+            if direction[0]:
+                lines = [y - shift for y in changed_y for shift in (0, spread[1])
+                         if 0 <= y - shift <= self.col]
+                field[:, lines] = UNKNOWN_RANGE
+            else:
+                lines = [x - shift for x in changed_x for shift in (0, spread[0])
+                         if 0 <= x - shift <= self.row]
+                field[lines, :] = UNKNOWN_RANGE
 
-    def digitalize_robot(self):
+    def ultrasonic_range(self, direction, clear=False):
         """
-        Assign 5s indicating the robot onto the 2d Array
+        Return how many steps the robot's ultrasonic can be moved along
+        `direction`, without turning, until it detects something (or, if
+        `clear`, until it detects nothing); NO_DETECTION if it never does
         """
-        # whole_rectangle = self.robot.get_whole_rectangle_coor()
-        btmleft = self.robot.bottomleft
+        first, second = self.robot.ultrasonic
+        cell = (first[0], first[1] + DISPLACEMENT)
+        return self.range_at(cell, sub_tuple(second, first), direction, clear)
+
+    def steps_until_detection(self, limit, backward=False):
+        """
+        Return how many steps (1 to `limit`) the robot can move forward (or
+        backward) until its ultrasonic detects something; `limit` if nothing
+        is detected on the way
+        """
+        if limit <= 0:
+            return 0
         direction = self.robot.direction
+        if backward:
+            direction = rev(direction)
+        return min(limit, self.ultrasonic_range(direction))
+
+    def robot_footprint(self, robot=None):
+        """
+        Return the robot's (or another `robot`'s) rectangle area on the 2D
+        array as a (x, y) slice pair
+        """
+        robot = self.robot if robot is None else robot
+        btmleft = robot.bottomleft
+        direction = robot.direction
         x_val, y_val = btmleft[0], btmleft[1] + DISPLACEMENT
         if direction in (UP, DOWN):
-            for x in range(x_val, x_val + 4, 1):
-                for y in range(y_val, y_val + 6, 1):
-                    self.board[x][y] = ROBOT
-        elif direction in (LEFT, RIGHT):
-            for x in range(x_val, x_val + 6, 1):
-                for y in range(y_val, y_val + 4, 1):
-                    self.board[x][y] = ROBOT
-
-    def update_digital_board(self):
-        """
-        Update the digital board if any changes happen to the robot,
-        or the boxes
-        """
-        # Refresh the board
-        self.board = self.create_empty_board()
-        # Update boxes
+            x_len, y_len = 4, 6
+        else:
+            x_len, y_len = 6, 4
+        return (slice(max(x_val, 0), x_val + x_len),
+                slice(max(y_val, 0), y_val + y_len))
+
+    def digitalize_robot(self, robot=None):
+        """
+        Assign 15s indicating the robot (or another `robot` on the board) onto
+        the 2d Array
+        """
+        robot = self.robot if robot is None else robot
+        area = self.robot_footprint(robot)
+        self.robot_areas[robot] = area
+        self.board[area] = ROBOT
+
+    def compose_board(self):
+        """
+        Compose the board from the static layer and the robot layers
+        """
+        self.board = self.static_board.copy()
+        for robot in self.robot_areas:
+            self.digitalize_robot(robot)
+
+    def add_robot(self):
+        """
+        Put one more robot on the board, sharing it with the others
+        Return the new robot (placed with Robot.set_robot_start, then
+        update_digital_board)
+        """
+        robot = Robot()
+        self.digitalize_robot(robot)
+        return robot
+
+    def remove_robot(self, robot):
+        """
+        Take a robot off the board
+        """
+        area = self.robot_areas.pop(robot)
+        self.board[area] = self.static_board[area]
+        self.restamp_robots(area)
+
+    def restamp_robots(self, area, ignore=None):
+        """
+        Stamp back the robots (other than `ignore`) that overlap an `area`
+        that was just erased
+        """
+        for other, other_area in self.robot_areas.items():
+            if other is not ignore and slices_overlap(area, other_area):
+                self.board[other_area] = ROBOT
+
+    def robots_overlapping(self, area, ignore=None):
+        """
+        Return the robots on the board (other than `ignore`) whose rectangle
+        area has a cell in common with `area` (an (x, y) slice pair, as from
+        robot_footprint)
+        """
+        return [robot for robot in self.robot_areas
+                if robot is not ignore
+                and slices_overlap(area, self.robot_footprint(robot))]
+
+    def rebuild_digital_board(self):
+        """
+        Rebuild the whole digital board from scratch, including the static
+        board of boxes and rocks
+        """
+        self.static_board = self.create_empty_board()
         self.digitalize_boxes()
-        # Update rocks
         self.digitalize_rocks()
-        # Update the robot (since it is always in continuous movement)
-        self.digitalize_robot()
+        self.compose_board()
+        self.sensor_masks = {}
+        self.range_fields = {}
+        self.static_version += 1
+
+    def update_digital_board(self, robot=None):
+        """
+        Update the digital board if any changes happen to the robot (or to
+        another `robot` on the board)
+        Only the robot's previous area is erased and its new one stamped,
+        since boxes and rocks are kept up to date in the static board
+        """
+        robot = self.robot if robot is None else robot
+        # Erase the robot from where it was
+        area = self.robot_areas[robot]
+        self.board[area] = self.static_board[area]
+        if len(self.robot_areas) > 1:
+            self.restamp_robots(area, ignore=robot)
+        # Stamp the robot where it is now
+        self.digitalize_robot(robot)
@@ -1,6 +1,10 @@
 """
-Module for class Box
+Module for class Box, and BoxIndex to look boxes up by position or barcode
 """
+
+from bisect import bisect_left, bisect_right
+
+
 class Box:
     """
     Box class
@@ -23,3 +27,96 @@ class Box:
         Get a box's bottom left coordinate for matplotlib to draw rectangle
         """
         return (self.box_tuple[0], self.box_tuple[1])
+
+
+class BoxIndex:
+    """
+    Spatial index of boxes, kept alongside a box list
+    Boxes are bucketed by the row (y) of their bottomleft, such as the shelf
+    rows 12, 20, 36, 44, 60, 68, 84 and 92, and kept sorted by x in each row,
+    so a box is found by its row and an x-range lookup instead of a scan.
+    Boxes are also bucketed by barcode
+    """
+
+    def __init__(self, boxes=()):
+        """
+        Index all `boxes`
+        """
+        self.rows = {}          # Row y: (sorted bottomleft xs, boxes in the same order)
+        self.barcodes = {}      # Barcode: {id(box): box}
+        self.count = 0
+        for box in boxes:
+            self.add(box)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for _, row_boxes in self.rows.values():
+            yield from row_boxes
+
+    def add(self, box):
+        """
+        Add a box to the index
+        """
+        x, y = box.bottomleft
+        xs, row_boxes = self.rows.setdefault(y, ([], []))
+        position = bisect_right(xs, x)
+        xs.insert(position, x)
+        row_boxes.insert(position, box)
+        self.barcodes.setdefault(tuple(box.barcode), {})[id(box)] = box
+        self.count += 1
+
+    def remove(self, box):
+        """
+        Remove a box from the index
+        """
+        x, y = box.bottomleft
+        xs, row_boxes = self.rows[y]
+        position = bisect_left(xs, x)
+        while row_boxes[position] is not box:
+            position += 1
+        del xs[position]
+        del row_boxes[position]
+        if not xs:
+            del self.rows[y]
+        same_barcode = self.barcodes[tuple(box.barcode)]
+        del same_barcode[id(box)]
+        if not same_barcode:
+            del self.barcodes[tuple(box.barcode)]
+        self.count -= 1
+
+    def in_row(self, y, x_min, x_max):
+        """
+        Return the boxes of row `y` whose bottomleft x is in [x_min, x_max]
+        """
+        if y not in self.rows:
+            return []
+        xs, row_boxes = self.rows[y]
+        return row_boxes[bisect_left(xs, x_min):bisect_right(xs, x_max)]
+
+    def at_bottomleft(self, bottomleft):
+        """
+        Return the box with this exact bottomleft, or None
+        """
+        x, y = bottomleft
+        found = self.in_row(y, x, x)
+        return found[0] if found else None
+
+    def box_at(self, point):
+        """
+        Return the box whose square covers `point` (in matplot coordinates),
+        for example the box under a sensor, or None
+        """
+        x, y = point
+        for row_y in range(y - Box.SIDE, y + 1):
+            found = self.in_row(row_y, x - Box.SIDE, x)
+            if found:
+                return found[0]
+        return None
+
+    def with_barcode(self, barcode):
+        """
+        Return the boxes with this barcode
+        """
+        return list(self.barcodes.get(tuple(barcode), {}).values())
@@ -59,10 +59,24 @@ WIDTH = 4
 # the digital board in anyway
 HOME = [(6, -6), (102, -6), (6, 114), (102, 114)]
 
+# The field is a 108 x 108 square, with the homes just outside of it
+ARENA = (0, 0, 108, 108)    # bottomleft x, y, width, height
+HOME_RADIUS = 6
+
+# Shelves, as (bottomleft x, y, width, height)
+SHELVES = [(12, 12, 36, 12), (12, 36, 36, 12),     # Zone A
+           (60, 12, 36, 12), (60, 36, 36, 12),     # Zone B
+           (12, 60, 36, 12), (12, 84, 36, 12),     # Zone C
+           (60, 60, 36, 12), (60, 84, 36, 12)]     # Zone D
+
 # Quads' starting and ending locations:
 QUAD_START = [(12, 7), (59, 7), (49, 101), (97, 101)]
 QUAD_END = [(9, 53), (57, 53), (51, 55), (99, 55)]
 
+# Where the robot gets to when departing from each home (quad D's search
+# starts one inch short of its start)
+HOME_EXIT = [(12, 7), (59, 7), (49, 101), (96, 101)]
+
 # Quads' x and y limit
 QUAD_Y_LIMIT = [(7, 53), (7, 53), (55, 103), (55, 103)]
 QUAD_X_LIMIT = [(7, 53), (55, 103), (7, 53), (55, 103)]
@@ -70,6 +84,25 @@ QUAD_X_LIMIT = [(7, 53), (55, 103), (7, 53), (55, 103)]
 # Quad's starting direction:
 QUAD_START_DIRCT = [UP, UP, DOWN, DOWN]
 
+# SIMULATED TIMING
+# How many seconds each primitive takes the EV3 robot: steps at the 15%
+# speed of straight.py, gyro turns of gyroSteer.py, the 1 second medium
+# motor run of mediumMotor.py. The simulator keeps a clock in these robot
+# seconds, and paces rendering so that it runs real_time_factor times faster
+# than real time. They are all multiples of 1/16 s, so that sums of them
+# are exact
+STEP_TIME = 0.3125          # One 1-inch step, about 3.2 inches per second
+TURN_TIME = 1.0             # One 90 degree turn
+PICK_TIME = 1.0             # Picking up a box
+DODGE_TIME = 0.5            # Each sidestep while circumventing a rock
+SCAN_BIT_TIME = 0.0625      # Scanning one color bit of a barcode
+TRACK_STEP_TIME = 0.125     # Each step while tracking along a box
+SCAN_RESULT_TIME = 0.25     # Reading a full barcode
+# Default real_time_factor: a robot mission of a few minutes plays in seconds
+REAL_TIME_FACTOR = 30
+# Shortest pause that still lets the GUI process its events
+MIN_PAUSE = 0.00001
+
 # Number of rocks wanted on field
 NUM_ROCKS = 4
 
@@ -0,0 +1,594 @@
+"""
+My module for fleets of robots searching the field together on one board
+Each robot runs its own mission (a Simulator sharing the fleet's backend) in
+its own thread, but only one of them runs at a time: the robot furthest
+behind on the simulated clock does its next primitive, so the robots move
+in interleaved ticks, as if at the same time
+The quads are split among the robots by a quad-assignment policy. Robots
+never drive through each other:
+- a robot only sets off for a shelf line once the band around it is free: no
+  other robot is on its way to or scanning a line too close to it (the
+  hallway between two shelves has 2 scan lines robots can't pass on), and no
+  other robot stands in it, but for robots behind it waiting for a band too
+- a robot waits for room for each move, and backs off out of the way of the
+  robots with the right of way (the ones holding a band, then the ones
+  before it in the fleet) by the fewest moves, coming back once they are gone
+Example (comparison report against the single robot search_entire_area):
+    python myfleet.py --robots 2 --seeds 50
+"""
+
+import argparse
+import itertools
+import threading
+from collections import deque
+from tuplemath import distance_2points
+from myconstants import *
+from myrobot import Robot
+from mybackend import Backend, slices_overlap
+from mylayout import STANDARD_LAYOUT
+from myroute import visiting_order
+from myscenario import Scenario
+from mysimulator import Simulator
+from mytrace import TRACER, WARNING, NAVIGATION
+
+
+# Ticks a robot spends making room for one move (waiting, backing off and
+# coming back) before it gives up and stops its mission
+WAIT_LIMIT = 2000
+# Most moves a robot looks ahead for a way out of another robot's way
+ESCAPE_DEPTH = 40
+# Cells of room a robot wants around its way back after backing off
+RETURN_MARGIN = 2
+# Cells on either side of a scan line a robot scanning it may take up, past
+# its body (stepping aside around rocks, stepping in to pick a box up)
+SCAN_MARGIN = 5
+
+# The Robot movements, with the move that undoes each
+UNDO = {
+    Robot.step_forward: Robot.step_backward,
+    Robot.step_backward: Robot.step_forward,
+    Robot.turn_right_90: Robot.turn_left_90,
+    Robot.turn_left_90: Robot.turn_right_90,
+}
+
+
+def quad_center(quad, layout=STANDARD_LAYOUT):
+    """
+    Return the center point of a quad of `layout`
+    """
+    x_limit, y_limit = layout.quads[quad].x_limit, layout.quads[quad].y_limit
+    return (sum(x_limit) / 2, sum(y_limit) / 2)
+
+
+def assign_quads(start_positions, layout=STANDARD_LAYOUT):
+    """
+    Default quad-assignment policy: split the quads of `layout` as evenly as
+    possible among the robots, nearest (robot, quad) pairs first, as long as
+    the robot still has room for one more quad
+    Return a list of quads for each robot
+    """
+    num_robots = len(start_positions)
+    num_quads = len(layout.quads)
+    room = [num_quads // num_robots + (number < num_quads % num_robots)
+            for number in range(num_robots)]
+    pairs = sorted((distance_2points(start_pos, quad_center(quad, layout)), number, quad)
+                   for number, start_pos in enumerate(start_positions)
+                   for quad in range(num_quads))
+    quads = [[] for _ in start_positions]
+    assigned = set()
+    for _, number, quad in pairs:
+        if quad not in assigned and room[number]:
+            quads[number].append(quad)
+            assigned.add(quad)
+            room[number] -= 1
+    return quads
+
+
+def fleet_homes(start_pos, num_robots, layout=STANDARD_LAYOUT):
+    """
+    Return the homes of a fleet of `num_robots` robots: `start_pos`, then
+    the homes of `layout` farthest from it
+    """
+    others = sorted((home for home in layout.homes if home != start_pos),
+                    key=lambda home: -distance_2points(start_pos, home))
+    return [start_pos] + others[:num_robots - 1]
+
+
+def inflated(area, margin):
+    """
+    Return an (x, y) slice pair area grown by `margin` cells on every side
+    """
+    return tuple(slice(max(part.start - margin, 0), part.stop + margin) for part in area)
+
+
+class MissionOver(Exception):
+    """
+    Raised in a robot's mission to stop it, once another robot found the box
+    """
+
+
+class RobotStuck(Exception):
+    """
+    Raised in a robot's mission to stop it, when it could not make room for a
+    move in WAIT_LIMIT ticks
+    """
+
+
+class FleetRobot(Simulator):
+    """
+    One robot of a fleet: a headless simulator on the fleet's backend that
+    hands the turn over after each primitive, and makes room for each move
+    among the other robots
+    """
+
+    def __init__(self, fleet, robot, start_pos, lines, priority=0):
+        """
+        Make a fleet robot out of one of the backend's robots, to scan
+        `lines` (myroute.ScanLine) in order. Robots of a lower `priority`
+        number have the right of way
+        """
+        super().__init__(start_pos, fleet.target_code, headless=True,
+                         backend=fleet.backend, robot=robot)
+        self.fleet = fleet
+        self.start_pos = start_pos
+        self.lines = lines
+        self.priority = priority
+        # Step one inch at a time, since macro-steps would go through robots
+        self.macro_steps = False
+        # Moves (Robot movement methods) that undo the ones made while
+        # backing off, to make on the way back, the last one first
+        self.detour = []
+        # Area of the move the robot is waiting to make, None if it is not
+        self.wanted = None
+        # Area around the shelf line the robot is on its way to or scanning,
+        # and the one it waits for, None if there is none
+        self.band = None
+        self.band_wanted = None
+        self.num_waits = 0
+        self.num_backoffs = 0
+        self.stuck = False
+        self.done = False
+
+    def tick(self, duration, force_render=False):
+        """
+        Advance the simulated clock after a primitive, then let the robot
+        furthest behind go on
+        """
+        super().tick(duration, force_render)
+        self.fleet.yield_turn(self)
+
+    @staticmethod
+    def probe_after(pose, move):
+        """
+        Return a probe robot in the pose (center, head) reached from `pose`
+        by `move` (a Robot movement method)
+        """
+        probe = Robot()
+        probe.center, probe.head = pose
+        move(probe)
+        return probe
+
+    def area_after(self, move):
+        """
+        Return the robot's area on the board after `move` (a Robot movement
+        method)
+        """
+        return self.backend.robot_footprint(
+            self.probe_after((self.robot.center, self.robot.head), move))
+
+    def room_for(self, move, margin=0):
+        """
+        Check if the robot can make `move` without running into another
+        robot, with `margin` cells to spare
+        """
+        area = inflated(self.area_after(move), margin)
+        return not self.backend.robots_overlapping(area, ignore=self.robot)
+
+    def rank(self):
+        """
+        Right of way of the robot, the lowest first: robots scanning a shelf
+        line, then the ones before in the fleet
+        """
+        return (self.band is None, self.priority)
+
+    def outranking_areas(self):
+        """
+        Return the areas the running robots with the right of way want to
+        move into
+        """
+        return [other.wanted for other in self.fleet.robots
+                if other.wanted is not None and other.rank() < self.rank() and not other.done]
+
+    def outranked_in(self, area):
+        """
+        Check if a running robot with the right of way wants to move into
+        `area`
+        """
+        return any(slices_overlap(wanted, area) for wanted in self.outranking_areas())
+
+    def make_move(self, move):
+        """
+        Make `move` with the simulator's primitive, without making room
+        """
+        if move is Robot.step_forward:
+            super().robot_forward(1)
+        elif move is Robot.step_backward:
+            super().robot_backward(1)
+        elif move is Robot.turn_right_90:
+            super().robot_turn_right()
+        else:
+            super().robot_turn_left()
+
+    def escape(self, areas):
+        """
+        Breadth-first search the fewest moves that take the robot clear of
+        `areas`, through poses free of shelves, rocks and other robots
+        Return the first of them (a Robot movement method), None if there is
+        no way out in ESCAPE_DEPTH moves
+        """
+        start = (self.robot.center, self.robot.head)
+        seen = {start}
+        queue = deque([(start, None, 0)])
+        while queue:
+            pose, first_move, depth = queue.popleft()
+            if depth == ESCAPE_DEPTH:
+                break
+            for move in UNDO:
+                probe = self.probe_after(pose, move)
+                next_pose = (probe.center, probe.head)
+                if next_pose in seen or not self.planner.is_free(probe.center, probe.direction):
+                    continue
+                seen.add(next_pose)
+                area = self.backend.robot_footprint(probe)
+                if self.backend.robots_overlapping(area, ignore=self.robot):
+                    continue
+                if not any(slices_overlap(wanted, area) for wanted in areas):
+                    return first_move or move
+                queue.append((next_pose, first_move or move, depth + 1))
+        return None
+
+    def back_off(self):
+        """
+        If a robot with the right of way wants the robot's place, make the
+        first move out of its way (see escape)
+        Return whether the robot backed off
+        """
+        areas = self.outranking_areas()
+        footprint = self.backend.robot_footprint(self.robot)
+        if not any(slices_overlap(wanted, footprint) for wanted in areas):
+            return False
+        move = self.escape(areas)
+        if move is None:
+            return False
+        self.detour.append(UNDO[move])
+        self.num_backoffs += 1
+        self.make_move(move)
+        return True
+
+    def come_back(self):
+        """
+        Undo the last move made while backing off, once there is room around
+        it and no robot with the right of way wants it
+        Return whether the robot came back one move
+        """
+        move = self.detour[-1]
+        if not self.room_for(move, RETURN_MARGIN) or self.outranked_in(self.area_after(move)):
+            return False
+        self.make_move(self.detour.pop())
+        return True
+
+    def make_way(self, ready, move=None):
+        """
+        Tick by tick, until `ready()` with the robot back where it was: wait,
+        back off out of the way of the robots with the right of way, and come
+        back once they are gone. Meanwhile, the robot wants the area of
+        `move` (a Robot movement method), if any
+        After WAIT_LIMIT ticks, give up and stop the mission (RobotStuck)
+        """
+        try:
+            for ticks in itertools.count():
+                next_move = self.detour[-1] if self.detour else move
+                self.wanted = None if next_move is None else self.area_after(next_move)
+                if not self.detour and ready():
+                    return
+                if ticks == WAIT_LIMIT:
+                    self.stuck = True
+                    if TRACER.navigation:
+                        TRACER.trace(NAVIGATION, WARNING, "Robot at {center} stuck",
+                                     center=self.robot.center)
+                    raise RobotStuck
+                if self.back_off() or (self.detour and self.come_back()):
+                    continue
+                self.num_waits += 1
+                self.wait(STEP_TIME)
+                self.fleet.yield_turn(self)
+        finally:
+            self.wanted = None
+
+    def make_room(self, move):
+        """
+        Make way until the robot can make `move` (a Robot movement method)
+        without running into another robot
+        """
+        self.make_way(lambda: self.room_for(move), move)
+
+    def line_band(self, line):
+        """
+        Return the area a robot scanning `line` (myroute.ScanLine) may take
+        up, from its entry to its exit point
+        """
+        (x_entry, y), (x_exit, _) = line.entry, line.exit_point
+        x_reach = Robot.HLENGTH
+        y_reach = Robot.HLENGTH + SCAN_MARGIN
+        return (slice(max(min(x_entry, x_exit) - x_reach, 0), max(x_entry, x_exit) + x_reach + 1),
+                slice(max(y - y_reach + DISPLACEMENT, 0), y + y_reach + DISPLACEMENT + 1))
+
+    def band_free(self, band):
+        """
+        Check if no other robot holds a band overlapping `band`, or stands in
+        it, unless it is waiting for a band of its own behind this robot
+        (it then gets out of the way, rather than both waiting forever)
+        """
+        inside = self.backend.robots_overlapping(band, ignore=self.robot)
+        return not any((other.band is not None and slices_overlap(other.band, band))
+                       or (other.robot in inside
+                           and (other.band_wanted is None or other.priority < self.priority))
+                       for other in self.fleet.robots if other is not self)
+
+    def search_lines(self, lines):
+        """
+        Scan shelf lines in turn, until a box is picked up. Each line's band
+        is held from the way to its entry to the end of its scan, once it is
+        free, so that no robot waits for a line inside another's band
+        """
+        for line in lines:
+            band = self.line_band(line)
+            self.band_wanted = band
+            try:
+                self.make_way(lambda: self.band_free(band))
+            finally:
+                self.band_wanted = None
+            self.band = band
+            try:
+                self.robot_goto_point(line.entry, line.direction)
+                self.search_shelf()
+            finally:
+                self.band = None
+            if not self.robot.storage_empty:
+                break
+
+    def robot_forward(self, numsteps):
+        """
+        Step forward one inch at a time, making room for each step
+        """
+        for _ in range(numsteps):
+            self.make_room(Robot.step_forward)
+            super().robot_forward(1)
+
+    def robot_backward(self, numsteps):
+        """
+        Step backward one inch at a time, making room for each step
+        """
+        for _ in range(numsteps):
+            self.make_room(Robot.step_backward)
+            super().robot_backward(1)
+
+    def robot_turn_right(self):
+        """
+        Turn right, once there is room for it
+        """
+        self.make_room(Robot.turn_right_90)
+        super().robot_turn_right()
+
+    def robot_turn_left(self):
+        """
+        Turn left, once there is room for it
+        """
+        self.make_room(Robot.turn_left_90)
+        super().robot_turn_left()
+
+    def robot_pick_box(self):
+        """
+        Pick up the box, and tell the fleet if it is the wanted one
+        """
+        super().robot_pick_box()
+        if self.time_to_find is not None:
+            self.fleet.box_found(self)
+
+    def run_mission(self):
+        """
+        Scan the robot's shelf lines, then go back home
+        """
+        self.search_lines(self.lines)
+        self.robot_goto_point(self.start_pos)
+
+
+class Fleet:
+    """
+    Fleet class to run several robots on a shared board, each searching the
+    quads it is assigned to, until one of them picks up the wanted box
+    """
+
+    def __init__(self, start_positions, target_barcode, seed=None, scenario=None,
+                 assign=assign_quads, layout=None):
+        """
+        Put a robot at each of `start_positions` on one backend (`seed`,
+        `scenario` and `layout` are passed on to it), and give each robot its
+        quads with the `assign` policy (start positions, layout -> list of
+        quads per robot)
+        """
+        self.backend = Backend(target_barcode, seed, scenario, layout)
+        layout = self.backend.layout
+        self.target_code = target_barcode
+        self.robots = []
+        for number, (start_pos, quads) in enumerate(zip(start_positions,
+                                                        assign(start_positions, layout))):
+            robot = self.backend.robot if number == 0 else self.backend.add_robot()
+            shelves = [shelf for quad in sorted(quads) for shelf in layout.quad_shelves(quad)]
+            lines = visiting_order(start_pos, shelves, layout) if shelves else []
+            self.robots.append(FleetRobot(self, robot, start_pos, lines, number))
+            self.backend.update_digital_board(robot)
+        self.finder = None
+        self.error = None
+        # The robot whose turn it is, handed over under the condition
+        self.turn = None
+        self.condition = threading.Condition()
+
+    @classmethod
+    def from_scenario(cls, scenario, num_robots, **kwargs):
+        """
+        Make a fleet of `num_robots` robots for a scenario, starting from the
+        scenario's home and the homes farthest from it
+        """
+        return cls(fleet_homes(scenario.start_pos, num_robots, scenario.layout),
+                   scenario.target_barcode, scenario=scenario, **kwargs)
+
+    def next_robot(self):
+        """
+        Return the robot furthest behind on the simulated clock (the first
+        one on a tie) of the robots still running, None if there are none
+        """
+        running = [fleet_robot for fleet_robot in self.robots if not fleet_robot.done]
+        return min(running, key=lambda fleet_robot: fleet_robot.sim_time, default=None)
+
+    def wait_for_turn(self, fleet_robot):
+        """
+        Block the robot's thread until it is its turn
+        """
+        while self.turn is not fleet_robot:
+            self.condition.wait()
+
+    def yield_turn(self, fleet_robot):
+        """
+        Hand the turn over to the robot furthest behind, and wait to get it
+        back. Stop the robot's mission if another robot found the box
+        """
+        with self.condition:
+            self.turn = self.next_robot()
+            self.condition.notify_all()
+            self.wait_for_turn(fleet_robot)
+        if self.finder is not None and self.finder is not fleet_robot:
+            raise MissionOver
+
+    def box_found(self, fleet_robot):
+        """
+        Remember the first robot that picked up the wanted box
+        """
+        if self.finder is None:
+            self.finder = fleet_robot
+
+    def run_robot(self, fleet_robot):
+        """
+        Thread of one robot: run its mission whenever it has the turn
+        A robot stopped by MissionOver or RobotStuck, or by an error, is taken
+        off the board
+        """
+        with self.condition:
+            self.wait_for_turn(fleet_robot)
+        try:
+            fleet_robot.run_mission()
+        except (MissionOver, RobotStuck):
+            self.backend.remove_robot(fleet_robot.robot)
+        except Exception as error:  # Handed over to run, the robots go on
+            self.backend.remove_robot(fleet_robot.robot)
+            if self.error is None:
+                self.error = error
+        finally:
+            with self.condition:
+                fleet_robot.done = True
+                self.turn = self.next_robot()
+                self.condition.notify_all()
+
+    def run(self):
+        """
+        Run the missions of all the robots until they are all over
+        """
+        threads = [threading.Thread(target=self.run_robot, args=(fleet_robot,),
+                                    daemon=True)
+                   for fleet_robot in self.robots]
+        with self.condition:
+            self.turn = self.next_robot()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self.error is not None:
+            raise self.error
+
+    @property
+    def time_to_find(self):
+        """
+        Simulated time when the wanted box started getting picked up, None
+        if it was not
+        """
+        return None if self.finder is None else self.finder.time_to_find
+
+    @property
+    def num_backoffs(self):
+        """
+        Number of moves robots undid to get out of each other's way
+        """
+        return sum(fleet_robot.num_backoffs for fleet_robot in self.robots)
+
+    @property
+    def num_stuck(self):
+        """
+        Number of robots that gave up their mission, stuck behind others
+        """
+        return sum(fleet_robot.stuck for fleet_robot in self.robots)
+
+    @property
+    def num_waits(self):
+        """
+        Number of ticks robots waited for each other
+        """
+        return sum(fleet_robot.num_waits for fleet_robot in self.robots)
+
+
+def compare(num_robots, seeds):
+    """
+    Run seeded scenarios with a single robot (search_entire_area) and with a
+    fleet of `num_robots` robots
+    Return (number of missions where both found the box, mean single time to
+    find, mean fleet time to find, number of fleet missions that found it,
+    total waits, total backoffs, total stuck robots)
+    """
+    both = 0
+    single_total = fleet_total = 0.0
+    fleet_found = num_waits = num_backoffs = num_stuck = 0
+    for seed in seeds:
+        scenario = Scenario.generate(seed)
+        game = Simulator.from_scenario(scenario, headless=True)
+        game.search_entire_area()
+        fleet = Fleet.from_scenario(scenario, num_robots)
+        fleet.run()
+        num_waits += fleet.num_waits
+        num_backoffs += fleet.num_backoffs
+        num_stuck += fleet.num_stuck
+        if fleet.time_to_find is not None:
+            fleet_found += 1
+        if game.time_to_find is not None and fleet.time_to_find is not None:
+            both += 1
+            single_total += game.time_to_find
+            fleet_total += fleet.time_to_find
+    return (both, single_total / max(both, 1), fleet_total / max(both, 1),
+            fleet_found, num_waits, num_backoffs, num_stuck)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--robots", type=int, default=None,
+                        help="fleet size, 2 to 4 (default: all of them in turn)")
+    parser.add_argument("--seeds", type=int, default=50,
+                        help="number of seeded scenarios (default 50)")
+    args = parser.parse_args()
+
+    seeds = range(args.seeds)
+    sizes = range(2, len(HOME) + 1) if args.robots is None else (args.robots,)
+    print(f"{'robots':<8}{'found':>7}{'single':>10}{'fleet':>10}{'speedup':>9}"
+          f"{'waits':>8}{'backoffs':>10}{'stuck':>7}")
+    for num_robots in sizes:
+        both, single, fleet, found, waits, backoffs, stuck = compare(num_robots, seeds)
+        print(f"{num_robots:<8}{found:>7}{single:>10.1f}{fleet:>10.1f}"
+              f"{single / fleet if fleet else 0:>8.2f}x{waits:>8}{backoffs:>10}{stuck:>7}")
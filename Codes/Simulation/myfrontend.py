@@ -4,50 +4,78 @@ My module for Invisible Artist class
 
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
-from matplotlib.collections import PatchCollection
+from matplotlib.collections import PatchCollection, PolyCollection
 from tuplemath import *
 from myconstants import *
+from mylayout import STANDARD_LAYOUT
 
 # Digital reporesentation
 # Robot is encoded as 5s, box's edges are encoded as 10s
 ROBOT = 15
 EDGE = 10
 
+# y offsets, from the top of the arena, of the IPS info's headings and of
+# its 5 lines
+IPS_HEADINGS = ((2, "IPS info"), (-8, "Simulation"), (-13, "coordinates"),
+                (-28, "Distance to A"), (-38, "Distance to C"), (-48, "Distance to D"),
+                (-58, "Calculated"), (-63, "coordinates"))
+IPS_TEXT_DY = (-18, -32, -42, -52, -67)
+# Room on the right of the arena for the IPS info
+IPS_MARGIN = 24
+
 class InvisibleArtist:
     """An invisible hand that draws Robots, Boxes, and Shelves"""
 
-    def __init__(self, target_barcode):
+    def __init__(self, target_barcode, blit=True, layout=STANDARD_LAYOUT):
         """
-        Intialize a blank canvas to draw on
+        Intialize a blank canvas to draw on, for the warehouse `layout`
+        If `blit`, the robot and IPS artists are created once and then only
+        moved, and each frame is blitted onto a cached copy of the background
         """
+        self.layout = layout
+        x_arena, y_arena, width, height = layout.arena
+        # The IPS info is written right of the arena, from its top down
+        self.text_x = x_arena + width + 2
+        self.text_top = y_arena + height
         self.fig = plt.figure(figsize=(6, 6))
         self.background = self.fig.add_axes([0.1, 0.1, 0.8, 0.8])
-        self.background.set_xlim(0, 132)
-        self.background.set_ylim(-12, 120)
+        self.background.set_xlim(0, x_arena + width + IPS_MARGIN)
+        self.background.set_ylim(y_arena - DISPLACEMENT, y_arena + height + DISPLACEMENT)
         self.background.set_title("Team 271")
 
         self.surface = self.background.twiny()
         self.surface.set_xticks([])
-        self.surface.set_xlim(0, 132)
+        self.surface.set_xlim(0, x_arena + width + IPS_MARGIN)
         self.target_barcode = target_barcode
 
+        # Persistent artists for blitting, created on first render_surface
+        self.blit = blit and self.fig.canvas.supports_blit
+        self.robot_artists = None
+        self.IPS_texts = None
+        self.blit_background = None
+        if self.blit:
+            self.fig.canvas.mpl_connect("draw_event", self.on_draw)
+
+    def IPS_info(self, robot):
+        """
+        Return the 5 lines of IPS info of the robot
+        """
+        # Distance to A, C, and D
+        homes = self.layout.homes
+        rA = distance_2points(robot.center, homes[0])
+        rC = distance_2points(robot.center, homes[2])
+        rD = distance_2points(robot.center, homes[3])
+        # Calculated cooridnates by trilateration, with the solver of A, C, D
+        x_calc, y_calc = self.layout.ips.solve_one((rA, rC, rD))
+        return [f"{robot.center}", f"{rA:.0f}", f"{rC:.0f}", f"{rD:.0f}",
+                f"({x_calc:.0f}, {y_calc:.0f})"]
+
     def write_IPS(self, robot):
         """
         Write IPS info to background
-        """        
-        self.surface.text(110, 90, f"{robot.center}")
-        # Distance to A
-        rA = distance_2points(robot.center, HOME[0])
-        self.surface.text(110, 76, f"{rA:.0f}")
-        # Distance to C
-        rC = distance_2points(robot.center, HOME[2])
-        self.surface.text(110, 66, f"{rC:.0f}")
-        # Distance to D
-        rD = distance_2points(robot.center, HOME[3])
-        self.surface.text(110, 56, f"{rD:.0f}")
-        # Calculated cooridnates using Blackboard algorithm
-        x_calc, y_calc = IPS_coordinates(rA, rC, rD)
-        self.surface.text(110, 41, f"({x_calc:.0f}, {y_calc:.0f})")
+        """
+        for dy, info in zip(IPS_TEXT_DY, self.IPS_info(robot)):
+            self.surface.text(self.text_x, self.text_top + dy, info)
 
     
     def clear_IPS(self):
@@ -57,23 +85,44 @@ class InvisibleArtist:
         for text in self.surface.texts:
             text.remove()
 
+    def body_geometry(self, robot):
+        """
+        Return (bottom left, width, height) of the robot's main body rectangle
+        """
+        # Vertical rectangle if robot is in vertical direction
+        if robot.direction in (UP, DOWN):
+            return add_tuple(robot.center, (-int(WIDTH / 2), -HLENGTH)), 4, 6
+        # Horizontal rectangle if robot is in horizontal direction
+        return add_tuple(robot.center, (-HLENGTH, -int(WIDTH / 2))), 6, 4
+
+    def ultrasonic_geometry(self, robot):
+        """
+        Return (bottom left, width, height) of the ultrasonic field rectangle
+        """
+        direction = robot.direction
+        ultra_btmleft = (robot.ultrasonic[0] if direction in (RIGHT, DOWN)
+                    else robot.ultrasonic[1])
+        if direction in (LEFT, RIGHT):
+            return ultra_btmleft, 1, 2
+        return ultra_btmleft, 2, 1
+
+    def storage_style(self, robot):
+        """
+        Return the line style of the storage area: solid and thick if a box
+        is being stored, dashed otherwise
+        """
+        if not(robot.storage_empty):
+            return {"linestyle": "-", "linewidth": 2}
+        return {"linestyle": "--", "linewidth": 1}
+
     def create_robot_body(self, robot):
         """
         Generate patches for robot's main body
         """
         body_patches = []
-        # Draw vertical rectangle if robot is in vertical direction
-        direction = robot.direction
-        bottomleft_body = robot.bottomleft
-        if direction in (UP, DOWN):
-            bottomleft_body = add_tuple(robot.center, (-int(WIDTH / 2), -HLENGTH))
-            rect = patches.Rectangle(
-                bottomleft_body, 4, 6, linewidth=1, edgecolor='black', facecolor='orange')
-        # Draw horizontal rectangle if robot is in horizontal direction
-        else:
-            bottomleft_body = add_tuple(robot.center, (-HLENGTH, -int(WIDTH / 2)))
-            rect = patches.Rectangle(
-                bottomleft_body, 6, 4, linewidth=1, edgecolor='black', facecolor='orange')
+        bottomleft_body, body_width, body_height = self.body_geometry(robot)
+        rect = patches.Rectangle(bottomleft_body, body_width, body_height,
+                                 linewidth=1, edgecolor='black', facecolor='orange')
         body_patches.append(rect)
         """
         # Draw a smaller blue rectangle to indicate the head
@@ -103,25 +152,16 @@ class InvisibleArtist:
         Generate patches for robot's other accessories, including
         ultrasonic field and box (if is being stored)
         """
-        direction = robot.direction
         # Create ultrasonic field patches
-        ultra_btmleft = (robot.ultrasonic[0] if direction in (RIGHT, DOWN)
-                    else robot.ultrasonic[1])
-        if direction in (LEFT, RIGHT):
-            ultra_field = patches.Rectangle(
-                ultra_btmleft, 1, 2, linewidth=1, facecolor='red')
-        else:
-            ultra_field = patches.Rectangle(
-                ultra_btmleft, 2, 1, linewidth=1, facecolor='red')
+        ultra_btmleft, ultra_width, ultra_height = self.ultrasonic_geometry(robot)
+        ultra_field = patches.Rectangle(
+            ultra_btmleft, ultra_width, ultra_height, linewidth=1, facecolor='red')
+
+        # Create stored box patches, bold if robot's storage are is not empty
+        storage_area = patches.Rectangle(
+            robot.storage, 4, 4, edgecolor='black', facecolor='none',
+            **self.storage_style(robot))
 
-        # Create stored box patches if robot's storage are is not empty
-        if not(robot.storage_empty):
-            storage_area = patches.Rectangle(
-                robot.storage, 4, 4, edgecolor='black', linewidth=2, facecolor='none')
-        else:
-            storage_area = patches.Rectangle(
-                robot.storage, 4, 4, edgecolor='black', linestyle="--", linewidth=1, facecolor='none')
-        
         # Create color sensor patches
         color_sensor = patches.Rectangle(robot.colorsensor, 1, 1, facecolor='blue')
         return [ultra_field, storage_area, color_sensor]
@@ -133,7 +173,7 @@ class InvisibleArtist:
         robot_patches = []
         robot_patches.extend(self.create_robot_body(robot))
         robot_patches.extend(self.create_robot_accessories(robot))
-        robot_patch_collection = PatchCollection(robot_patches, True, zorder=10)
+        robot_patch_collection = PatchCollection(robot_patches, match_original=True, zorder=10)
         self.surface.add_collection(robot_patch_collection)
 
     def clear_robot(self):
@@ -145,87 +185,58 @@ class InvisibleArtist:
 
     def draw_many_boxes(self, box_list):
         """
-        Draw all boxes's patch (using Patch Collection). Draw boxes with
+        Draw all boxes as one collection of squares. Draw boxes with
         target_barcode a bit diffrently
+        `box_list` can be a list of boxes or a BoxIndex
         """
-        box_patches = []
+        target = tuple(self.target_barcode)
+        squares = []
+        edgecolors = []
         for box in box_list:
-            bottomleft = box.bottomleft
-            square = patches.Rectangle(
-                bottomleft, 4, 4, linewidth=1, facecolor="lightgrey",
-                edgecolor="red" if box.barcode == self.target_barcode else "black")
-            box_patches.append(square)
+            x, y = box.bottomleft
+            squares.append(((x, y), (x + 4, y), (x + 4, y + 4), (x, y + 4)))
+            edgecolors.append("red" if tuple(box.barcode) == target else "black")
 
-        box_patch_collection = PatchCollection(box_patches, True)
-        self.background.add_collection(box_patch_collection)
+        box_collection = PolyCollection(squares, linewidths=1, facecolors="lightgrey",
+                                        edgecolors=edgecolors)
+        self.background.add_collection(box_collection)
 
     def draw_shelves(self):
         """
-        Hard-coding drawing shelves
+        Draw the shelves
         """
         shelf_patches = []
-        # Zone A Shelves
-        rect = patches.Rectangle(
-            (12, 12), 36, 12, linewidth=1, edgecolor='black', facecolor='none')
-        shelf_patches.append(rect)
-        rect = patches.Rectangle(
-            (12, 36), 36, 12, linewidth=1, edgecolor='black', facecolor='none')
-        shelf_patches.append(rect)
-        # Zone B Shelves
-        rect = patches.Rectangle(
-            (60, 12), 36, 12, linewidth=1, edgecolor='black', facecolor='none')
-        shelf_patches.append(rect)
-        rect = patches.Rectangle(
-            (60, 36), 36, 12, linewidth=1, edgecolor='black', facecolor='none')
-        shelf_patches.append(rect)
-        # Zone C Shelves
-        rect = patches.Rectangle(
-            (12, 60), 36, 12, linewidth=1, edgecolor='black', facecolor='none')
-        shelf_patches.append(rect)
-        rect = patches.Rectangle(
-            (12, 84), 36, 12, linewidth=1, edgecolor='black', facecolor='none')
-        shelf_patches.append(rect)
-        # Zone D Shelves
-        rect = patches.Rectangle(
-            (60, 60), 36, 12, linewidth=1, edgecolor='black', facecolor='none')
-        shelf_patches.append(rect)
-        rect = patches.Rectangle(
-            (60, 84), 36, 12, linewidth=1, edgecolor='black', facecolor='none')
-        shelf_patches.append(rect)
-
-        shelf_collection = PatchCollection(shelf_patches, True)
+        for x, y, width, height in self.layout.shelves:
+            rect = patches.Rectangle(
+                (x, y), width, height, linewidth=1, edgecolor='black', facecolor='none')
+            shelf_patches.append(rect)
+
+        shelf_collection = PatchCollection(shelf_patches, match_original=True)
         self.background.add_collection(shelf_collection)
 
     def draw_boundaries(self):
         """
-        Hard-coding drawing the area boundaries, excluding A,B,C,D beacon
+        Draw the area boundaries, excluding A,B,C,D beacon
         """
-        all_bound = patches.Rectangle((0, 0), 108, 108,
+        x_arena, y_arena, width, height = self.layout.arena
+        all_bound = patches.Rectangle((x_arena, y_arena), width, height,
                                       linewidth=2, edgecolor='green', facecolor='none')
         self.surface.add_patch(all_bound)
-        # Quad A imaginary bound
-        quad_bound = patches.Rectangle((8, 8), 43, 43, linestyle="--",
-                                       linewidth=1, edgecolor='green', facecolor='none')
-        self.surface.add_patch(quad_bound)
-        # Quad B imaginary bound
-        quad_bound = patches.Rectangle((59, 8), 43, 43, linestyle="--",
-                                       linewidth=1, edgecolor='green', facecolor='none')
-        self.surface.add_patch(quad_bound)
-        # Quad C imaginary bound
-        quad_bound = patches.Rectangle((8, 59), 43, 43, linestyle="--",
-                                       linewidth=1, edgecolor='green', facecolor='none')
-        self.surface.add_patch(quad_bound)
-        # Quad D imaginary bound
-        quad_bound = patches.Rectangle((59, 59), 43, 43, linestyle="--",
-                                       linewidth=1, edgecolor='green', facecolor='none')
-        self.surface.add_patch(quad_bound)
+        # Quads' imaginary bounds
+        for quad in self.layout.quads:
+            (x_min, x_max), (y_min, y_max) = quad.x_limit, quad.y_limit
+            quad_bound = patches.Rectangle((x_min, y_min), x_max - x_min, y_max - y_min,
+                                           linestyle="--", linewidth=1, edgecolor='green',
+                                           facecolor='none')
+            self.surface.add_patch(quad_bound)
 
     def draw_homebases(self):
         """
-        Hard-coding drawing the homebases A, B, C, D as circles
+        Draw the homebases A, B, C, D as circles
         """
-        for home_pos in HOME:
-            home_circle = patches.Circle(home_pos, 6, facecolor='lavender', edgecolor='violet')
+        for home_pos in self.layout.homes:
+            home_circle = patches.Circle(home_pos, HOME_RADIUS, facecolor='lavender',
+                                         edgecolor='violet')
             self.surface.add_patch(home_circle)
 
     def draw_many_rocks(self, rock_list):
@@ -239,7 +250,7 @@ class InvisibleArtist:
                 bottomleft, rock.size, rock.size, linewidth=1, facecolor="brown", edgecolor="black")
             rock_patches.append(square_rock)
 
-        rock_patch_collection = PatchCollection(rock_patches, True)
+        rock_patch_collection = PatchCollection(rock_patches, match_original=True)
         self.background.add_collection(rock_patch_collection)
 
     def clear_background(self):
@@ -256,25 +267,102 @@ class InvisibleArtist:
         Render the background, including the boxes and the shelves
         """
         self.clear_background()
+        # The cached background for blitting is out of date now
+        self.blit_background = None
         self.draw_many_boxes(box_list)
         self.draw_many_rocks(rock_list)
         self.draw_shelves()
         self.draw_boundaries()
         self.draw_homebases()
-        self.background.text(110, 110, "IPS info")
-        self.background.text(110, 100, "Simulation")
-        self.background.text(110, 95, "coordinates")
-        self.background.text(110, 80, "Distance to A")
-        self.background.text(110, 70, "Distance to C")
-        self.background.text(110, 60, "Distance to D")
-        self.background.text(110, 50, "Calculated")
-        self.background.text(110, 45, "coordinates")
+        for dy, heading in IPS_HEADINGS:
+            self.background.text(self.text_x, self.text_top + dy, heading)
+
+    def create_persistent_artists(self):
+        """
+        Create the robot's patches and the IPS texts once, to be moved around
+        by update_persistent_artists on every frame
+        """
+        self.robot_artists = {
+            "body": patches.Rectangle((0, 0), 4, 6, linewidth=1,
+                                      edgecolor='black', facecolor='orange'),
+            "ultrasonic": patches.Rectangle((0, 0), 2, 1, linewidth=1, facecolor='red'),
+            "storage": patches.Rectangle((0, 0), 4, 4, edgecolor='black', facecolor='none'),
+            "colorsensor": patches.Rectangle((0, 0), 1, 1, facecolor='blue'),
+        }
+        for artist in self.robot_artists.values():
+            artist.set_zorder(10)
+            artist.set_animated(True)
+            self.surface.add_patch(artist)
+        self.IPS_texts = [self.surface.text(self.text_x, self.text_top + dy, "", animated=True)
+                          for dy in IPS_TEXT_DY]
+
+    def update_persistent_artists(self, robot):
+        """
+        Move the robot's patches and rewrite the IPS texts for a new frame
+        """
+        artists = self.robot_artists
+        bottomleft_body, body_width, body_height = self.body_geometry(robot)
+        artists["body"].set_bounds(*bottomleft_body, body_width, body_height)
+        ultra_btmleft, ultra_width, ultra_height = self.ultrasonic_geometry(robot)
+        artists["ultrasonic"].set_bounds(*ultra_btmleft, ultra_width, ultra_height)
+        artists["storage"].set_xy(robot.storage)
+        style = self.storage_style(robot)
+        artists["storage"].set_linestyle(style["linestyle"])
+        artists["storage"].set_linewidth(style["linewidth"])
+        artists["colorsensor"].set_xy(robot.colorsensor)
+        for text, info in zip(self.IPS_texts, self.IPS_info(robot)):
+            text.set_text(info)
+
+    def draw_persistent_artists(self):
+        """
+        Draw the robot's patches and the IPS texts on top of the canvas
+        """
+        for artist in self.robot_artists.values():
+            self.surface.draw_artist(artist)
+        for text in self.IPS_texts:
+            self.surface.draw_artist(text)
+
+    def on_draw(self, event):
+        """
+        After a full redraw (first frame, new background, resized window),
+        cache the canvas without the robot, then draw the robot on top
+        """
+        canvas = self.fig.canvas
+        self.blit_background = canvas.copy_from_bbox(self.fig.bbox)
+        if self.robot_artists is not None:
+            self.draw_persistent_artists()
+
+    def blit_surface(self, robot):
+        """
+        Render the robot by restoring the cached background and only drawing
+        the robot's persistent artists on top of it
+        """
+        if self.robot_artists is None:
+            self.create_persistent_artists()
+        self.update_persistent_artists(robot)
+        canvas = self.fig.canvas
+        if self.blit_background is None:
+            # Full redraw, which caches the background through on_draw
+            canvas.draw()
+        else:
+            canvas.restore_region(self.blit_background)
+            self.draw_persistent_artists()
+        canvas.blit(self.fig.bbox)
 
     def render_surface(self, robot):
         """
         Render the surface, including the robot
         """
+        if self.blit:
+            self.blit_surface(robot)
+            return
         self.clear_robot()
         self.draw_robot(robot)
         self.clear_IPS()
-        self.write_IPS(robot)
\ No newline at end of file
+        self.write_IPS(robot)
+
+    def pause(self, interval):
+        """
+        Pause for `interval` seconds so the drawn frame can be seen
+        """
+        plt.pause(interval)
@@ -0,0 +1,29 @@
+"""
+My module for the Null Artist class, a frontend that draws nothing
+Used to run the simulation headless (no matplotlib) at full CPU speed
+"""
+
+
+class NullArtist:
+    """A null hand that pretends to draw Robots, Boxes, and Shelves"""
+
+    def __init__(self, target_barcode):
+        """
+        Intialize a null canvas. Nothing is imported or drawn
+        """
+        self.target_barcode = target_barcode
+
+    def render_background(self, box_list, rock_list):
+        """
+        Pretend to render the background
+        """
+
+    def render_surface(self, robot):
+        """
+        Pretend to render the surface
+        """
+
+    def pause(self, interval):
+        """
+        Do not wait at all, since there is nothing to look at
+        """
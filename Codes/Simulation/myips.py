@@ -0,0 +1,154 @@
+"""
+My module for the indoor positioning system (IPS): locating points from
+their ranges to beacons at the homes, by trilateration
+Subtracting the first beacon's circle equation from the others' leaves a
+linear system in (x, y) that only depends on where the beacons are, so its
+solver is computed once per set of beacons. With 3 beacons it is the exact
+solution, with 4 the least-squares one. Whole trajectories or grids of
+points are solved at once with NumPy, and range noise can be injected to
+make positioning-error maps of the arena
+Example (error maps of 3 and 4 beacons, with 0.5 inch range noise):
+    python myips.py --sigma 0.5 --trials 32 --plot ips_error.png
+"""
+
+import argparse
+import time
+import numpy as np
+from myconstants import HOME, ARENA
+
+
+class RangeNoise:
+    """
+    Noise model of the measured ranges: a range r is measured as
+    r + bias + a normal error of standard deviation (sigma + proportional * r)
+    """
+
+    def __init__(self, sigma=0.0, bias=0.0, proportional=0.0):
+        self.sigma = sigma
+        self.bias = bias
+        self.proportional = proportional
+
+    def apply(self, ranges, rng):
+        """
+        Return noisy measurements of an array of `ranges`, drawing from the
+        NumPy generator `rng`
+        """
+        spread = self.sigma + self.proportional * ranges
+        return ranges + self.bias + spread * rng.standard_normal(ranges.shape)
+
+
+class IPS:
+    """
+    Trilateration from the ranges to a set of beacons
+    """
+
+    def __init__(self, beacons):
+        """
+        Precompute the linear solver of the beacons (3 or more points, not
+        all on one line, else ValueError: no point could be told from its
+        mirror image across the line)
+        """
+        self.beacons = np.array(beacons, dtype=float)
+        first, others = self.beacons[0], self.beacons[1:]
+        # Row j: 2 (b_j - b_0) . p = r_0^2 - r_j^2 + |b_j|^2 - |b_0|^2
+        self.matrix = 2 * (others - first)
+        if np.linalg.matrix_rank(self.matrix) != 2:
+            raise ValueError(f"Beacons {beacons} can't locate points: "
+                             "there must be 3 or more, not all on one line")
+        self.offset = (others ** 2).sum(axis=1) - (first ** 2).sum()
+        # Exact inverse for 3 beacons, least squares for more
+        self.solver = np.linalg.pinv(self.matrix)
+        # The same solver as plain floats, to locate a single point fast
+        self.solver_rows = self.solver.tolist()
+        self.offset_list = self.offset.tolist()
+
+    def ranges(self, points):
+        """
+        Return the ranges from an array of points (..., 2) to each beacon,
+        as an array (..., number of beacons)
+        """
+        points = np.asarray(points, dtype=float)
+        return np.linalg.norm(points[..., np.newaxis, :] - self.beacons, axis=-1)
+
+    def solve(self, ranges):
+        """
+        Return the points (..., 2) located from an array of ranges
+        (..., number of beacons)
+        """
+        squared = np.asarray(ranges, dtype=float) ** 2
+        rhs = squared[..., :1] - squared[..., 1:] + self.offset
+        return rhs @ self.solver.T
+
+    def solve_one(self, ranges):
+        """
+        Return the point (x, y) located from the ranges of a single point,
+        without going through NumPy
+        """
+        first = ranges[0] ** 2
+        rhs = [first - r ** 2 + offset for r, offset in zip(ranges[1:], self.offset_list)]
+        return tuple(sum(weight * value for weight, value in zip(row, rhs))
+                     for row in self.solver_rows)
+
+    def locate(self, points, noise=None, rng=None):
+        """
+        Return where the IPS locates an array of points (..., 2), with the
+        ranges measured with `noise` (a RangeNoise) if given
+        """
+        ranges = self.ranges(points)
+        if noise is not None:
+            rng = np.random.default_rng() if rng is None else rng
+            ranges = noise.apply(ranges, rng)
+        return self.solve(ranges)
+
+    def error_map(self, noise=None, trials=1, seed=None, step=1, arena=ARENA):
+        """
+        Return the mean positioning error over `trials` noisy measurements
+        at every `step` inches of the arena (bottomleft x, y, width, height),
+        as an array indexed [x, y], along with the x and y values of its cells
+        """
+        x_arena, y_arena, width, height = arena
+        x_values = np.arange(x_arena, x_arena + width + 1, step)
+        y_values = np.arange(y_arena, y_arena + height + 1, step)
+        grid = np.stack(np.meshgrid(x_values, y_values, indexing="ij"), axis=-1).astype(float)
+        rng = np.random.default_rng(seed)
+        points = np.broadcast_to(grid, (trials,) + grid.shape)
+        errors = np.linalg.norm(self.locate(points, noise, rng) - grid, axis=-1)
+        return errors.mean(axis=0), x_values, y_values
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sigma", type=float, default=0.5,
+                        help="range noise standard deviation, in inches (default 0.5)")
+    parser.add_argument("--bias", type=float, default=0.0, help="range bias, in inches")
+    parser.add_argument("--proportional", type=float, default=0.0,
+                        help="extra standard deviation per inch of range")
+    parser.add_argument("--trials", type=int, default=32,
+                        help="noisy measurements per point (default 32)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--plot", metavar="FILE", help="save the error maps as an image")
+    args = parser.parse_args()
+
+    noise = RangeNoise(args.sigma, args.bias, args.proportional)
+    maps = []
+    print(f"{'beacons':<10}{'mean':>8}{'p95':>8}{'max':>8}{'ms':>9}")
+    # The beacons the IPS uses: the homes A, C and D, or all 4 homes
+    for title, ips in (("A, C, D", IPS((HOME[0], HOME[2], HOME[3]))), ("all 4", IPS(HOME))):
+        start = time.perf_counter()
+        errors, x_values, y_values = ips.error_map(noise, args.trials, args.seed)
+        elapsed = (time.perf_counter() - start) * 1000
+        maps.append((title, errors))
+        print(f"{title:<10}{errors.mean():>8.3f}{np.percentile(errors, 95):>8.3f}"
+              f"{errors.max():>8.3f}{elapsed:>9.1f}")
+
+    if args.plot:
+        import matplotlib.pyplot as plt
+        fig, axes = plt.subplots(1, len(maps), figsize=(6 * len(maps), 5))
+        vmax = max(errors.max() for _, errors in maps)
+        for axis, (title, errors) in zip(axes, maps):
+            image = axis.imshow(errors.T, origin="lower", vmin=0, vmax=vmax,
+                                extent=(x_values[0], x_values[-1], y_values[0], y_values[-1]))
+            axis.set_title(f"IPS error (inches), beacons {title}")
+            fig.colorbar(image, ax=axis)
+        fig.savefig(args.plot)
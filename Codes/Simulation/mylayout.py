@@ -0,0 +1,280 @@
+"""
+My module for warehouse layouts: the arena, its shelves, the homes (which
+are also the IPS beacons), the quads the fixed search order goes through,
+and the hallway zones rocks are put in
+Everything else (box rows, scan lines, the board's size) is derived from
+these, so the backend, the frontend and the simulator work on any layout
+STANDARD_LAYOUT is the competition field of myconstants, and
+generate_layout makes parametric warehouses of any number of shelf blocks
+"""
+
+import collections
+import math
+from myconstants import *
+from myips import IPS
+
+
+# Robot centers scan a shelf from this many inches off the shelf's edge
+SCAN_LINE_OFFSET = 5
+# Boxes are squares of this size
+BOX_SIZE = 4
+# Rocks stay this many inches off the arena's left and right edges
+ROCK_MARGIN = (7, 6)
+# Fewest inches a hallway can be across, for robots to scan from it and pass
+# each other
+MIN_HALLWAY = 2 * SCAN_LINE_OFFSET + 2
+
+
+class Quad(collections.namedtuple("Quad", ("start", "direction", "x_limit", "y_limit"))):
+    """
+    A quad of the fixed search order: where (and facing which way) its search
+    starts, and its x and y limits
+    """
+    __slots__ = ()
+
+    def contains(self, point):
+        """
+        Check if a point is in the quad
+        """
+        x, y = point
+        return (self.x_limit[0] <= x <= self.x_limit[1]
+                and self.y_limit[0] <= y <= self.y_limit[1])
+
+
+class Layout:
+    """
+    Layout class holding the geometry of a warehouse
+    """
+
+    def __init__(self, arena, shelves, homes, quads, vert_hallways, hori_hallways,
+                 num_rocks=NUM_ROCKS, home_exits=None):
+        """
+        `arena` and `shelves` are (bottomleft x, y, width, height), the
+        shelves all of the same size and inside the arena. `homes` are the 4
+        homes A, B, C, D
+        `quads` are Quad, in the fixed search order, each shelf in exactly
+        one of them
+        Rocks are put in zones (see RockFactory): a zone is an x range of
+        `vert_hallways` crossed with a y range of `hori_hallways`
+        `home_exits` are the points a robot leaving each home goes to
+        (escape_home), by default the start of the quad nearest to the home
+        Raise ValueError if the layout is not one the search can work on
+        """
+        self.arena = tuple(arena)
+        self.shelves = [tuple(shelf) for shelf in shelves]
+        self.homes = [tuple(home) for home in homes]
+        self.quads = [Quad(*quad) for quad in quads]
+        self.vert_hallways = [tuple(hallway) for hallway in vert_hallways]
+        self.hori_hallways = [tuple(hallway) for hallway in hori_hallways]
+        self.num_rocks = num_rocks
+        self.validate()
+        if home_exits is None:
+            home_exits = [self.quads[self.nearest_quad(home)].start for home in self.homes]
+        if len(home_exits) != len(self.homes):
+            raise ValueError("A layout needs an exit point for each home")
+        self.home_exits = [tuple(exit_point) for exit_point in home_exits]
+        self.zones = [[[vert_hallway, hori_hallway] for vert_hallway in self.vert_hallways]
+                      for hori_hallway in self.hori_hallways]
+
+        # The board spans the arena, and DISPLACEMENT more above and below it
+        # for the homes
+        x_arena, y_arena, width, height = self.arena
+        self.num_rows = x_arena + width
+        self.num_cols = y_arena + height + 2 * DISPLACEMENT
+
+        # Boxes sit along the bottom and the top edge of every shelf
+        _, _, shelf_width, shelf_height = self.shelves[0]
+        self.bottom_box_rows = frozenset(y for _, y, _, _ in self.shelves)
+        self.top_box_rows = frozenset(y + shelf_height - BOX_SIZE for _, y, _, _ in self.shelves)
+        regions = collections.defaultdict(list)
+        for x, y, _, _ in self.shelves:
+            for row in (y, y + shelf_height - BOX_SIZE):
+                regions[row].append((x, x + shelf_width - BOX_SIZE))
+        self.box_regions = {row: sorted(regions[row]) for row in sorted(regions)}
+
+        # Scan lines: under a shelf scanning right, over it scanning left
+        self.scan_length = shelf_width + 1
+        self.right_scan_rows = frozenset(y - SCAN_LINE_OFFSET for _, y, _, _ in self.shelves)
+        self.quad_rows = []
+        for quad in range(len(self.quads)):
+            rows = sorted({row for _, y, _, height in self.quad_shelves(quad)
+                           for row in (y - SCAN_LINE_OFFSET, y + height + SCAN_LINE_OFFSET)})
+            self.quad_rows.append(rows[::-1] if self.quads[quad].direction == DOWN else rows)
+
+        # The IPS ranges homes A, C and D
+        self.ips = IPS((self.homes[0], self.homes[2], self.homes[3]))
+
+    def validate(self):
+        """
+        Raise ValueError if the shelves, homes or quads don't make a layout
+        """
+        if not self.shelves:
+            raise ValueError("A layout needs shelves")
+        if len({(width, height) for _, _, width, height in self.shelves}) != 1:
+            raise ValueError("The shelves of a layout must all be of the same size")
+        x_arena, y_arena, arena_width, arena_height = self.arena
+        for shelf in self.shelves:
+            x, y, width, height = shelf
+            if not (x_arena <= x and x + width <= x_arena + arena_width
+                    and y_arena <= y and y + height <= y_arena + arena_height):
+                raise ValueError(f"Shelf {shelf} is not inside the arena")
+        if len(self.homes) != 4:
+            raise ValueError("A layout needs 4 homes, A, B, C, D")
+        if not self.quads:
+            raise ValueError("A layout needs quads")
+        num_quads = collections.Counter(shelf for quad in range(len(self.quads))
+                                        for shelf in self.quad_shelves(quad))
+        for shelf in self.shelves:
+            if num_quads[shelf] != 1:
+                raise ValueError(f"Shelf {shelf} is in {num_quads[shelf]} quads, not 1")
+
+    def __repr__(self):
+        return (f"Layout({self.arena[2]}x{self.arena[3]}, {len(self.shelves)} shelves, "
+                f"{len(self.quads)} quads)")
+
+    @property
+    def num_boxes(self):
+        """
+        Number of boxes on the shelves, 2 per shelf edge
+        """
+        return 2 * sum(len(regions) for regions in self.box_regions.values())
+
+    def quad_shelves(self, quad):
+        """
+        Return the shelves of a quad
+        """
+        x_limit, y_limit = self.quads[quad].x_limit, self.quads[quad].y_limit
+        return [shelf for shelf in self.shelves
+                if x_limit[0] <= shelf[0] <= x_limit[1] and y_limit[0] <= shelf[1] <= y_limit[1]]
+
+    def quad_at(self, point):
+        """
+        Return the number of the quad a point is in, or the number of quads if
+        it is in none (neutral hallway)
+        """
+        for number, quad in enumerate(self.quads):
+            if quad.contains(point):
+                return number
+        return len(self.quads)
+
+    def nearest_quad(self, point):
+        """
+        Return the number of the quad whose start is the nearest to a point
+        """
+        return min(range(len(self.quads)),
+                   key=lambda quad: math.dist(point, self.quads[quad].start))
+
+    def home_exit(self, point):
+        """
+        Return the exit point of the home at a point, or the start of the
+        quad nearest to it if there is no home there
+        """
+        if point in self.homes:
+            return self.home_exits[self.homes.index(point)]
+        return self.quads[self.nearest_quad(point)].start
+
+    def to_dict(self):
+        """
+        Convert to a JSON-friendly dict
+        """
+        return {
+            "arena": list(self.arena),
+            "shelves": [list(shelf) for shelf in self.shelves],
+            "homes": [list(home) for home in self.homes],
+            "quads": [{"start": list(quad.start), "direction": list(quad.direction),
+                       "x_limit": list(quad.x_limit), "y_limit": list(quad.y_limit)}
+                      for quad in self.quads],
+            "vert_hallways": [list(hallway) for hallway in self.vert_hallways],
+            "hori_hallways": [list(hallway) for hallway in self.hori_hallways],
+            "num_rocks": self.num_rocks,
+            "home_exits": [list(exit_point) for exit_point in self.home_exits],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Convert back from a dict made by to_dict
+        """
+        quads = [(tuple(quad["start"]), tuple(quad["direction"]), tuple(quad["x_limit"]),
+                  tuple(quad["y_limit"])) for quad in data["quads"]]
+        return cls(data["arena"], data["shelves"], data["homes"], quads,
+                   data["vert_hallways"], data["hori_hallways"], data["num_rocks"],
+                   data.get("home_exits"))
+
+
+# The competition field, with its hand-tuned quads, rock zones and home exits
+STANDARD_LAYOUT = Layout(ARENA, SHELVES, HOME,
+                         zip(QUAD_START, QUAD_START_DIRCT, QUAD_X_LIMIT, QUAD_Y_LIMIT),
+                         VERT_HALLWAY, HORI_HALLWAY, NUM_ROCKS, HOME_EXIT)
+
+
+def generate_layout(shelf_columns=2, shelf_rows=4, shelf_width=36, shelf_height=12,
+                    hallway_width=12, hallway_height=12, beacons=None, num_rocks=None):
+    """
+    Make a warehouse of `shelf_columns` x `shelf_rows` shelves, with
+    vertical hallways `hallway_width` across and horizontal ones
+    `hallway_height` across between them and around them
+    The 4 homes A, B, C, D (the IPS beacons) are `beacons`, by default just
+    outside of the arena's corners. There are `num_rocks` rocks, by default
+    as many per shelf as on the competition field
+    Each column of shelves makes 2 quads: its bottom half, searched upwards
+    from its bottom left, then its top half, searched downwards from its top
+    right. The default parameters give the competition field's shelves
+    """
+    if shelf_columns < 1 or shelf_rows < 2:
+        raise ValueError("A layout needs at least 1 column and 2 rows of shelves")
+    if min(hallway_width, hallway_height) < MIN_HALLWAY:
+        raise ValueError(f"Hallways must be at least {MIN_HALLWAY} inches across")
+    if shelf_width < 3 * BOX_SIZE or shelf_height < 2 * BOX_SIZE:
+        raise ValueError(f"Shelves must be at least {3 * BOX_SIZE}x{2 * BOX_SIZE} inches")
+    width = hallway_width + shelf_columns * (shelf_width + hallway_width)
+    height = hallway_height + shelf_rows * (shelf_height + hallway_height)
+    if beacons is None:
+        beacons = [(HOME_RADIUS, -HOME_RADIUS), (width - HOME_RADIUS, -HOME_RADIUS),
+                   (HOME_RADIUS, height + HOME_RADIUS),
+                   (width - HOME_RADIUS, height + HOME_RADIUS)]
+    if len(beacons) != 4:
+        raise ValueError("A layout needs 4 beacons, the homes A, B, C, D")
+    for x, y in beacons:
+        if not (0 <= x <= width and -DISPLACEMENT <= y <= height + DISPLACEMENT):
+            raise ValueError(f"Beacon {(x, y)} is off the board")
+
+    columns = [hallway_width + column * (shelf_width + hallway_width)
+               for column in range(shelf_columns)]
+    rows = [hallway_height + row * (shelf_height + hallway_height)
+            for row in range(shelf_rows)]
+    # Shelves in quad order, each quad's from the bottom up
+    shelves = []
+    quads = []
+    num_bottom = shelf_rows - shelf_rows // 2
+    for quad_rows, direction in ((rows[:num_bottom], UP), (rows[num_bottom:], DOWN)):
+        y_limit = (quad_rows[0] - SCAN_LINE_OFFSET,
+                   quad_rows[-1] + shelf_height + SCAN_LINE_OFFSET)
+        for x in columns:
+            if direction == UP:
+                start = (x, y_limit[0])
+            else:
+                start = (x + shelf_width + 1, y_limit[1])
+            x_limit = (x - SCAN_LINE_OFFSET, x + shelf_width + SCAN_LINE_OFFSET)
+            quads.append((start, direction, x_limit, y_limit))
+            shelves.extend((x, y, shelf_width, shelf_height) for y in quad_rows)
+
+    left_margin, right_margin = ROCK_MARGIN
+    vert_hallways = [(max(x - hallway_width, left_margin),
+                      min(x - 3, width - right_margin))
+                     for x in columns + [width]]
+    hori_hallways = [(y, y + shelf_height - 3) for y in rows]
+    if num_rocks is None:
+        num_rocks = NUM_ROCKS * len(shelves) // len(SHELVES)
+    return Layout((0, 0, width, height), shelves, beacons, quads, vert_hallways,
+                  hori_hallways, num_rocks)
+
+
+def scaled_layout(scale):
+    """
+    Make a warehouse about `scale` times the competition field's area, with
+    the same shelves and hallways in more blocks
+    """
+    factor = math.sqrt(scale)
+    return generate_layout(shelf_columns=max(round(2 * factor), 1),
+                           shelf_rows=max(round(4 * factor), 2))
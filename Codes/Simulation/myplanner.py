@@ -0,0 +1,241 @@
+"""
+My module for the grid path planner: A* over the robot's poses on the
+occupancy grid, producing the shortest obstacle-free route of forward
+steps and turns between two poses
+"""
+
+import hashlib
+from heapq import heappush, heappop
+import numpy as np
+from tuplemath import add_tuple, mult_tuple
+from myconstants import *
+from myrobot import Robot
+from myrecorder import STEP_FORWARD, TURN_RIGHT, TURN_LEFT
+
+
+# Directions in clockwise order, so turning right is +1 and turning left is -1
+DIRECTIONS = (UP, RIGHT, DOWN, LEFT)
+
+# Costs, in sixteenths of a second (all the timing constants are multiples of
+# it), so that the cheapest route is the quickest: a 1 inch step takes 5, a
+# 90 degree turn 16
+STEP_COST = round(STEP_TIME * 16)
+TURN_COST = round(TURN_TIME * 16)
+
+
+def turns_table(goal_d):
+    """
+    Tabulate the fewest turns from facing direction d, to face both the x
+    and the y direction (signs sx, sy) still to go, then goal_d if any
+    Return {(d, sx, sy): turns}
+    """
+    def turn_distance(d_from, d_to):
+        return min((d_from - d_to) % 4, (d_to - d_from) % 4)
+
+    table = {}
+    for d in range(4):
+        for sx in (-1, 0, 1):
+            for sy in (-1, 0, 1):
+                to_face = [DIRECTIONS.index(direction)
+                           for direction in ((sx, 0), (0, sy)) if direction != (0, 0)]
+                orders = [to_face, to_face[::-1]]
+                fewest = None
+                for order in orders:
+                    headings = [d] + order + ([] if goal_d is None else [goal_d])
+                    turns = sum(turn_distance(a, b) for a, b in zip(headings, headings[1:]))
+                    fewest = turns if fewest is None else min(fewest, turns)
+                table[(d, sx, sy)] = fewest
+    return table
+
+
+# Turns tables for each goal direction index, or None for any direction
+TURNS_TABLES = {goal_d: turns_table(goal_d) for goal_d in (None, 0, 1, 2, 3)}
+
+# Plans are cached by (occupancy grid, start pose, goal), across planners,
+# so repeated missions on the same layout never plan the same route twice
+PLAN_CACHE = {}
+PLAN_CACHE_SIZE = 4096
+
+
+class Planner:
+    """
+    Planner class to find routes for a backend's robot
+    The occupancy grid is the backend's static board (boxes and rocks), the
+    shelves and everything outside of the field and the homes. It is inflated
+    by the robot's footprint, so a pose is free if the whole robot fits there
+    The grids are rebuilt before planning whenever the static board changed
+    (see Backend.static_version), such as after a box was picked up
+    """
+
+    def __init__(self, backend):
+        """
+        Build the inflated occupancy grids of the backend's current board
+        """
+        self.backend = backend
+        self.build_grids()
+
+    def occupancy_grid(self):
+        """
+        Return the occupancy grid: a boolean array the shape of the board,
+        True where the robot must not be
+        """
+        backend = self.backend
+        layout = backend.layout
+        occupied = np.ones(backend.static_board.shape, dtype=bool)
+        x_arena, y_arena, width, height = layout.arena
+        occupied[x_arena:x_arena + width + 1,
+                 y_arena + DISPLACEMENT:y_arena + height + DISPLACEMENT + 1] = False
+        for x_home, y_home in layout.homes:
+            occupied[max(x_home - HOME_RADIUS, 0):x_home + HOME_RADIUS + 1,
+                     max(y_home - HOME_RADIUS + DISPLACEMENT, 0):
+                     y_home + HOME_RADIUS + DISPLACEMENT + 1] = False
+        for x, y, width, height in layout.shelves:
+            occupied[x:x + width + 1, y + DISPLACEMENT:y + height + DISPLACEMENT + 1] = True
+        occupied |= backend.static_board > 0
+        return occupied
+
+    def build_grids(self):
+        """
+        Inflate the occupancy grid by the robot's footprint in each direction
+        The robot can be centered at the board index (x, y) facing
+        DIRECTIONS[d] if free[4 * (x * num_y + y) + d] is True
+        """
+        self.static_version = self.backend.static_version
+        occupied = self.occupancy_grid()
+        self.grid_key = hashlib.md5(np.packbits(occupied).tobytes()).hexdigest()
+        self.shape = occupied.shape
+        num_x, num_y = self.shape
+        # Count the occupied cells of any window with an integral image of
+        # the grid, padded with occupied cells past the board's edges
+        pad = LENGTH
+        padded = np.pad(occupied, pad, constant_values=True)
+        integral = np.zeros((padded.shape[0] + 1, padded.shape[1] + 1), dtype=np.int32)
+        integral[1:, 1:] = padded.cumsum(axis=0).cumsum(axis=1)
+
+        free = []
+        probe = Robot()
+        probe_center = (num_x // 2, num_y // 2 - DISPLACEMENT)
+        for direction in DIRECTIONS:
+            # The robot's footprint relative to its center
+            probe.center = probe_center
+            probe.head = add_tuple(probe_center, mult_tuple(direction, HLENGTH))
+            x_slice, y_slice = self.backend.robot_footprint(probe)
+            x_start = x_slice.start - probe_center[0] + pad
+            y_start = y_slice.start - probe_center[1] - DISPLACEMENT + pad
+            x_stop = x_start + x_slice.stop - x_slice.start
+            y_stop = y_start + y_slice.stop - y_slice.start
+            window = (integral[x_stop:x_stop + num_x, y_stop:y_stop + num_y]
+                      - integral[x_start:x_start + num_x, y_stop:y_stop + num_y]
+                      - integral[x_stop:x_stop + num_x, y_start:y_start + num_y]
+                      + integral[x_start:x_start + num_x, y_start:y_start + num_y])
+            free.append(window == 0)
+        # Flattened to a list indexed by 4 * (x * num_y + y) + direction index,
+        # for a fast search
+        self.free = np.stack(free, axis=-1).ravel().tolist()
+
+    def is_free(self, point, direction):
+        """
+        Check if the robot fits centered at `point` facing `direction`
+        """
+        x, y = point[0], point[1] + DISPLACEMENT
+        num_x, num_y = self.shape
+        if not (0 <= x < num_x and 0 <= y < num_y):
+            return False
+        return self.free[4 * (x * num_y + y) + DIRECTIONS.index(direction)]
+
+    def plan(self, start, start_direction, goal, goal_direction=None):
+        """
+        Plan the shortest route from `start` facing `start_direction` to
+        `goal`, ending facing `goal_direction` if given
+        Return a list of (opcode, count) primitives, STEP_FORWARD count steps
+        or TURN_RIGHT/TURN_LEFT once, or None if the goal can't be reached
+        """
+        if self.static_version != self.backend.static_version:
+            self.build_grids()
+        key = (self.grid_key, start, start_direction, goal, goal_direction)
+        if key in PLAN_CACHE:
+            return PLAN_CACHE[key]
+        route = self.search(start, start_direction, goal, goal_direction)
+        if len(PLAN_CACHE) >= PLAN_CACHE_SIZE:
+            del PLAN_CACHE[next(iter(PLAN_CACHE))]
+        PLAN_CACHE[key] = route
+        return route
+
+    def search(self, start, start_direction, goal, goal_direction):
+        """
+        A* search over (position, direction) states, each encoded as
+        4 * (board index x * num_y + y) + direction index
+        """
+        goal_directions = DIRECTIONS if goal_direction is None else (goal_direction,)
+        if not (self.is_free(start, start_direction)
+                and any(self.is_free(goal, direction) for direction in goal_directions)):
+            return None
+        num_y = self.shape[1]
+        free = self.free
+        steps = [4 * (dx * num_y + dy) for dx, dy in DIRECTIONS]
+        x_goal, y_goal = goal[0], goal[1] + DISPLACEMENT
+        goal_d = None if goal_direction is None else DIRECTIONS.index(goal_direction)
+        turns_left = TURNS_TABLES[goal_d]
+
+        def heuristic(state):
+            """
+            Steps left, plus the fewest turns to face every direction the robot
+            still has to go in, and then the goal direction
+            """
+            x, y = divmod(state >> 2, num_y)
+            dx, dy = x_goal - x, y_goal - y
+            turns = turns_left[(state & 3, (dx > 0) - (dx < 0), (dy > 0) - (dy < 0))]
+            return (abs(dx) + abs(dy)) * STEP_COST + turns * TURN_COST
+
+        start_state = 4 * (start[0] * num_y + start[1] + DISPLACEMENT) \
+            + DIRECTIONS.index(start_direction)
+        goal_index = x_goal * num_y + y_goal
+        cost = {start_state: 0}
+        parent = {start_state: None}
+        frontier = [(heuristic(start_state), 0, start_state)]
+        while frontier:
+            _, negative_g, state = heappop(frontier)
+            g = -negative_g
+            if g > cost[state]:
+                continue
+            d = state & 3
+            if state >> 2 == goal_index and (goal_d is None or d == goal_d):
+                return self.to_primitives(state, parent)
+            ahead = state + steps[d]
+            right = state - d + (d + 1) % 4
+            left = state - d + (d - 1) % 4
+            for next_state, step_cost in ((ahead, STEP_COST), (right, TURN_COST),
+                                          (left, TURN_COST)):
+                if not free[next_state]:
+                    continue
+                next_g = g + step_cost
+                if next_g < cost.get(next_state, next_g + 1):
+                    cost[next_state] = next_g
+                    parent[next_state] = state
+                    # Ties go to the states nearer the goal
+                    heappush(frontier, (next_g + heuristic(next_state), -next_g, next_state))
+        return None
+
+    @staticmethod
+    def to_primitives(state, parent):
+        """
+        Walk the parents back from the goal state, and turn the route into
+        primitives, merging consecutive steps
+        """
+        states = []
+        while state is not None:
+            states.append(divmod(state, 4))
+            state = parent[state]
+        states.reverse()
+        route = []
+        for (index, d), (next_index, next_d) in zip(states, states[1:]):
+            if next_index != index:
+                if route and route[-1][0] == STEP_FORWARD:
+                    route[-1] = (STEP_FORWARD, route[-1][1] + 1)
+                else:
+                    route.append((STEP_FORWARD, 1))
+            elif next_d == (d + 1) % 4:
+                route.append((TURN_RIGHT, 1))
+            else:
+                route.append((TURN_LEFT, 1))
+        return route
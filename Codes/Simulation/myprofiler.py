@@ -0,0 +1,184 @@
+"""
+My module for profiling missions primitive by primitive
+A MissionProfiler instruments one Simulator: each profiled primitive and
+sequence is counted and timed, nested under the sequence that called it,
+along with the inches travelled and the turns made inside of it. The time
+spent updating the backend, rendering and pausing shows up as its own
+entries under the primitive that spent it
+Only the instrumented simulator's own methods get wrapped, so a simulator
+that is not profiled runs exactly the same code as before
+Example (report of a seeded mission, and its JSON dump):
+    python myprofiler.py --seed 3 --dump profile.json
+"""
+
+import argparse
+import functools
+import json
+import time
+from myscenario import Scenario
+
+
+# Simulator methods that get profiled
+PROFILED_SEQUENCES = ("search_entire_area", "search_fixed_order", "search_lines",
+                      "escape_home", "go_home", "robot_goto_point", "search_shelf",
+                      "backtrack_scanning", "scan_full_barcode", "circumvent_rock")
+PROFILED_PRIMITIVES = ("robot_forward", "robot_backward", "robot_turn_right",
+                       "robot_turn_left", "robot_pick_box", "robot_jump",
+                       "robot_jump_sideways")
+
+# Where the time of the primitives goes: (object attribute of the simulator,
+# method, entry name)
+PROFILED_SPLITS = (("backend", "update_digital_board", "backend update"),
+                   ("frontend", "render_surface", "render"),
+                   ("frontend", "render_background", "render"),
+                   ("frontend", "pause", "pause"))
+
+
+class ProfileNode:
+    """
+    Calls, time, inches and turns of one entry of the profile tree
+    """
+    __slots__ = ("name", "calls", "total", "inches", "turns", "children")
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.total = 0.0
+        self.inches = 0
+        self.turns = 0
+        self.children = {}
+
+    @property
+    def self_time(self):
+        """
+        Time spent in the entry itself, not in any profiled entry under it
+        """
+        return self.total - sum(child.total for child in self.children.values())
+
+    def to_dict(self):
+        """
+        Return the entry and everything under it as plain data
+        """
+        return {"name": self.name, "calls": self.calls, "total": self.total,
+                "self": self.self_time, "inches": self.inches, "turns": self.turns,
+                "children": [child.to_dict() for child in self.children.values()]}
+
+
+class MissionProfiler:
+    """
+    Profile tree of one simulator's mission
+    """
+
+    def __init__(self):
+        self.root = ProfileNode("mission")
+        self.simulator = None
+        # Open entries: (node, start time, steps and turns at the start)
+        self.stack = [(self.root, 0.0, 0, 0)]
+
+    def instrument(self, simulator):
+        """
+        Wrap the profiled methods of `simulator`, and of its backend and
+        frontend, on the instances only
+        """
+        self.simulator = simulator
+        for name in PROFILED_SEQUENCES + PROFILED_PRIMITIVES:
+            setattr(simulator, name, self.wrap(getattr(simulator, name), name))
+        for owner_name, method_name, name in PROFILED_SPLITS:
+            owner = getattr(simulator, owner_name)
+            setattr(owner, method_name, self.wrap(getattr(owner, method_name), name))
+
+    def wrap(self, method, name):
+        """
+        Return `method` profiled as the entry `name`
+        """
+        @functools.wraps(method)
+        def profiled(*args, **kwargs):
+            self.enter(name)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.exit()
+        return profiled
+
+    def enter(self, name):
+        """
+        Open an entry under the innermost open one
+        """
+        parent = self.stack[-1][0]
+        node = parent.children.get(name)
+        if node is None:
+            node = parent.children[name] = ProfileNode(name)
+        simulator = self.simulator
+        self.stack.append((node, time.perf_counter(), simulator.num_steps, simulator.num_turns))
+
+    def exit(self):
+        """
+        Close the innermost open entry
+        """
+        node, start, steps, turns = self.stack.pop()
+        simulator = self.simulator
+        node.calls += 1
+        node.total += time.perf_counter() - start
+        node.inches += simulator.num_steps - steps
+        node.turns += simulator.num_turns - turns
+
+    def to_dict(self):
+        """
+        Return the whole profile as plain data
+        """
+        profile = self.root.to_dict()
+        profile["total"] = sum(child.total for child in self.root.children.values())
+        profile["self"] = 0.0
+        profile["inches"] = self.simulator.num_steps
+        profile["turns"] = self.simulator.num_turns
+        return profile
+
+    def dump(self, path):
+        """
+        Write the profile into a JSON file
+        """
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=1)
+
+    def report(self):
+        """
+        Return the profile as a table, each entry indented under its caller
+        """
+        profile = self.to_dict()
+        mission_total = profile["total"] or 1.0
+        lines = [f"Mission: {profile['total'] * 1000:.1f} ms, {profile['inches']} inches, "
+                 f"{profile['turns']} turns",
+                 f"{'entry':<34}{'calls':>7}{'total ms':>10}{'self ms':>9}{'%':>7}"
+                 f"{'inches':>8}{'turns':>7}"]
+
+        def add_lines(entry, depth):
+            name = "  " * depth + entry["name"]
+            lines.append(f"{name:<34}{entry['calls']:>7}{entry['total'] * 1000:>10.2f}"
+                         f"{entry['self'] * 1000:>9.2f}"
+                         f"{100 * entry['total'] / mission_total:>6.1f}%"
+                         f"{entry['inches']:>8}{entry['turns']:>7}")
+            for child in entry["children"]:
+                add_lines(child, depth + 1)
+
+        for entry in profile["children"]:
+            add_lines(entry, 0)
+        return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    from mysimulator import Simulator
+
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the scenario")
+    parser.add_argument("--gui", action="store_true",
+                        help="profile the drawn mission instead of the headless one")
+    parser.add_argument("--dump", metavar="FILE", help="also write the profile as JSON")
+    args = parser.parse_args()
+
+    scenario = Scenario.generate(args.seed)
+    game = Simulator.from_scenario(scenario, headless=not args.gui, profile=True)
+    game.search_entire_area()
+    print(game.profiler.report())
+    if args.dump:
+        game.profiler.dump(args.dump)
@@ -0,0 +1,315 @@
+"""
+My module for recording missions into a compact binary log, and replaying
+them offline without re-running the mission
+
+Log format (little-endian):
+    Header: magic, version, start position, target barcode
+    Layout: all boxes (box tuple, barcode, wanted) and rocks (bottomleft, size),
+        then the warehouse (mylayout.Layout.to_dict) as length-prefixed JSON
+    Events: 1 byte opcode each, some followed by a small payload
+Movement is delta-encoded: a step or a turn is just its opcode, since the
+next pose can be derived from the previous one
+"""
+
+import json
+import mmap
+import struct
+from mylayout import Layout
+from myrobot import Robot
+from mybox import Box
+from myrock import Rock
+
+
+MAGIC = b"ENEDLOG"
+VERSION = 2
+
+HEADER = struct.Struct("<7sBhhBBBBH")  # magic, version, start x, y, barcode, num boxes
+BOX = struct.Struct("<hhhhBBBB?")       # box tuple, barcode, wanted
+NUM_ROCKS = struct.Struct("<H")
+ROCK = struct.Struct("<hhB")            # bottomleft x, y, size
+LAYOUT_SIZE = struct.Struct("<I")
+BOX_INDEX = struct.Struct("<H")
+SCANNED_BIT = struct.Struct("<b")
+
+# Event opcodes
+STEP_FORWARD = 0
+STEP_BACKWARD = 1
+TURN_RIGHT = 2
+TURN_LEFT = 3
+PICK = 4            # Followed by the picked box's index in the layout, or NO_BOX
+DETECTION = 5       # The ultrasonic detected something
+SCAN_BIT = 6        # Followed by the scanned color bit (-1 if nothing)
+
+# Index of a pick that found no box where it reached (the robot still
+# counts as loaded)
+NO_BOX = 0xFFFF
+
+# Events that make a new frame (change what is drawn)
+FRAME_EVENTS = (STEP_FORWARD, STEP_BACKWARD, TURN_RIGHT, TURN_LEFT, PICK)
+
+# A keyframe (full replay state) is kept every KEYFRAME_INTERVAL frames
+KEYFRAME_INTERVAL = 256
+
+
+class MissionRecorder:
+    """
+    Write the events of a mission into a binary log file
+    Usable as a context manager, which closes the log on the way out
+    """
+
+    def __init__(self, path, backend, start_pos, target_barcode):
+        """
+        Open the log file and write the header and the initial layout,
+        with the backend's warehouse
+        """
+        self.file = open(path, "wb")
+        box_list = backend.box_list
+        # Remember each box's index, to record which one gets picked
+        self.box_index = {id(box): index for index, box in enumerate(box_list)}
+        self.file.write(HEADER.pack(MAGIC, VERSION, *start_pos,
+                                    *target_barcode, len(box_list)))
+        for box in box_list:
+            self.file.write(BOX.pack(*box.box_tuple, *box.barcode, box.wanted))
+        self.file.write(NUM_ROCKS.pack(len(backend.rock_list)))
+        for rock in backend.rock_list:
+            self.file.write(ROCK.pack(*rock.bottomleft, rock.size))
+        layout = json.dumps(backend.layout.to_dict()).encode()
+        self.file.write(LAYOUT_SIZE.pack(len(layout)) + layout)
+
+    def record(self, opcode):
+        """
+        Record an event with no payload
+        """
+        self.file.write(bytes((opcode,)))
+
+    def record_many(self, opcode, count):
+        """
+        Record the same payload-less event `count` times in a row
+        """
+        self.file.write(bytes((opcode,)) * count)
+
+    def record_pattern(self, opcodes, count):
+        """
+        Record the same sequence of payload-less events `count` times in a row
+        """
+        self.file.write(bytes(opcodes) * count)
+
+    def record_pick(self, box):
+        """
+        Record that `box` was picked up, or that a pick found no box if it
+        is None
+        """
+        index = NO_BOX if box is None else self.box_index[id(box)]
+        self.file.write(bytes((PICK,)) + BOX_INDEX.pack(index))
+
+    def record_scanned_bit(self, bit):
+        """
+        Record a scanned color bit
+        """
+        self.file.write(bytes((SCAN_BIT,)) + SCANNED_BIT.pack(bit))
+
+    def close(self):
+        """
+        Flush and close the log file. Closing again does nothing
+        """
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class MissionReplay:
+    """
+    Read a mission log through a memory map, and rebuild the mission's state
+    at any frame. A frame is a step, a turn, or a pick
+    """
+
+    def __init__(self, path):
+        """
+        Map the log, read the layout and the warehouse, and index the frames
+        """
+        with open(path, "rb") as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, x_start, y_start, *barcode,
+         num_boxes) = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} mission log")
+        self.start_pos = (x_start, y_start)
+        self.target_barcode = tuple(barcode)
+
+        offset = HEADER.size
+        self.box_layout = []
+        for _ in range(num_boxes):
+            values = BOX.unpack_from(self.data, offset)
+            self.box_layout.append((values[0:4], values[4:8], values[8]))
+            offset += BOX.size
+        (num_rocks,) = NUM_ROCKS.unpack_from(self.data, offset)
+        offset += NUM_ROCKS.size
+        self.rock_layout = []
+        for _ in range(num_rocks):
+            x, y, size = ROCK.unpack_from(self.data, offset)
+            self.rock_layout.append(((x, y), size))
+            offset += ROCK.size
+        (layout_size,) = LAYOUT_SIZE.unpack_from(self.data, offset)
+        offset += LAYOUT_SIZE.size
+        self.layout = Layout.from_dict(json.loads(self.data[offset:offset + layout_size]))
+        offset += layout_size
+        self.events_offset = offset
+        self.index_frames()
+
+    def events(self, offset=None):
+        """
+        Iterate over (opcode, payload, offset of the next event) of the events,
+        starting at `offset` (default: first event)
+        """
+        data = self.data
+        offset = self.events_offset if offset is None else offset
+        end = len(data)
+        while offset < end:
+            opcode = data[offset]
+            if opcode == PICK:
+                (payload,) = BOX_INDEX.unpack_from(data, offset + 1)
+                size = 1 + BOX_INDEX.size
+            elif opcode == SCAN_BIT:
+                (payload,) = SCANNED_BIT.unpack_from(data, offset + 1)
+                size = 1 + SCANNED_BIT.size
+            else:
+                payload = None
+                size = 1
+            offset += size
+            yield opcode, payload, offset
+
+    def index_frames(self):
+        """
+        Count the frames and keep a keyframe every KEYFRAME_INTERVAL frames,
+        so seeking never replays more than KEYFRAME_INTERVAL events' worth
+        """
+        robot = self.start_robot()
+        picked = ()
+        # A keyframe: (offset of next event, center, head, storage_empty,
+        # picked box indexes)
+        self.keyframes = [(self.events_offset, robot.center, robot.head,
+                           robot.storage_empty, picked)]
+        self.num_frames = 0
+        for opcode, payload, next_offset in self.events():
+            if opcode not in FRAME_EVENTS:
+                continue
+            picked = self.apply(robot, opcode, payload, picked)
+            self.num_frames += 1
+            if self.num_frames % KEYFRAME_INTERVAL == 0:
+                self.keyframes.append((next_offset, robot.center, robot.head,
+                                       robot.storage_empty, picked))
+
+    def start_robot(self):
+        """
+        Make a robot at the mission's starting position
+        """
+        robot = Robot()
+        robot.set_robot_start(self.start_pos)
+        return robot
+
+    def apply(self, robot, opcode, payload, picked):
+        """
+        Apply a frame event to the robot, return the updated picked boxes
+        """
+        if opcode == STEP_FORWARD:
+            robot.step_forward()
+        elif opcode == STEP_BACKWARD:
+            robot.step_backward()
+        elif opcode == TURN_RIGHT:
+            robot.turn_right_90()
+        elif opcode == TURN_LEFT:
+            robot.turn_left_90()
+        elif opcode == PICK:
+            robot.store_box()
+            if payload != NO_BOX:
+                picked = picked + (payload,)
+        return picked
+
+    def seek(self, frame):
+        """
+        Rebuild the robot after `frame` frames (0 = starting state), starting
+        from the nearest keyframe before it
+        Return (robot, picked box indexes, offset of the next event)
+        """
+        frame = max(0, min(frame, self.num_frames))
+        keyframe_number = frame // KEYFRAME_INTERVAL
+        offset, center, head, storage_empty, picked = self.keyframes[keyframe_number]
+        robot = Robot()
+        robot.center = center
+        robot.head = head
+        if not storage_empty:
+            robot.store_box()
+        to_apply = frame - keyframe_number * KEYFRAME_INTERVAL
+        events = self.events(offset)
+        while to_apply:
+            opcode, payload, offset = next(events)
+            if opcode in FRAME_EVENTS:
+                picked = self.apply(robot, opcode, payload, picked)
+                to_apply -= 1
+        return robot, picked, offset
+
+    def state_at(self, frame):
+        """
+        Rebuild the state after `frame` frames (0 = starting state)
+        Return (robot, box_list, rock_list)
+        """
+        robot, picked, _ = self.seek(frame)
+        return robot, self.box_list(picked), self.rock_list()
+
+    def frames(self, start=0, end=None):
+        """
+        Iterate over (frame number, robot, picked box indexes) from frame
+        `start` to frame `end` (default: last frame), moving the same robot
+        one event at a time instead of seeking every frame
+        """
+        start = max(0, min(start, self.num_frames))
+        end = self.num_frames if end is None else min(end, self.num_frames)
+        robot, picked, offset = self.seek(start)
+        frame = start
+        yield frame, robot, picked
+        for opcode, payload, _ in self.events(offset):
+            if frame >= end:
+                break
+            if opcode in FRAME_EVENTS:
+                picked = self.apply(robot, opcode, payload, picked)
+                frame += 1
+                yield frame, robot, picked
+
+    def box_list(self, picked=()):
+        """
+        Make the list of boxes still on the shelves
+        """
+        box_list = []
+        for index, (box_tuple, barcode, wanted) in enumerate(self.box_layout):
+            if index in picked:
+                continue
+            box = Box(box_tuple, barcode)
+            box.wanted = wanted
+            box_list.append(box)
+        return box_list
+
+    def rock_list(self):
+        """
+        Make the list of rocks
+        """
+        return [Rock(bottomleft, size) for bottomleft, size in self.rock_layout]
+
+    def render(self, frontend, frame):
+        """
+        Draw the state after `frame` frames with any renderer that has
+        render_background and render_surface
+        """
+        robot, box_list, rock_list = self.state_at(frame)
+        frontend.render_background(box_list, rock_list)
+        frontend.render_surface(robot)
+        return robot
+
+    def close(self):
+        """
+        Unmap the log
+        """
+        self.data.close()
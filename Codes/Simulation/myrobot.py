@@ -4,10 +4,17 @@ A module containing Robot
 
 from tuplemath import *
 from myconstants import *
+from mytrace import TRACER, DEBUG, DETECTION
 
 
 class Robot:
     """Robot class"""
+    # Compact state: a pose (center, head), the storage state, and the
+    # pose-derived geometry, which is computed once per pose change
+    __slots__ = ("_center", "_head", "storage_empty", "_geometry_valid",
+                 "_direction", "_rectangle_coor", "_bottomleft",
+                 "_ultrasonic", "_colorsensor", "_storage", "_color_beam")
+
     # Half-Length = length from center to head
     HLENGTH = 3 # Half length
     LENGTH = 2 * HLENGTH
@@ -22,26 +29,149 @@ class Robot:
 
         Also has attributes: head, storage, colorsensor, ultrasonic
         implemented through @propery decorator
+        Setting the center or the head invalidates the cached geometry
         """
         # A robot has a center and a head
         # Center indicates its position on board, and Head incates direction
         # Center and Head is always same row or same column
         # Head = Center + Direction * Half-Length
-        self.center = (0, 0)
-        self.head = add_tuple(self.center, mult_tuple(UP, HLENGTH))
+        self._center = (0, 0)
+        self._head = add_tuple(self._center, mult_tuple(UP, HLENGTH))
 
         # If the box is picked, the storage_empty will become False
         self.storage_empty = True
+        self.invalidate_geometry()
+
+    @property
+    def center(self):
+        """
+        The robot's position on the board
+        """
+        return self._center
+
+    @center.setter
+    def center(self, center):
+        self._center = center
+        self._geometry_valid = False
+
+    @property
+    def head(self):
+        """
+        The point HLENGTH in front of the center, in the robot's direction
+        """
+        return self._head
+
+    @head.setter
+    def head(self, head):
+        self._head = head
+        self._geometry_valid = False
+
+    def invalidate_geometry(self):
+        """
+        Mark the pose-derived geometry as stale after the pose changed
+        """
+        self._geometry_valid = False
 
+    def compute_geometry(self):
+        """
+        Compute and cache all pose-derived geometry of the current pose
+        Every coordinate is the center plus a precomputed offset of the direction
+        """
+        direction = self.compute_direction()
+        offsets = POSE_OFFSETS[direction]
+        x_center, y_center = self._center
+        self._direction = direction
+        self._rectangle_coor = [(x_center + dx, y_center + dy)
+                                for dx, dy in offsets["rectangle_coor"]]
+        dx, dy = offsets["bottomleft"]
+        self._bottomleft = (x_center + dx, y_center + dy)
+        self._ultrasonic = [(x_center + dx, y_center + dy)
+                            for dx, dy in offsets["ultrasonic"]]
+        dx, dy = offsets["colorsensor"]
+        self._colorsensor = (x_center + dx, y_center + dy)
+        dx, dy = offsets["storage"]
+        self._storage = (x_center + dx, y_center + dy)
+        dx, dy_start, dy_stop, reverse = offsets["color_beam"]
+        self._color_beam = (x_center + dx, y_center + dy_start,
+                            y_center + dy_stop, reverse)
+        self._geometry_valid = True
+
+    def derive_geometry(self):
+        """
+        Derive all pose-derived geometry from scratch, walking around the body
+        Used to build the per-direction offset tables
+        """
+        self._direction = self.compute_direction()
+        self._rectangle_coor = self.compute_rectangle_coor()
+        self._bottomleft = self._rectangle_coor[BTMLEFT_INDEX[self._direction]]
+        self._ultrasonic = self.compute_ultrasonic()
+        self._colorsensor = self.compute_colorsensor()
+        self._storage = self.compute_storage()
+        self._color_beam = self.compute_color_beam()
+        self._geometry_valid = True
 
     @property # Property decorator to turn into class attribute
     def direction(self):
+        """
+        The robot's current direction
+        """
+        if not self._geometry_valid:
+            self.compute_geometry()
+        return self._direction
+
+    @property
+    def rectangle_coor(self):
+        """
+        The coordinates of 4 rectangle corners:
+        (right-of-head, right-of-tail, left-of-tail, left-of-head)
+        """
+        if not self._geometry_valid:
+            self.compute_geometry()
+        return self._rectangle_coor
+
+    @property
+    def bottomleft(self):
+        """
+        Bottom left coordinate of robot
+        """
+        if not self._geometry_valid:
+            self.compute_geometry()
+        return self._bottomleft
+
+    @property
+    def ultrasonic(self):
+        """
+        The 2 top coordinates of the ultrasonic vision field
+        """
+        if not self._geometry_valid:
+            self.compute_geometry()
+        return self._ultrasonic
+
+    @property
+    def colorsensor(self):
+        """
+        The color sensor coordinates
+        """
+        if not self._geometry_valid:
+            self.compute_geometry()
+        return self._colorsensor
+
+    @property
+    def storage(self):
+        """
+        The bottom left coordinate of the robot's storage area
+        """
+        if not self._geometry_valid:
+            self.compute_geometry()
+        return self._storage
+
+    def compute_direction(self):
         """
         Deduct the robot's current direction based on relationship
         between center's and head's coordinates
         """
         # Calculate self.head[row] - self.center[row] and self.head[col] - self.center[col]
-        subtracted = sub_tuple(self.head, self.center)
+        subtracted = sub_tuple(self._head, self._center)
         x_diff, y_diff = subtracted
         # If y_diff = 0, meaning Robot is on horizontal direction
         if y_diff == 0:
@@ -50,21 +180,20 @@ class Robot:
         if x_diff == 0:
             return UP if (y_diff > 0) else DOWN
 
-    @property
-    def rectangle_coor(self):
+    def compute_rectangle_coor(self):
         """
         Derive the coordinates of 4 rectangle corners using center and head
         """
         # `Move` the head in a clockwise manner, we will have 4 coordinates sequentially:
         # (right-of-head, right-of-tail, left-of-tail, left-of-head)
-        current_direction = self.direction
+        current_direction = self._direction
         # First go clockwise WIDTH/2 inch from the head to get right-of-head
         # Second go clockwise LENGTH inch (robot's body length) to get right-of-tail
         # Third, go clockwise WIDTH inch (robot's width) to get left-of-tail
         # Fourth, go clockwise LENGTH inch (robot's body length) to get left-of-head
         displacement = (int(WIDTH / 2), LENGTH, WIDTH, LENGTH)
         robot_corners = []
-        corner_coor = self.head
+        corner_coor = self._head
         for d in displacement:
             next_clockwise_direction = CLOCKWISE[current_direction]
             corner_coor = add_tuple(
@@ -73,26 +202,15 @@ class Robot:
             current_direction = next_clockwise_direction
         return robot_corners
 
-    @property
-    def bottomleft(self):
-        """
-        Return bottom left coordinate of robot
-        """
-        rectangle_coor = self.rectangle_coor
-        direction = self.direction
-        bottomleft_index = BTMLEFT_INDEX[direction]
-        return rectangle_coor[bottomleft_index]
-
-    @property
-    def ultrasonic(self):
+    def compute_ultrasonic(self):
         """
         Generate representation of robot's ultrasonic vision, which includes
         a 1x2 rectangular field in front of storage area (1 inch in front of head)
         (Actually will create a 2x2 field but will only draw the top part)
         Returns the bottom left coordinate of this field
         """
-        rectangle_coor = self.rectangle_coor
-        direction = self.direction
+        rectangle_coor = self._rectangle_coor
+        direction = self._direction
         right_of_head = rectangle_coor[0]
         right_of_ultra_bottom = add_tuple(
             right_of_head, COUNTER_CLOCKWISE[direction])
@@ -109,15 +227,14 @@ class Robot:
         ultra_coor = list((right_of_ultra_top, left_of_ultra_top))
         return ultra_coor
 
-    @property
-    def colorsensor(self):
+    def compute_colorsensor(self):
         """
         Generate color sensor coordinates
         Color sensor is depicted by 1 point at the left-of-head position
         """
         # Colorsensor is a point at the left-of-head
-        direction = self.direction
-        bottomleft_body = self.bottomleft
+        direction = self._direction
+        bottomleft_body = self._bottomleft
         if direction == UP:
             return add_tuple(bottomleft_body, (0, LENGTH))
         if direction == DOWN:
@@ -129,14 +246,13 @@ class Robot:
             # the -1 is a hard-coded value since color sensor is of width/height 1
             return add_tuple(bottomleft_body, (-1, 0))
 
-    @property
-    def storage(self):
+    def compute_storage(self):
         """
         Return the bottom left coordinate of the robot's storage area, which
         is a 4x4 field not exceeding of the head
         """
-        direction = self.direction
-        bottomleft_body = self.bottomleft
+        direction = self._direction
+        bottomleft_body = self._bottomleft
         # The 2s below are hard-coded values
         if direction == UP:
             return add_tuple(bottomleft_body, (0, 2))
@@ -147,22 +263,17 @@ class Robot:
         else:
             return add_tuple(bottomleft_body, (0, 0))
 
-    @property
-    def quad(self):
-        """
-        Determine quad number from coordinates:
-        """
-        x_robot, y_robot = self.center
-        # print("Getting quad num", end=". ")
-        # print(f"Center: {self.center}", end=". ")
-        for quad in range(4):
-            x_limit = QUAD_X_LIMIT[quad]
-            y_limit = QUAD_Y_LIMIT[quad]
-            if x_limit[0] <= x_robot <= x_limit[1] and y_limit[0] <= y_robot <= y_limit[1]:
-                print(f"Quad {quad}")
-                return quad
-        print("Quad 4")
-        return 4  # return 4 otherwise (neutral hallway)
+    def compute_color_beam(self):
+        """
+        Return the color beam of length 7 shot from the color sensor, as
+        (x, first y, last y + 1, reverse) indices on the 2D array
+        The beam shoots up if the robot is UP, and down otherwise
+        """
+        x_color, y_color = self._colorsensor
+        y_color += DISPLACEMENT  # DISPLACEMENT = 12: diff between Python and matplot
+        if self._direction == UP:
+            return (x_color, y_color + 1, y_color + 8, False)
+        return (x_color, y_color - 7, y_color, True)
 
     def get_dodging_direction(self):
         """
@@ -180,8 +291,9 @@ class Robot:
         Make robot step forward 1 step toward current direcion
         """
         current_direction = self.direction
-        self.center = add_tuple(self.center, current_direction)
-        self.head = add_tuple(self.head, current_direction)
+        self._center = add_tuple(self._center, current_direction)
+        self._head = add_tuple(self._head, current_direction)
+        self.invalidate_geometry()
 
     def step_backward(self):
         """
@@ -189,8 +301,27 @@ class Robot:
         """
         # Backward direction = current_direction * (-1)
         reversed_direction = rev(self.direction)
-        self.center = add_tuple(self.center, reversed_direction)
-        self.head = add_tuple(self.head, reversed_direction)
+        self._center = add_tuple(self._center, reversed_direction)
+        self._head = add_tuple(self._head, reversed_direction)
+        self.invalidate_geometry()
+
+    def move_forward(self, numsteps):
+        """
+        Make robot jump `numsteps` steps toward current direction at once,
+        same as calling step_forward `numsteps` times
+        """
+        dx, dy = self.direction
+        x_center, y_center = self._center
+        x_head, y_head = self._head
+        self._center = (x_center + dx * numsteps, y_center + dy * numsteps)
+        self._head = (x_head + dx * numsteps, y_head + dy * numsteps)
+        self.invalidate_geometry()
+
+    def move_backward(self, numsteps):
+        """
+        Make robot jump `numsteps` steps against current direction at once
+        """
+        self.move_forward(-numsteps)
 
     def turn_right_90(self):
         """
@@ -198,7 +329,8 @@ class Robot:
         """
         current_direction = self.direction
         next_direction = CLOCKWISE[current_direction]
-        self.head = add_tuple(self.center, mult_tuple(next_direction, HLENGTH))
+        self._head = add_tuple(self._center, mult_tuple(next_direction, HLENGTH))
+        self.invalidate_geometry()
 
     def turn_left_90(self):
         """
@@ -206,7 +338,8 @@ class Robot:
         """
         current_direction = self.direction
         next_direction = COUNTER_CLOCKWISE[current_direction]
-        self.head = add_tuple(self.center, mult_tuple(next_direction, HLENGTH))
+        self._head = add_tuple(self._center, mult_tuple(next_direction, HLENGTH))
+        self.invalidate_geometry()
 
     def ultrasonic_detection(self, field):
         """
@@ -216,7 +349,9 @@ class Robot:
         for point in self.ultrasonic:
             x, y = point
             if field[x][y + DISPLACEMENT] > 0:  # Emtpy spaces will be encoded as 0 in the field
-                print(f"{x},{y} detected {field[x][y + DISPLACEMENT]}")
+                if TRACER.detection:
+                    TRACER.trace(DETECTION, DEBUG, "{x},{y} detected {value}",
+                                 x=x, y=y, value=field[x][y + DISPLACEMENT])
                 return True
         return False
 
@@ -225,16 +360,16 @@ class Robot:
         The color sensor can only scan one quare at a time
         Therefore, the 1/4th barcode returned will the of the same x-coor as the color sensor
         """
-        direction = self.direction
-        x_color, y_color = self.colorsensor
-        x_to_scan = x_color
-        for i in range(1, 8, 1):  # Shoot a color beam of length 7 to detect barcode color (if any)
-            if direction == UP:
-                y_to_scan = y_color + i + DISPLACEMENT # DISPLACEMENT = 12: diff between Python and matplot
-            else:
-                y_to_scan = y_color - i + DISPLACEMENT
-            if 0 < field[x_to_scan][y_to_scan] < 10:
-                return field[x_to_scan][y_to_scan]
+        if not self._geometry_valid:
+            self.compute_geometry()
+        # Read the whole color beam of length 7 at once, nearest cell first
+        x_to_scan, y_start, y_stop, reverse = self._color_beam
+        beam = field[x_to_scan][y_start:y_stop]
+        if reverse:
+            beam = beam[::-1]
+        for value in beam:
+            if 0 < value < 10:
+                return int(value)
         return -1  # Meaning no barcode detected
 
     def store_box(self):
@@ -249,8 +384,34 @@ class Robot:
         given the game inputted starting position
         """
         self.center = start_pos
-        if start_pos == (6, -6) or start_pos == (102, -6):
+        # Homes below the arena face up into it, the ones above face down
+        if start_pos[1] < 0:
             start_direction = UP
         else:
             start_direction = DOWN
         self.head = add_tuple(self.center, mult_tuple(start_direction, HLENGTH))
+
+
+def generate_pose_offsets():
+    """
+    Precompute, for each direction, the offsets from the robot's center of its
+    body corners, bottom left, ultrasonic cells, color sensor, color beam and
+    storage, by deriving them once for a robot centered at (0, 0)
+    """
+    pose_offsets = {}
+    robot = Robot()
+    for direction in (UP, DOWN, LEFT, RIGHT):
+        robot.center = (0, 0)
+        robot.head = mult_tuple(direction, HLENGTH)
+        robot.derive_geometry()
+        pose_offsets[direction] = {
+            "rectangle_coor": tuple(robot.rectangle_coor),
+            "bottomleft": robot.bottomleft,
+            "ultrasonic": tuple(robot.ultrasonic),
+            "colorsensor": robot.colorsensor,
+            "storage": robot.storage,
+            "color_beam": robot._color_beam,
+        }
+    return pose_offsets
+
+POSE_OFFSETS = generate_pose_offsets()
@@ -3,7 +3,7 @@ Module for Rock class and RockFactory
 """
 
 import random
-from myconstants import VERT_HALLWAY, HORI_HALLWAY, ZONES
+from mylayout import STANDARD_LAYOUT
 
 
 class Rock:
@@ -24,31 +24,33 @@ class RockFactory:
     Comprises of methods to generate rocks
     """
     
-    def randomize_rocks(self, num_rocks: int) -> list:
+    def randomize_rocks(self, num_rocks: int, rng=random, layout=STANDARD_LAYOUT) -> list:
         """
-        Generate a `num_rocks` amount of rocks
+        Generate a `num_rocks` amount of rocks in the hallway zones of
+        `layout`, drawing from `rng` (the global `random` by default)
         """
+        vert_hallways, hori_hallways = layout.vert_hallways, layout.hori_hallways
         rocklist = []
         # Num_rocks_per_zone to ensure not too many rocks in one zone
-        num_rocks_per_zone = [[0 for _ in range(len(VERT_HALLWAY))] for _ in range(len(HORI_HALLWAY))]
+        num_rocks_per_zone = [[0 for _ in range(len(vert_hallways))] for _ in range(len(hori_hallways))]
         for _ in range(num_rocks):
             # Randomize a size
-            random_size = random.randint(2, 3)
+            random_size = rng.randint(2, 3)
             # Choose a vertical hallway to be in, but making sure
             # not choosing the same zone too many times
             # A vertical hallway should only have (num_rocks/2) rocks
             while True:
                 # Choose a zone
-                index_vert = random.randrange(0, len(VERT_HALLWAY))
-                index_hori = random.randrange(0, len(HORI_HALLWAY))
+                index_vert = rng.randrange(0, len(vert_hallways))
+                index_hori = rng.randrange(0, len(hori_hallways))
                 if (num_rocks_per_zone[index_hori][index_vert] == 0):
                     num_rocks_per_zone[index_hori][index_vert] += 1
                     break
             # Randomize x and y in the chosen zone
-            x_limit = ZONES[index_hori][index_vert][0]
-            y_limit = ZONES[index_hori][index_vert][1]
-            random_x = random.randint(*x_limit)
-            random_y = random.randint(*y_limit)
+            x_limit = layout.zones[index_hori][index_vert][0]
+            y_limit = layout.zones[index_hori][index_vert][1]
+            random_x = rng.randint(*x_limit)
+            random_y = rng.randint(*y_limit)
 
             # Create a rock
             temp = Rock((random_x, random_y), random_size)
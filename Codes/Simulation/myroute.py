@@ -0,0 +1,391 @@
+"""
+My module for optimizing the order the shelf lines get scanned in
+Each shelf scan line is a job with an entry pose (where search_shelf starts,
+facing the shelf) and an exit point (the hallway point search_shelf ends at).
+The visiting order minimizes the travel from the home to the first entry
+and from each exit to the next entry, in simulated steps (steps and turns).
+That is the length of a full sweep, not the expected time to find a box, so
+the simulator keeps the fixed quad order by default
+Example (comparison report against the fixed quad order):
+    python myroute.py --seeds 100
+"""
+
+import argparse
+import numpy as np
+from tuplemath import add_tuple, mult_tuple
+from myconstants import *
+from mybackend import Backend
+from myplanner import Planner, TURNS_TABLES, DIRECTIONS, STEP_COST, TURN_COST
+from myrecorder import STEP_FORWARD
+from myscenario import Scenario
+from mylayout import STANDARD_LAYOUT, SCAN_LINE_OFFSET
+
+
+# How far past the end of a scan (a shelf's width + 1) the hallway point is
+# (see search_shelf)
+HALLWAY_STEP = 2
+
+# Up to this many lines the order is exact (Held-Karp), past it heuristic,
+# and past HEURISTIC_LIMIT (large warehouses) only nearest neighbour
+EXACT_LIMIT = 16
+HEURISTIC_LIMIT = 200
+
+# Visiting orders, cached by (layout, shelves, start home)
+ORDER_CACHE = {}
+
+
+class ScanLine:
+    """
+    A shelf scan line: where scanning starts and ends
+    """
+
+    def __init__(self, entry, direction, exit_point, scan_direction):
+        """
+        `entry` and `direction`: pose to start search_shelf in
+        `exit_point` and `scan_direction`: where search_shelf ends, facing
+        """
+        self.entry = entry
+        self.direction = direction
+        self.exit_point = exit_point
+        self.scan_direction = scan_direction
+
+    def __repr__(self):
+        return f"ScanLine({self.entry}, {self.direction} -> {self.exit_point})"
+
+
+def scan_lines(shelves=STANDARD_LAYOUT.shelves):
+    """
+    Make the 2 scan lines of every shelf: under it facing up and scanning
+    right, and over it facing down and scanning left
+    """
+    lines = []
+    for x, y, width, height in shelves:
+        for entry, direction in (((x, y - SCAN_LINE_OFFSET), UP),
+                                 ((x + width + 1, y + height + SCAN_LINE_OFFSET), DOWN)):
+            # search_shelf scans clockwise of the direction it faces
+            scan_direction = CLOCKWISE[direction]
+            x_end = add_tuple(entry, mult_tuple(scan_direction, width + 1))
+            exit_point = add_tuple(x_end, mult_tuple(scan_direction, HALLWAY_STEP))
+            lines.append(ScanLine(entry, direction, exit_point, scan_direction))
+    return lines
+
+
+def route_length(route):
+    """
+    Cost of a planned route's steps and turns, in sixteenths of a second
+    (see myplanner)
+    """
+    return sum(count * (STEP_COST if opcode == STEP_FORWARD else TURN_COST)
+               for opcode, count in route)
+
+
+def estimated_cost(start, start_direction, goal, goal_direction):
+    """
+    Lower bound of the travel between two poses: Manhattan distance plus
+    the fewest turns, ignoring obstacles
+    """
+    dx, dy = goal[0] - start[0], goal[1] - start[1]
+    turns = TURNS_TABLES[DIRECTIONS.index(goal_direction)][
+        (DIRECTIONS.index(start_direction), (dx > 0) - (dx < 0), (dy > 0) - (dy < 0))]
+    return (abs(dx) + abs(dy)) * STEP_COST + turns * TURN_COST
+
+
+# estimated_cost's turns as an array indexed [goal direction index, direction
+# index, x sign + 1, y sign + 1]
+TURNS_ARRAY = np.array([[[[TURNS_TABLES[goal_d][(d, sx, sy)] for sy in (-1, 0, 1)]
+                          for sx in (-1, 0, 1)] for d in range(4)] for goal_d in range(4)])
+
+
+def estimated_costs(lines, start, start_direction):
+    """
+    travel_costs of estimates, for all the lines at once
+    """
+    entries = np.array([line.entry for line in lines])
+    entry_directions = np.array([DIRECTIONS.index(line.direction) for line in lines])
+
+    def costs_to_entries(points, directions):
+        delta = entries[np.newaxis] - points[:, np.newaxis]
+        signs = np.sign(delta) + 1
+        turns = TURNS_ARRAY[entry_directions[np.newaxis], directions[:, np.newaxis],
+                            signs[..., 0], signs[..., 1]]
+        return np.abs(delta).sum(axis=-1) * STEP_COST + turns * TURN_COST
+
+    start_costs = costs_to_entries(np.array([start]),
+                                   np.array([DIRECTIONS.index(start_direction)]))[0]
+    costs = costs_to_entries(np.array([line.exit_point for line in lines]),
+                             np.array([DIRECTIONS.index(line.scan_direction)
+                                       for line in lines])).astype(float)
+    np.fill_diagonal(costs, np.inf)
+    return start_costs.astype(float), costs
+
+
+def travel_costs(lines, start, start_direction, planner=None):
+    """
+    Return (costs from the start to each entry, costs from each exit to each
+    entry) as arrays. Costs are planned route lengths if a planner is given
+    (infinite if there is no route), else estimates
+    """
+    if planner is None:
+        return estimated_costs(lines, start, start_direction)
+
+    def cost(pose_from, direction_from, line):
+        route = planner.plan(pose_from, direction_from, line.entry, line.direction)
+        return np.inf if route is None else route_length(route)
+
+    start_costs = np.array([cost(start, start_direction, line) for line in lines], dtype=float)
+    costs = np.full((len(lines), len(lines)), np.inf)
+    for i, line_from in enumerate(lines):
+        for j, line_to in enumerate(lines):
+            if i != j:
+                costs[i, j] = cost(line_from.exit_point, line_from.scan_direction, line_to)
+    return start_costs, costs
+
+
+def exact_order(start_costs, costs):
+    """
+    Minimum-travel order visiting every line once (Held-Karp dynamic
+    programming over subsets, one subset size at a time)
+    Return (order, total cost)
+    """
+    num = len(start_costs)
+    full = (1 << num) - 1
+    # best[mask, j]: cheapest travel visiting the lines in `mask`, ending at j
+    best = np.full((1 << num, num), np.inf)
+    came_from = np.full((1 << num, num), -1, dtype=np.int8)
+    for j in range(num):
+        best[1 << j, j] = start_costs[j]
+    masks = np.arange(1 << num)
+    sizes = np.zeros(1 << num, dtype=np.int8)
+    for j in range(num):
+        sizes += (masks >> j) & 1
+    for size in range(1, num):
+        layer = masks[sizes == size]
+        for k in range(num):
+            without_k = layer[(layer >> k) & 1 == 0]
+            # Come to k from the best last line of each subset
+            candidates = best[without_k] + costs[:, k]
+            previous = candidates.argmin(axis=1)
+            cheapest = candidates[np.arange(len(without_k)), previous]
+            with_k = without_k | (1 << k)
+            better = cheapest < best[with_k, k]
+            best[with_k[better], k] = cheapest[better]
+            came_from[with_k[better], k] = previous[better]
+
+    last = int(best[full].argmin())
+    total = float(best[full, last])
+    order = []
+    mask = full
+    while last >= 0:
+        order.append(last)
+        mask, last = mask ^ (1 << last), int(came_from[mask, last])
+    order.reverse()
+    return order, total
+
+
+def order_cost(order, start_costs, costs):
+    """
+    Total travel of a visiting order
+    """
+    total = start_costs[order[0]]
+    for i, j in zip(order, order[1:]):
+        total += costs[i, j]
+    return float(total)
+
+
+def heuristic_order(start_costs, costs, num_starts=8):
+    """
+    Good visiting order for many lines: nearest neighbour from each of the
+    `num_starts` nearest first lines, each improved by reversing runs of
+    lines and by moving runs of 1 to 3 lines elsewhere while that shortens
+    the travel; the best one wins
+    Return (order, total cost)
+    """
+    best = None
+    for first in np.argsort(start_costs, kind="stable")[:num_starts]:
+        order, total = improved_order(int(first), start_costs, costs)
+        if best is None or total < best[1]:
+            best = (order, total)
+    return best
+
+
+def improved_order(first, start_costs, costs):
+    """
+    Nearest neighbour order starting from line `first`, then improved
+    Return (order, total cost)
+    """
+    num = len(start_costs)
+    unvisited = set(range(num))
+    current = first
+    order = [current]
+    unvisited.remove(current)
+    while unvisited:
+        current = min(unvisited, key=lambda j: costs[current, j])
+        order.append(current)
+        unvisited.remove(current)
+
+    # The order as a closed tour through an extra "depot" node, leaving to
+    # the first line at the start costs and coming back for free, so that
+    # every move is priced by the few edges it changes
+    depot = num
+    tour_costs = np.zeros((num + 1, num + 1))
+    tour_costs[:num, :num] = costs
+    tour_costs[depot, :num] = start_costs
+    tour_costs = tour_costs.tolist()
+    tour = [depot] + order + [depot]
+    while reverse_run(tour, tour_costs) or move_run(tour, tour_costs):
+        pass
+    order = tour[1:-1]
+    return order, order_cost(order, start_costs, costs)
+
+
+def reverse_run(tour, cost):
+    """
+    Reverse the first run of lines of the tour whose reversal shortens it
+    Return whether the tour changed
+    """
+    # Prefix sums of the tour's edges, walked forward and backward
+    forward, backward = [0.0], [0.0]
+    for a, b in zip(tour, tour[1:]):
+        forward.append(forward[-1] + cost[a][b])
+        backward.append(backward[-1] + cost[b][a])
+    for i in range(1, len(tour) - 2):
+        for j in range(i + 1, len(tour) - 1):
+            before, after = tour[i - 1], tour[j + 1]
+            old = cost[before][tour[i]] + forward[j] - forward[i] + cost[tour[j]][after]
+            new = cost[before][tour[j]] + backward[j] - backward[i] + cost[tour[i]][after]
+            if new < old:
+                tour[i:j + 1] = tour[i:j + 1][::-1]
+                return True
+    return False
+
+
+def move_run(tour, cost):
+    """
+    Move the first run of 1 to 3 lines that shortens the tour when moved
+    elsewhere
+    Return whether the tour changed
+    """
+    for length in (1, 2, 3):
+        for i in range(1, len(tour) - length):
+            before, after = tour[i - 1], tour[i + length]
+            first, last = tour[i], tour[i + length - 1]
+            saved = cost[before][first] + cost[last][after] - cost[before][after]
+            for k in range(len(tour) - 1):
+                if i - 1 <= k < i + length:
+                    continue
+                a, b = tour[k], tour[k + 1]
+                if cost[a][first] + cost[last][b] - cost[a][b] < saved:
+                    run = tour[i:i + length]
+                    del tour[i:i + length]
+                    position = k + 1 if k < i else k + 1 - length
+                    tour[position:position] = run
+                    return True
+    return False
+
+
+def nearest_order(start_costs, costs):
+    """
+    Nearest neighbour order from the nearest line, for very many lines
+    Return (order, total cost)
+    """
+    current = int(start_costs.argmin())
+    order = [current]
+    # Costs to the lines not visited yet
+    remaining = costs.copy()
+    remaining[:, current] = np.inf
+    for _ in range(len(start_costs) - 1):
+        current = int(remaining[current].argmin())
+        order.append(current)
+        remaining[:, current] = np.inf
+    return order, order_cost(order, start_costs, costs)
+
+
+def optimal_order(start_costs, costs):
+    """
+    Exact order for up to EXACT_LIMIT lines, heuristic up to HEURISTIC_LIMIT,
+    nearest neighbour past that
+    """
+    if len(start_costs) <= EXACT_LIMIT:
+        return exact_order(start_costs, costs)
+    if len(start_costs) <= HEURISTIC_LIMIT:
+        return heuristic_order(start_costs, costs)
+    return nearest_order(start_costs, costs)
+
+
+def home_direction(home):
+    """
+    Direction the robot starts in at a home (see Robot.set_robot_start)
+    """
+    return UP if home[1] < 0 else DOWN
+
+
+def empty_backend(layout=STANDARD_LAYOUT):
+    """
+    Backend of the bare field (shelves only, no boxes nor rocks), to plan the
+    order on regardless of where the rocks happen to be
+    """
+    return Backend(None, scenario=Scenario([], [], layout.homes[0], None, layout=layout))
+
+
+def visiting_order(start, shelves=None, layout=STANDARD_LAYOUT):
+    """
+    Return the scan lines of `shelves` (default: all the shelves of
+    `layout`) in minimum-travel order from the home `start`. Cached, since
+    it only depends on the arena
+    """
+    if shelves is None:
+        shelves = layout.shelves
+    key = (layout, tuple(shelves), start)
+    if key not in ORDER_CACHE:
+        lines = scan_lines(shelves)
+        planner = Planner(empty_backend(layout)) if len(lines) <= EXACT_LIMIT else None
+        start_costs, costs = travel_costs(lines, start, home_direction(start), planner)
+        order, _ = optimal_order(start_costs, costs)
+        ORDER_CACHE[key] = [lines[i] for i in order]
+    return ORDER_CACHE[key]
+
+
+def sweep_cost(home, visit_order, seed=None, target_barcode=(1, 1, 1, 1)):
+    """
+    Run a headless mission that finds nothing (so every line gets scanned)
+    and return its simulated steps (steps + turns)
+    """
+    from mysimulator import Simulator
+    game = Simulator(home, target_barcode, headless=True, seed=seed,
+                     visit_order=visit_order)
+    game.search_entire_area()
+    return game.num_steps + game.num_turns
+
+
+def mean_mission_cost(home, visit_order, seeds):
+    """
+    Mean simulated steps (steps + turns) of seeded headless missions
+    """
+    from mysimulator import Simulator
+    total = 0
+    for seed in seeds:
+        game = Simulator(home, BARCODE[seed % len(BARCODE)], headless=True,
+                         seed=seed, visit_order=visit_order)
+        game.search_entire_area()
+        total += game.num_steps + game.num_turns
+    return total / len(seeds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seeds", type=int, default=50,
+                        help="number of seeded missions per home (default 50)")
+    args = parser.parse_args()
+
+    seeds = range(args.seeds)
+    print(f"{'home':<12}{'':<14}{'fixed':>10}{'optimized':>12}{'saved':>9}")
+    for home in HOME:
+        order = visiting_order(home)
+        rows = (("full sweep", sweep_cost(home, "fixed", 0), sweep_cost(home, "optimized", 0)),
+                ("mean mission", mean_mission_cost(home, "fixed", seeds),
+                 mean_mission_cost(home, "optimized", seeds)))
+        for title, fixed, optimized in rows:
+            saved = 100 * (fixed - optimized) / fixed
+            print(f"{str(home):<12}{title:<14}{fixed:>10.1f}{optimized:>12.1f}{saved:>8.1f}%")
+        print(f"{'':<12}order: {[line.entry for line in order]}")
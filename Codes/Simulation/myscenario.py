@@ -0,0 +1,216 @@
+"""
+Module for Scenario: a complete, reproducible game setup (boxes, barcodes,
+rocks, starting home and target barcode) that can be saved, loaded, and
+packed by the thousands into a corpus file for batch runs
+A scenario is set in a warehouse layout (mylayout.Layout), the competition
+field unless given. Corpora only hold scenarios of the competition field
+"""
+
+import json
+import mmap
+import random
+import struct
+from myconstants import BARCODE
+from mybackend import Backend
+from mylayout import Layout, STANDARD_LAYOUT
+from mybox import Box
+from myrock import Rock, RockFactory
+
+
+# Packed corpus format (little-endian):
+#     Header: magic, version, number of scenarios
+#     Each scenario: seed (if any), start position, target barcode,
+#     number of boxes and rocks, then the boxes and the rocks
+CORPUS_MAGIC = b"ENEDSCEN"
+CORPUS_VERSION = 1
+CORPUS_HEADER = struct.Struct("<8sBI")
+SCENARIO = struct.Struct("<?qhhBBBBHH")  # has seed, seed, start, target, num boxes, rocks
+BOX = struct.Struct("<hhhhBBBB?")        # box tuple, barcode, wanted
+ROCK = struct.Struct("<hhB")             # bottomleft x, y, size
+
+
+class Scenario:
+    """
+    Scenario class holding everything needed to set up a game
+    """
+
+    def __init__(self, boxes, rocks, start_pos, target_barcode, seed=None,
+                 layout=STANDARD_LAYOUT):
+        """
+        `boxes` is a list of (box tuple, barcode, wanted),
+        `rocks` is a list of (bottomleft, size)
+        """
+        self.boxes = boxes
+        self.rocks = rocks
+        self.start_pos = start_pos
+        self.target_barcode = target_barcode
+        self.seed = seed
+        self.layout = layout
+
+    @classmethod
+    def generate(cls, seed, start_pos=None, target_barcode=None, layout=STANDARD_LAYOUT):
+        """
+        Generate a scenario from `seed`. The layout is the same one
+        Backend(target_barcode, seed, layout=layout) would generate. The
+        start home and the target barcode are also drawn from the seed if
+        not given
+        """
+        rng = random.Random(seed)
+        box_list = Backend.generate_all_boxes(target_barcode, rng, layout)
+        rock_list = RockFactory().randomize_rocks(layout.num_rocks, rng, layout)
+        if start_pos is None:
+            start_pos = rng.choice(layout.homes)
+        if target_barcode is None:
+            target_barcode = rng.choice(BARCODE)
+        boxes = [(box.box_tuple, box.barcode, box.barcode == target_barcode)
+                 for box in box_list]
+        rocks = [(rock.bottomleft, rock.size) for rock in rock_list]
+        return cls(boxes, rocks, start_pos, target_barcode, seed, layout)
+
+    @classmethod
+    def from_backend(cls, backend, start_pos, target_barcode, seed=None):
+        """
+        Capture the current layout of a backend as a scenario
+        """
+        boxes = [(box.box_tuple, box.barcode, box.wanted) for box in backend.box_list]
+        rocks = [(rock.bottomleft, rock.size) for rock in backend.rock_list]
+        return cls(boxes, rocks, start_pos, target_barcode, seed, backend.layout)
+
+    def make_boxes(self):
+        """
+        Make fresh Box objects of the scenario
+        """
+        box_list = []
+        for box_tuple, barcode, wanted in self.boxes:
+            box = Box(tuple(box_tuple), tuple(barcode))
+            box.wanted = wanted
+            box_list.append(box)
+        return box_list
+
+    def make_rocks(self):
+        """
+        Make fresh Rock objects of the scenario
+        """
+        return [Rock(tuple(bottomleft), size) for bottomleft, size in self.rocks]
+
+    def to_dict(self):
+        """
+        Convert to a JSON-friendly dict. The layout is only in it if it is
+        not the competition field
+        """
+        data = {
+            "seed": self.seed,
+            "start_pos": list(self.start_pos),
+            "target_barcode": list(self.target_barcode),
+            "boxes": [{"box_tuple": list(box_tuple), "barcode": list(barcode),
+                       "wanted": wanted} for box_tuple, barcode, wanted in self.boxes],
+            "rocks": [{"bottomleft": list(bottomleft), "size": size}
+                      for bottomleft, size in self.rocks],
+        }
+        if self.layout is not STANDARD_LAYOUT:
+            data["layout"] = self.layout.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Convert back from a dict made by to_dict
+        """
+        boxes = [(tuple(box["box_tuple"]), tuple(box["barcode"]), box["wanted"])
+                 for box in data["boxes"]]
+        rocks = [(tuple(rock["bottomleft"]), rock["size"]) for rock in data["rocks"]]
+        layout = Layout.from_dict(data["layout"]) if "layout" in data else STANDARD_LAYOUT
+        return cls(boxes, rocks, tuple(data["start_pos"]),
+                   tuple(data["target_barcode"]), data["seed"], layout)
+
+    def save(self, path):
+        """
+        Save as a JSON file
+        """
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=1)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load from a JSON file made by save
+        """
+        with open(path) as file:
+            return cls.from_dict(json.load(file))
+
+    def pack(self):
+        """
+        Pack into the corpus' binary format
+        """
+        if self.layout is not STANDARD_LAYOUT:
+            raise ValueError("Only scenarios of the competition field can be packed")
+        has_seed = self.seed is not None
+        chunks = [SCENARIO.pack(has_seed, self.seed if has_seed else 0,
+                                *self.start_pos, *self.target_barcode,
+                                len(self.boxes), len(self.rocks))]
+        for box_tuple, barcode, wanted in self.boxes:
+            chunks.append(BOX.pack(*box_tuple, *barcode, wanted))
+        for bottomleft, size in self.rocks:
+            chunks.append(ROCK.pack(*bottomleft, size))
+        return b"".join(chunks)
+
+    @classmethod
+    def unpack_from(cls, buffer, offset):
+        """
+        Unpack a scenario packed at `offset` of `buffer`
+        Return (scenario, offset right after it)
+        """
+        (has_seed, seed, x_start, y_start, *barcode,
+         num_boxes, num_rocks) = SCENARIO.unpack_from(buffer, offset)
+        offset += SCENARIO.size
+        boxes = []
+        for values in BOX.iter_unpack(buffer[offset:offset + num_boxes * BOX.size]):
+            boxes.append((values[0:4], values[4:8], values[8]))
+        offset += num_boxes * BOX.size
+        rocks = [((x, y), size) for x, y, size
+                 in ROCK.iter_unpack(buffer[offset:offset + num_rocks * ROCK.size])]
+        offset += num_rocks * ROCK.size
+        scenario = cls(boxes, rocks, (x_start, y_start), tuple(barcode),
+                       seed if has_seed else None)
+        return scenario, offset
+
+
+def save_corpus(path, scenarios):
+    """
+    Pack many scenarios into one corpus file
+    """
+    scenarios = list(scenarios)
+    with open(path, "wb") as file:
+        file.write(CORPUS_HEADER.pack(CORPUS_MAGIC, CORPUS_VERSION, len(scenarios)))
+        for scenario in scenarios:
+            file.write(scenario.pack())
+
+
+def iter_corpus(path):
+    """
+    Iterate over the scenarios of a corpus file, read through a memory map
+    """
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, version, count = CORPUS_HEADER.unpack_from(data, 0)
+            if magic != CORPUS_MAGIC or version != CORPUS_VERSION:
+                raise ValueError(f"{path} is not a version {CORPUS_VERSION} corpus")
+            offset = CORPUS_HEADER.size
+            for _ in range(count):
+                scenario, offset = Scenario.unpack_from(data, offset)
+                yield scenario
+
+
+def load_corpus(path):
+    """
+    Load all scenarios of a corpus file
+    """
+    return list(iter_corpus(path))
+
+
+def generate_corpus(path, num_scenarios, base_seed=0):
+    """
+    Generate `num_scenarios` seeded scenarios and pack them into a corpus
+    """
+    save_corpus(path, (Scenario.generate(seed)
+                       for seed in range(base_seed, base_seed + num_scenarios)))
@@ -4,11 +4,17 @@ with visual representation, acting as building block for more complex
 sequences
 """
 
-import matplotlib.pyplot as plt
+import time
 from tuplemath import *
 from myconstants import *
-from myfrontend import InvisibleArtist
-from mybackend import Backend
+from mybackend import Backend, NO_DETECTION
+from myplanner import Planner
+from myroute import visiting_order
+from mysnapshot import Snapshot
+from mytrace import (TRACER, DEBUG, INFO, WARNING, MOVEMENT, SCANNING,
+                     NAVIGATION)
+from myrecorder import (MissionRecorder, STEP_FORWARD, STEP_BACKWARD, TURN_RIGHT,
+                        TURN_LEFT, DETECTION)
 
 
 class Simulator:
@@ -17,55 +23,335 @@ class Simulator:
     simulated actions
     """
 
-    def __init__(self, start_pos, correct_barcode):
+    def __init__(self, start_pos, correct_barcode, headless=False,
+                 real_time_factor=REAL_TIME_FACTOR, render_every=1, fps=None,
+                 record=None, seed=None, scenario=None, visit_order="fixed",
+                 backend=None, robot=None, profile=False, layout=None):
         """
         Initiate new game with a backend(robot, boxes) and frontend(invisible artist)
-        """
-        self.frontend = InvisibleArtist(correct_barcode)
-        self.backend = Backend(correct_barcode)
+        If `headless`, use a null frontend instead so that matplotlib is never
+        imported and the simulation runs at full speed
+
+        Rendering is paced by a simulated clock: the simulation runs
+        `real_time_factor` times faster than the real robot (1 = as fast
+        as the EV3, None = as fast as possible), and a frame is rendered every `render_every` primitives,
+        or, if `fps` is given, at most `fps` frames per second
+
+        If `record` is a file path, every primitive is recorded into a mission
+        log there, to be replayed later with replay.py
+
+        `seed` and `scenario` are passed on to the Backend, to reproduce a
+        layout or load a saved one (see also from_scenario)
+
+        `visit_order` is the order the shelf lines get scanned in: "fixed"
+        (quads 0, 1, 2, 3 in turn, starting from the home's quad) or
+        "optimized" (minimum travel of the full sweep from the start home, see
+        myroute). The optimized order shortens the sweep of every line, not the
+        time to find a box: from some homes it makes the mean mission longer
+        (see the report of myroute.py)
+
+        If a `backend` is given, run on it instead of a new one, with its
+        `robot` (default: its first robot), so several robots can share a
+        board (see myfleet)
+
+        If `profile`, every primitive and sequence is counted and timed into
+        a myprofiler.MissionProfiler, `profiler` (None otherwise)
+
+        `layout` (mylayout.Layout) is the warehouse, passed on to the Backend
+        (by default the scenario's, or else the competition field). The
+        simulator works on its backend's layout
+        """
+        if backend is None:
+            backend = Backend(correct_barcode, seed, scenario, layout)
+        self.backend = backend
+        self.layout = backend.layout
+        if headless:
+            from myheadless import NullArtist
+            self.frontend = NullArtist(correct_barcode)
+        else:
+            from myfrontend import InvisibleArtist
+            self.frontend = InvisibleArtist(correct_barcode, layout=self.layout)
         # Just call out a robot instance because robot is used a lot
-        self.robot = self.backend.robot
+        self.robot = backend.robot if robot is None else robot
         # Set starting position for robot
         self.robot.set_robot_start(start_pos)
         self.target_code = correct_barcode
+        # Route planner over the backend's board
+        self.planner = Planner(self.backend)
+        self.visit_order = visit_order
+        # Mission counters, for evaluating how well a search went
+        self.num_steps = 0
+        self.num_turns = 0
+        self.num_boxes_scanned = 0
+        self.num_rocks_circumvented = 0
+        # Simulated time when the robot started picking up the wanted box,
+        # None until then
+        self.time_to_find = None
+        # Boxes picked up so far, in order
+        self.removed_boxes = ()
+        # Simulated clock and frame pacing
+        self.headless = headless
+        # Headless, the robot takes macro-steps (see robot_jump and
+        # robot_jump_sideways), with nothing to show in between
+        self.macro_steps = headless
+        self.real_time_factor = real_time_factor
+        self.render_every = render_every
+        self.fps = fps
+        self.sim_time = 0.0
+        self.ticks_since_frame = 0
+        self.wall_start = time.perf_counter()
+        self.last_frame_wall = self.wall_start
+        # Mission recording
+        self.recorder = None
+        if record:
+            self.recorder = MissionRecorder(record, self.backend, start_pos, correct_barcode)
+        # Profiling, wrapped around this instance's methods only when asked for
+        self.profiler = None
+        if profile:
+            from myprofiler import MissionProfiler
+            self.profiler = MissionProfiler()
+            self.profiler.instrument(self)
+
+    @classmethod
+    def from_scenario(cls, scenario, **kwargs):
+        """
+        Initiate new game from a scenario, with its start home and target
+        """
+        return cls(scenario.start_pos, scenario.target_barcode,
+                   scenario=scenario, **kwargs)
+
+    def tick(self, duration, force_render=False):
+        """
+        Advance the simulated clock after a primitive, and render a frame
+        if one is due
+        """
+        self.sim_time += duration
+        if self.headless:
+            return
+        self.ticks_since_frame += 1
+        if force_render:
+            frame_due = True
+        elif self.fps:
+            frame_due = time.perf_counter() - self.last_frame_wall >= 1 / self.fps
+        else:
+            frame_due = self.ticks_since_frame >= self.render_every
+        if frame_due:
+            self.render_frame()
+
+    def wait(self, duration):
+        """
+        Let simulated time pass without any movement. The wait is paid
+        for by the next rendered frame
+        """
+        self.sim_time += duration
+
+    def render_frame(self):
+        """
+        Render the robot, then pause until the real clock catches up with
+        the simulated clock
+        """
+        self.frontend.render_surface(self.robot)
+        self.ticks_since_frame = 0
+        if self.real_time_factor:
+            sim_time_in_wall = self.wall_start + self.sim_time / self.real_time_factor
+            pause = max(sim_time_in_wall - time.perf_counter(), MIN_PAUSE)
+        else:
+            pause = MIN_PAUSE
+        self.frontend.pause(pause)
+        self.last_frame_wall = time.perf_counter()
+
+    def snapshot(self):
+        """
+        Return the mission's current state as an immutable Snapshot
+        """
+        robot = self.robot
+        return Snapshot(self.sim_time, robot.center, robot.head, robot.storage_empty,
+                        self.removed_boxes)
 
     def robot_forward(self, numsteps):
         """
         Make robot step forward with visual representation
+        Headless, there is nothing to show in between, so jump at once
         """
+        if self.macro_steps:
+            self.robot_jump(numsteps, STEP_FORWARD)
+            return
         for _ in range(numsteps):
             self.robot.step_forward()
-            self.backend.update_digital_board()
-            self.frontend.render_surface(self.robot)
-            plt.pause(0.00001)
+            self.num_steps += 1
+            if self.recorder:
+                self.recorder.record(STEP_FORWARD)
+            self.backend.update_digital_board(self.robot)
+            self.tick(STEP_TIME)
 
     def robot_backward(self, numsteps):
         """
         Make robot step backward with visual representation
+        Headless, there is nothing to show in between, so jump at once
         """
+        if self.macro_steps:
+            self.robot_jump(numsteps, STEP_BACKWARD)
+            return
         for _ in range(numsteps):
             self.robot.step_backward()
-            self.backend.update_digital_board()
-            self.frontend.render_surface(self.robot)
-            plt.pause(0.00001)
+            self.num_steps += 1
+            if self.recorder:
+                self.recorder.record(STEP_BACKWARD)
+            self.backend.update_digital_board(self.robot)
+            self.tick(STEP_TIME)
+
+    def robot_jump(self, numsteps, step_opcode):
+        """
+        Macro-step: move the whole segment at once with a single board update,
+        ending in the same state as stepping one inch at a time
+        """
+        if numsteps <= 0:
+            return
+        if step_opcode == STEP_FORWARD:
+            self.robot.move_forward(numsteps)
+        else:
+            self.robot.move_backward(numsteps)
+        self.num_steps += numsteps
+        if self.recorder:
+            self.recorder.record_many(step_opcode, numsteps)
+        self.backend.update_digital_board(self.robot)
+        self.sim_time += numsteps * STEP_TIME
+
+    def robot_jump_sideways(self, side, numsteps, times, backward=False, detected=False,
+                            pause=0.0):
+        """
+        Macro-step of `times` side steps: turn to `side`, step `numsteps`
+        forward (or backward), turn back, then wait `pause`, each one preceded
+        by a detection if `detected`. Ends in the same state and at the same
+        simulated time as doing them one primitive at a time, with a single
+        board update. `side` is to the robot's right or left
+        """
+        if times <= 0:
+            return
+        robot = self.robot
+        if side == CLOCKWISE[robot.direction]:
+            turn, turn_back = robot.turn_right_90, robot.turn_left_90
+            turn_opcodes = (TURN_RIGHT, TURN_LEFT)
+        else:
+            turn, turn_back = robot.turn_left_90, robot.turn_right_90
+            turn_opcodes = (TURN_LEFT, TURN_RIGHT)
+        turn()
+        if backward:
+            robot.move_backward(times * numsteps)
+        else:
+            robot.move_forward(times * numsteps)
+        turn_back()
+        self.num_turns += 2 * times
+        self.num_steps += times * numsteps
+        # Exact: the primitive times are all multiples of 1/16 s
+        self.sim_time += times * (2 * TURN_TIME + numsteps * STEP_TIME + pause)
+        if self.recorder:
+            step_opcode = STEP_BACKWARD if backward else STEP_FORWARD
+            pattern = ((DETECTION,) if detected else ()) + (turn_opcodes[0],) \
+                + (step_opcode,) * numsteps + (turn_opcodes[1],)
+            self.recorder.record_pattern(pattern, times)
+        self.backend.update_digital_board(self.robot)
+
+    def robot_strafe(self, side, numsteps, times=1, backward=False, pause=0.0):
+        """
+        Side step `times` times: turn to `side`, step `numsteps` forward (or
+        backward), turn back, then wait `pause`
+        Headless, all of them are taken at once (see robot_jump_sideways)
+        """
+        original_direction = self.robot.direction
+        if self.macro_steps and side in (CLOCKWISE[original_direction],
+                                         COUNTER_CLOCKWISE[original_direction]):
+            self.robot_jump_sideways(side, numsteps, times, backward, pause=pause)
+            return
+        for _ in range(times):
+            self.robot_become_direction(side)
+            if backward:
+                self.robot_backward(numsteps)
+            else:
+                self.robot_forward(numsteps)
+            self.robot_become_direction(original_direction)
+            self.wait(pause)
+
+    def robot_strafe_while_detected(self, side, backward=False, pause=0.0):
+        """
+        Side step 1 step at a time to `side` (stepping backward if
+        `backward`), waiting `pause` after each, while the ultrasonic detects
+        something
+        Headless, the range field tells at once where it stops detecting
+        Return the number of side steps
+        """
+        original_direction = self.robot.direction
+        if self.macro_steps and side in (CLOCKWISE[original_direction],
+                                         COUNTER_CLOCKWISE[original_direction]):
+            if not self.robot.ultrasonic_detection(self.backend.static_board):
+                return 0
+            move = rev(side) if backward else side
+            times = self.backend.ultrasonic_range(move, clear=True)
+            if times == NO_DETECTION:
+                raise RuntimeError(f"The ultrasonic never stops detecting moving {move} "
+                                   f"from {self.robot.center}")
+            self.robot_jump_sideways(side, 1, times, backward, detected=True, pause=pause)
+            return times
+        times = 0
+        while self.ultrasonic_detection():
+            self.robot_strafe(side, 1, backward=backward, pause=pause)
+            times += 1
+        return times
+
+    def robot_stride_along_shelf(self, x_range):
+        """
+        Stride 4 inches along the shelf, to the robot's right, so that the
+        ultrasonic looks at the next spot a box can be in
+        Headless, the strides after it that would see nothing, with the
+        robot's head staying within `x_range` (min x, max x), are taken at
+        once too
+        """
+        side = CLOCKWISE[self.robot.direction]
+        clear_strides = 0
+        if self.macro_steps:
+            head_x = self.robot.head[0]
+            if side[0] > 0:
+                clear_strides = (x_range[1] - head_x) // 4
+            elif side[0] < 0:
+                clear_strides = (head_x - x_range[0]) // 4
+            if clear_strides > 0:
+                # Capped by the x range above, as NO_DETECTION is off the shelf
+                clear_strides = min(clear_strides,
+                                    (self.backend.ultrasonic_range(side) - 1) // 4)
+        self.robot_strafe(side, 4, 1 + max(clear_strides, 0))
 
     def robot_turn_right(self):
         """
         Make robot turn right (clockwise) with visual representation
         """
         self.robot.turn_right_90()
-        self.backend.update_digital_board()
-        self.frontend.render_surface(self.robot)
-        plt.pause(0.00001)
+        self.num_turns += 1
+        if self.recorder:
+            self.recorder.record(TURN_RIGHT)
+        self.backend.update_digital_board(self.robot)
+        self.tick(TURN_TIME)
 
     def robot_turn_left(self):
         """
         Make robot turn left (counter-clockwise) with visual representation
         """
         self.robot.turn_left_90()
-        self.backend.update_digital_board()
-        self.frontend.render_surface(self.robot)
-        plt.pause(0.00001)
+        self.num_turns += 1
+        if self.recorder:
+            self.recorder.record(TURN_LEFT)
+        self.backend.update_digital_board(self.robot)
+        self.tick(TURN_TIME)
+
+    def ultrasonic_detection(self):
+        """
+        Check the robot's ultrasonic vision against the digital board's boxes
+        and rocks. Other robots on the board are no boxes to scan, and are
+        kept out of the way by whoever drives them (see myfleet)
+        """
+        detected = self.robot.ultrasonic_detection(self.backend.static_board)
+        if detected and self.recorder:
+            self.recorder.record(DETECTION)
+        return detected
 
     def robot_become_direction(self, direction_to_become):
         """
@@ -91,17 +377,24 @@ class Simulator:
             self.robot_become_direction(DOWN)
         while abs(self.robot.center[1] - yval_to_go) > 0:
             # If robot encounter rocks
-            if self.robot.ultrasonic_detection(self.backend.board):
-                print("Rock encountered. Circumventing........")
+            if self.ultrasonic_detection():
+                if TRACER.movement:
+                    TRACER.trace(MOVEMENT, INFO, "Rock encountered. Circumventing........")
                 self.circumvent_rock()
-                print("Circumvented")
-            # Else just go forward like normal
+                if TRACER.movement:
+                    TRACER.trace(MOVEMENT, INFO, "Circumvented")
+            # Else go forward like normal, straight to where the ultrasonic
+            # would detect something next, or to the y_value
             else:
-                self.robot_forward(1)
+                y_diff = yval_to_go - self.robot.center[1]
+                if y_diff * self.robot.direction[1] > 0:
+                    self.robot_forward(self.backend.steps_until_detection(abs(y_diff)))
+                else:
+                    self.robot_forward(1)
 
     def robot_goto_x(self, xval_to_go):
         """
-        Control robot to go to a specific y_value
+        Control robot to go to a specific x_value
         """
         current_x = self.robot.center[0]
         if xval_to_go > current_x:
@@ -110,14 +403,38 @@ class Simulator:
             self.robot_become_direction(LEFT)
         self.robot_forward(abs(xval_to_go - current_x))
 
-    def robot_goto_point(self, point_to_go):
-        """
-        Navigate robot to specific point
-        Only works perfectly in hallway areas
-        Don't use if in shelves area"""
+    def robot_goto_point(self, point_to_go, direction_to_become=None):
+        """
+        Navigate robot to specific point, and into a direction if given,
+        along the shortest route around shelves, boxes and rocks
+        If the planner finds no route, fall back to going in y then in x,
+        circumventing rocks on the way
+        """
+        route = self.planner.plan(self.robot.center, self.robot.direction,
+                                  point_to_go, direction_to_become)
+        if route is not None:
+            self.robot_follow(route)
+            return
+        if TRACER.navigation:
+            TRACER.trace(NAVIGATION, WARNING, "No route found to {point}. Going in y then x",
+                         point=point_to_go)
         x_togo, y_togo = point_to_go
         self.robot_goto_y(y_togo)
         self.robot_goto_x(x_togo)
+        if direction_to_become is not None:
+            self.robot_become_direction(direction_to_become)
+
+    def robot_follow(self, route):
+        """
+        Drive a planned route of (opcode, count) primitives
+        """
+        for opcode, count in route:
+            if opcode == STEP_FORWARD:
+                self.robot_forward(count)
+            elif opcode == TURN_RIGHT:
+                self.robot_turn_right()
+            elif opcode == TURN_LEFT:
+                self.robot_turn_left()
 
     def robot_pick_box(self):
         """
@@ -135,32 +452,34 @@ class Simulator:
             y_box = y_store - 5
 
         # Remove the box from the background
-        self.backend.remove_box((x_box, y_box))
+        box = self.backend.remove_box((x_box, y_box))
+        if self.recorder:
+            self.recorder.record_pick(box)
         # Update robot's storage area
         self.robot.store_box()
         # Update digital board
-        self.backend.update_digital_board()
+        self.backend.update_digital_board(self.robot)
+        if box is not None:
+            self.removed_boxes += (box,)
+            if box.wanted and self.time_to_find is None:
+                self.time_to_find = self.sim_time
         # Frontend: Rerender both background and surface
-        self.frontend.render_background(self.backend.box_list, self.backend.rock_list)
-        self.frontend.render_surface(self.robot)
-        plt.pause(0.4)
+        self.frontend.render_background(self.backend.box_index, self.backend.rock_list)
+        self.tick(PICK_TIME, force_render=True)
 
     def circumvent_rock(self):
         """
         Go around an obstacle
         """
+        self.num_rocks_circumvented += 1
         dodge_direction = self.robot.get_dodging_direction()
-        print(f"Doding direction is: {dodge_direction}")
+        if TRACER.movement:
+            TRACER.trace(MOVEMENT, DEBUG, "Doding direction is: {direction}",
+                         direction=dodge_direction)
         original_direction = self.robot.direction
-        rock_size = 0
         # Robot dodges to the side until there are no more rock blocking way
-        while self.robot.ultrasonic_detection(self.backend.board):
-            self.robot_become_direction(dodge_direction)
-            self.robot_forward(1)
-            rock_size += 1
-            self.robot_become_direction(original_direction)
-            plt.pause(1)
-        
+        rock_size = self.robot_strafe_while_detected(dodge_direction, pause=DODGE_TIME)
+
         # When there are no more rocks blocking way, robot does forward
         # How many steps dodged, that many steps forward, because rock is square shape
         self.robot_forward(rock_size)
@@ -176,15 +495,18 @@ class Simulator:
         # Start scanning the 4 bits of the bardcode
         full_code = []
         for _ in range(4):
-            temp_bit = self.robot.scan_color_bit(self.backend.board)
+            temp_bit = self.robot.scan_color_bit(self.backend.static_board)
+            if self.recorder:
+                self.recorder.record_scanned_bit(temp_bit)
             if temp_bit > 0:
                 full_code.append(temp_bit)
             else:
-                print("Code scanning weird")
+                if TRACER.scanning:
+                    TRACER.trace(SCANNING, WARNING, "Code scanning weird")
             self.robot_turn_right()
             self.robot_forward(1)
             self.robot_turn_left()
-            plt.pause(0.00002)
+            self.wait(SCAN_BIT_TIME)
         # Visual bug: If direction is DOWN (corresponsinding to LEFT scanning direction)
         # must go 1 more step (reason explained in another "Visual Bug" comment above)
         if self.robot.direction == DOWN:
@@ -205,30 +527,25 @@ class Simulator:
         # Then it begins scanning in the scanning direction
 
         # Backward until box is no longer seen
-        backward_steps = 0 # steps count to control how long robot has backwarded
-        while self.robot.ultrasonic_detection(self.backend.board):
-            backward_steps += 1
-            self.robot_turn_right()
-            self.robot_backward(1)
-            self.robot_turn_left()
-            plt.pause(0.0002)
-        print(f"Back steps: {backward_steps}")                
+        # steps count to control how long robot has backwarded
+        backward_steps = self.robot_strafe_while_detected(
+            CLOCKWISE[self.robot.direction], backward=True, pause=TRACK_STEP_TIME)
+        if TRACER.scanning:
+            TRACER.trace(SCANNING, DEBUG, "Back steps: {steps}", steps=backward_steps)
           
         # If it needs to go backward more than 4 steps, there are 2 boxes
         # next to each other: The "adjacent boxes" problem
         # Therefore, activate "forward-tracking scan" sequence
         if backward_steps > 4:
-            print("Adjacent boxes found")
+            if TRACER.scanning:
+                TRACER.trace(SCANNING, INFO, "Adjacent boxes found")
             # Forward 10 steps to get into a position that aligns with box II
             self.robot_turn_right()
             self.robot_forward(10)
             self.robot_turn_left()
             # Forward till no longer see box
-            while self.robot.ultrasonic_detection(self.backend.board):
-                self.robot_turn_right()
-                self.robot_forward(1)
-                self.robot_turn_left()
-                plt.pause(0.0002)
+            self.robot_strafe_while_detected(CLOCKWISE[self.robot.direction],
+                                             pause=TRACK_STEP_TIME)
             # When the box is no longer seen, the ultrasonic field is at the box's
             # rightmost edge. Now turn right, preparing to backward to scanning position
             # Visual Bug: If robot is going RIGHT, needs to backward 3 steps for
@@ -246,11 +563,13 @@ class Simulator:
             # If robot is going LEFT, only needs 3 steps
             self.robot_forward(4 if scanning_direction == RIGHT else 3)
         self.robot_turn_left()
-        #plt.pause(0.05)
+        #self.frontend.pause(0.05)
 
         full_code = self.scan_full_barcode()
-        print(f"Barcode result: {full_code}")
-        plt.pause(0.005)
+        self.num_boxes_scanned += 1
+        if TRACER.scanning:
+            TRACER.trace(SCANNING, INFO, "Barcode result: {barcode}", barcode=full_code)
+        self.wait(SCAN_RESULT_TIME)
         return full_code
 
     def search_shelf(self):
@@ -263,17 +582,19 @@ class Simulator:
         """
         scanning_direction = self.get_scanning_direction()
         x_begin = self.robot.center[0]
-        x_end = x_begin + 37 * scanning_direction[0]
+        x_end = x_begin + self.layout.scan_length * scanning_direction[0]
 
 
-        print(f"Scanning seq start with {x_begin}, {x_end}")
+        if TRACER.scanning:
+            TRACER.trace(SCANNING, DEBUG, "Scanning seq start with {x_begin}, {x_end}",
+                         x_begin=x_begin, x_end=x_end)
         while min(x_begin, x_end) <= self.robot.head[0] <= max(x_begin, x_end):
             # Only continue searching if has not found the right box (storage is empty) 
             if self.robot.storage_empty:
-                box_detected = self.robot.ultrasonic_detection(self.backend.board)
+                box_detected = self.ultrasonic_detection()
                 if box_detected:
                     full_code = self.backtrack_scanning()
-                    #plt.pause(0.007)
+                    #self.frontend.pause(0.007)
                     # If barcode is correct, proceed to get into position to store box
                     if tuple(full_code) == self.target_code:
                         # Go a bit backward to place the robot right in middle of box
@@ -287,36 +608,47 @@ class Simulator:
                         self.robot_backward(1)
                         self.robot_turn_right()
                 else:
-                    self.robot_turn_right()
                     # Forward 4 inch then turn back in to see if any boxes appear
-                    self.robot_forward(4)
-                    self.robot_turn_left()
-            # If a box is found and picked up already, just go:
+                    self.robot_stride_along_shelf((min(x_begin, x_end), max(x_begin, x_end)))
+            # If a box is found and picked up already, just go past the shelf:
             else:
-                self.robot_forward(1)
-        print(f"Scanning seq ended. Robot currently at {self.robot.center}")
+                head_x = self.robot.head[0]
+                x_step = self.robot.direction[0]
+                if x_step > 0:
+                    self.robot_forward(max(x_begin, x_end) - head_x + 1)
+                elif x_step < 0:
+                    self.robot_forward(head_x - min(x_begin, x_end) + 1)
+                else:
+                    self.robot_forward(1)
+        if TRACER.scanning:
+            TRACER.trace(SCANNING, DEBUG, "Scanning seq ended. Robot currently at {center}",
+                         center=self.robot.center)
 
         # Go to hall way
         self.robot_goto_point(add_tuple(tuple((x_end, self.robot.center[1])),
                                         mult_tuple(scanning_direction, 2)))
-        print(f"Went into hallway at {self.robot.center}")
+        if TRACER.navigation:
+            TRACER.trace(NAVIGATION, DEBUG, "Went into hallway at {center}",
+                         center=self.robot.center)
 
     def where_to_go_next(self):
         """
         Find out what is the next location to take
         based on current location
         """
-        current_quad = self.robot.quad
-        quad_original_direction = QUAD_START_DIRCT[current_quad]
+        layout = self.layout
         current_point = self.robot.center
+        current_quad = layout.quad_at(current_point)
+        if TRACER.navigation:
+            TRACER.trace(NAVIGATION, DEBUG, "Quad {quad}", quad=current_quad)
+        quad_original_direction = layout.quads[current_quad].direction
+        quad_rows = layout.quad_rows[current_quad]
         current_row = current_point[1]
         current_scan_direction = self.get_scanning_direction()
     
-        if current_row not in (53, 55): # If not in quad-end positions
-            if current_row in (7, 31, 77, 101):
-                step_to_take = 22
-            elif current_row in (29, 79):
-                step_to_take = 2
+        if current_row != quad_rows[-1]: # If not in quad-end positions
+            # Across the shelf, or across the hallway to the next shelf
+            step_to_take = abs(quad_rows[quad_rows.index(current_row) + 1] - current_row)
             # next_direct = rev(curr_quad_direction)
 
             # Move along the hallway past the shelf width
@@ -328,10 +660,11 @@ class Simulator:
                                 mult_tuple(rev(current_scan_direction), 2))
             next_scan_direction = rev(self.get_scanning_direction())
         else:
-            next_quad = current_quad + 1 if current_quad < 3 else current_quad - 3
-            next_pt = QUAD_START[next_quad]
-            next_scan_direction = CLOCKWISE[QUAD_START_DIRCT[next_quad]]
-            print(f"Arriving to quad {next_quad}")
+            next_quad = (current_quad + 1) % len(layout.quads)
+            next_pt = layout.quads[next_quad].start
+            next_scan_direction = CLOCKWISE[layout.quads[next_quad].direction]
+            if TRACER.navigation:
+                TRACER.trace(NAVIGATION, INFO, "Arriving to quad {quad}", quad=next_quad)
             # print(f"DIRECTION {next_direct}")
         return (next_pt, next_scan_direction)
 
@@ -339,78 +672,105 @@ class Simulator:
         """
         Get the scanning direction
         """
-        if self.robot.center[1] in (7, 31, 55, 79):
+        if self.robot.center[1] in self.layout.right_scan_rows:
             return RIGHT
         else:
             return LEFT
 
     def escape_home(self):
         """
-        Robot departs from home page
+        Robot departs from home page, to the home's exit point (see
+        mylayout.Layout.home_exit)
         """
         start_pos = self.robot.center
-        home_number = HOME.index(start_pos)
-        self.robot_forward(13)
-        # If starting at A or D, robot turns right into hallway
-        # and get to starting point
-        if home_number in (0, 3): # If starting at A or D
-            self.robot_turn_right()
-            self.robot_forward(6)
-            self.robot_turn_left()
-        # If starting at B or C, robot turns left into hallway
-        # and get to starting point
-        else:
-            self.robot_turn_left()
-            self.robot_forward(43)
-            self.robot_turn_right()
+        start_direction = self.robot.direction
+        x_start, y_start = self.layout.home_exit(start_pos)
+        self.robot_forward(abs(y_start - start_pos[1]))
+        # Turn into the hallway towards the exit point, and get to it
+        # (right from A or D, left from B or C on the competition field)
+        if x_start != start_pos[0]:
+            self.robot_become_direction(RIGHT if x_start > start_pos[0] else LEFT)
+            self.robot_forward(abs(x_start - start_pos[0]))
+            self.robot_become_direction(start_direction)
 
     def go_home(self, start_pos):
         """
         Go straight to home base after having the box
         """
         self.robot_goto_point(start_pos)
-        print("Finished. Box retrieved")
+        if TRACER.navigation:
+            TRACER.trace(NAVIGATION, INFO, "Finished. Box retrieved")
 
-    def search_entire_area(self):
+    def search_fixed_order(self):
         """
-        Combine other sequences into a whole box search sequence on entire field
+        Scan the shelf lines quad by quad, starting from the home's quad
         """
-        game_finished = False
+        num_quads = len(self.layout.quads)
         num_quad_finished = 0
         num_shelf_searched = 0
-        starting_position = self.robot.center
-        while not game_finished:
-            # Depart from home
-            self.escape_home()
-            #plt.pause(0.005)
-
-            # Make first search
+        # Depart from home
+        self.escape_home()
+        #self.frontend.pause(0.005)
+
+        # Make first search
+        self.search_shelf()
+        num_shelf_searched += 1
+        # Continuously do subsequenct searches if necessary
+        while self.robot.storage_empty and num_quad_finished < num_quads:
+            next_point, next_scan_direction = self.where_to_go_next()
+            if TRACER.navigation:
+                TRACER.trace(NAVIGATION, DEBUG, "{point} {direction}", point=next_point,
+                             direction=next_scan_direction)
+            # Move into next spot, facing the shelf
+            self.robot_goto_point(next_point, COUNTER_CLOCKWISE[next_scan_direction])
+
+            # Scan a shelf line
             self.search_shelf()
             num_shelf_searched += 1
-            #print(f"Current quad is: {self.robot.quad}")
-            # Continuously do subsequenct searches if necessary
-            while self.robot.storage_empty and num_quad_finished < 4:
-                next_point, next_scan_direction = self.where_to_go_next()
-                print(next_point, next_scan_direction)
-                # Move into next spot
-                self.robot_goto_point(next_point)
-                self.robot_become_direction(COUNTER_CLOCKWISE[next_scan_direction])
-                
-                # Scan a shelf line
-                self.search_shelf()
-                num_shelf_searched += 1
-                #print(f"Current quad is: {self.robot.quad}")
-                if num_shelf_searched % 4 == 0:
-                    num_quad_finished += 1
-                    print(f"Finished quad {self.robot.quad}")
-
-            # If carrying a box, initiate go_home sequence
+            quad = self.layout.quad_at(self.robot.center)
+            if self.robot.center[1] == self.layout.quad_rows[quad][-1]:
+                num_quad_finished += 1
+                if TRACER.navigation:
+                    TRACER.trace(NAVIGATION, INFO, "Finished quad {quad}", quad=quad)
+
+    def search_lines(self, lines):
+        """
+        Scan shelf lines (myroute.ScanLine) in turn, until a box is picked up
+        """
+        for line in lines:
+            self.robot_goto_point(line.entry, line.direction)
+            self.search_shelf()
             if not self.robot.storage_empty:
-                self.go_home(starting_position)
-                game_finished = True
-            else: # Meaning no box found
-                print("Searched 4 quads but no boxes found")
-                game_finished = True
+                break
+
+    def search_entire_area(self):
+        """
+        Combine other sequences into a whole box search sequence on entire field
+        """
+        game_finished = False
+        starting_position = self.robot.center
+        try:
+            while not game_finished:
+                if self.visit_order == "optimized":
+                    # Scan the shelf lines in minimum-travel order
+                    self.search_lines(visiting_order(starting_position, layout=self.layout))
+                else:
+                    self.search_fixed_order()
+                # If carrying a box, initiate go_home sequence
+                if not self.robot.storage_empty:
+                    self.go_home(starting_position)
+                    game_finished = True
+                else: # Meaning no box found
+                    if TRACER.navigation:
+                        TRACER.trace(NAVIGATION, INFO, "Searched every shelf but no boxes found")
+                    game_finished = True
+            # Make sure the last state is drawn even if its frame was skipped
+            if not self.headless:
+                self.render_frame()
+        finally:
+            # Close the log even if the mission stops halfway, so it replays
+            if self.recorder:
+                self.recorder.close()
 
 
 if __name__ == "__main__":
@@ -419,7 +779,7 @@ if __name__ == "__main__":
 
     game.frontend.render_background(game.backend.box_list, game.backend.rock_list)
     game.frontend.render_surface(game.backend.robot)
-    plt.pause(500)
+    game.frontend.pause(500)
 
     # print("Center", game.backend.robot.center)
     # print("Head", game.backend.robot.head)
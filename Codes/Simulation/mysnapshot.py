@@ -0,0 +1,58 @@
+"""
+My module for mission snapshots: the immutable state of a mission at one
+moment, handed from the stepping side to the drawing side, so the two do not
+have to run in lockstep
+"""
+
+from collections import namedtuple
+from myrobot import Robot
+
+
+class Snapshot(namedtuple("Snapshot", ("sim_time", "center", "head",
+                                       "storage_empty", "removed"))):
+    """
+    State of a mission: the simulated time, the robot's pose and storage
+    state, and the boxes removed so far (a tuple, in the order they were
+    picked up)
+    """
+    __slots__ = ()
+
+    def robot(self):
+        """
+        Rebuild a robot in the snapshot's state
+        """
+        robot = Robot()
+        robot.center = self.center
+        robot.head = self.head
+        if not self.storage_empty:
+            robot.store_box()
+        return robot
+
+
+class SnapshotRenderer:
+    """
+    Draw snapshots of one mission with any renderer that has
+    render_background and render_surface, redrawing the background only
+    when a box got removed
+    """
+
+    def __init__(self, artist, box_list, rock_list):
+        """
+        `box_list` and `rock_list` are the mission's boxes and rocks before
+        any box got removed
+        """
+        self.artist = artist
+        self.box_list = list(box_list)
+        self.rock_list = rock_list
+        self.num_removed = None
+
+    def render(self, snapshot):
+        """
+        Draw the state of a snapshot
+        """
+        if len(snapshot.removed) != self.num_removed:
+            removed = {id(box) for box in snapshot.removed}
+            self.artist.render_background(
+                [box for box in self.box_list if id(box) not in removed], self.rock_list)
+            self.num_removed = len(snapshot.removed)
+        self.artist.render_surface(snapshot.robot())
@@ -0,0 +1,143 @@
+"""
+My module for structured tracing of the simulation
+A trace record has a level, a category and a message with named fields,
+which only get formatted into text when the record is printed or dumped.
+Tracing is off by default, and a call site checks its category's flag on the
+tracer before building anything, so it costs nothing more when off:
+    if TRACER.detection:
+        TRACER.trace(DETECTION, DEBUG, "{x},{y} detected {value}", x=x, y=y, value=value)
+Once on (see configure), records go into a ring buffer of the latest ones,
+to be dumped when something goes wrong, and are also printed if `echo`
+"""
+
+import collections
+import os
+import sys
+import time
+
+
+# Levels
+DEBUG = 10
+INFO = 20
+WARNING = 30
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING"}
+
+# Categories. Each one is also the name of the tracer's flag for it
+MOVEMENT = "movement"
+DETECTION = "detection"
+SCANNING = "scanning"
+NAVIGATION = "navigation"
+CATEGORIES = (MOVEMENT, DETECTION, SCANNING, NAVIGATION)
+
+# Records kept in the ring buffer, at most
+CAPACITY = 4096
+
+
+class TraceRecord(collections.namedtuple("TraceRecord", ("number", "wall_time", "level",
+                                                         "category", "message", "fields"))):
+    """
+    One trace record. `message` is a str.format template of the `fields`
+    """
+    __slots__ = ()
+
+    def text(self):
+        """
+        Return the message with its fields filled in
+        """
+        return self.message.format(**self.fields)
+
+    def format(self):
+        """
+        Return the record as a line of a dump
+        """
+        return f"{self.number:>8} {LEVEL_NAMES[self.level]:<8}{self.category:<11}{self.text()}"
+
+
+class Tracer:
+    """
+    Tracer class, keeping the latest records in a ring buffer
+    """
+
+    def __init__(self):
+        self.buffer = collections.deque(maxlen=CAPACITY)
+        self.level = INFO
+        self.echo = False
+        self.num_records = 0
+        for category in CATEGORIES:
+            setattr(self, category, False)
+
+    def configure(self, level=INFO, categories=CATEGORIES, echo=False, capacity=CAPACITY):
+        """
+        Trace `categories` (and not the others) from `level` up, keeping the
+        latest `capacity` records, and printing them too if `echo`
+        """
+        self.level = level
+        self.echo = echo
+        if capacity != self.buffer.maxlen:
+            self.buffer = collections.deque(self.buffer, maxlen=capacity)
+        for category in CATEGORIES:
+            setattr(self, category, category in categories)
+
+    def disable(self):
+        """
+        Trace nothing
+        """
+        self.configure(categories=())
+
+    @property
+    def enabled(self):
+        """
+        Check if any category is traced
+        """
+        return any(getattr(self, category) for category in CATEGORIES)
+
+    def trace(self, category, level, message, **fields):
+        """
+        Record a message of a category (whose flag the caller checked) at a
+        level, with its named fields
+        """
+        if level < self.level:
+            return
+        record = TraceRecord(self.num_records, time.perf_counter(), level, category,
+                             message, fields)
+        self.num_records += 1
+        self.buffer.append(record)
+        if self.echo:
+            print(record.text())
+
+    def records(self):
+        """
+        Return the records in the ring buffer, oldest first
+        """
+        return list(self.buffer)
+
+    def clear(self):
+        """
+        Empty the ring buffer
+        """
+        self.buffer.clear()
+
+    def dump(self, file=None):
+        """
+        Write the records in the ring buffer, one per line, into `file` (a
+        path or an open file, default stderr)
+        """
+        if isinstance(file, (str, os.PathLike)):
+            with open(file, "w") as opened:
+                self.dump(opened)
+            return
+        file = sys.stderr if file is None else file
+        for record in self.buffer:
+            file.write(record.format() + "\n")
+
+
+# The simulation's tracer
+TRACER = Tracer()
+
+
+def configure(level=INFO, categories=CATEGORIES, echo=False, capacity=CAPACITY):
+    """
+    Configure the simulation's tracer (see Tracer.configure). Usable as a
+    process pool initializer
+    """
+    TRACER.configure(level, categories, echo, capacity)
@@ -0,0 +1,196 @@
+"""
+My module for running a mission's stepping in a worker thread
+The worker publishes a Snapshot after every primitive into a small bounded
+queue, dropping the oldest one when the queue is full, so the mission never
+slows down for drawing. The main thread drains the queue and only draws the
+latest snapshot with the frontend, staying responsive however long the
+search takes
+Example:
+    python myworker.py --seed 3 --fps 30
+"""
+
+import argparse
+import queue
+import threading
+import time
+from myconstants import *
+from myheadless import NullArtist
+from myscenario import Scenario
+from mysimulator import Simulator
+from mysnapshot import SnapshotRenderer
+
+
+# Snapshots waiting to be drawn, at most
+QUEUE_SIZE = 2
+
+
+class WorkerSimulator(Simulator):
+    """
+    Simulator that publishes a snapshot after every primitive instead of
+    drawing, and keeps its own pace with the real clock
+    """
+
+    def __init__(self, worker, start_pos, correct_barcode, **kwargs):
+        """
+        Initiate the simulator of a SimulationWorker (see Simulator for `kwargs`)
+        """
+        super().__init__(start_pos, correct_barcode, **kwargs)
+        self.worker = worker
+        # The main thread draws with the real frontend, the worker with none
+        self.artist = self.frontend
+        self.frontend = NullArtist(correct_barcode)
+
+    def tick(self, duration, force_render=False):
+        """
+        Advance the simulated clock after a primitive, publish the new state,
+        then wait until the real clock catches up with the simulated clock
+        """
+        self.sim_time += duration
+        self.worker.publish(self.snapshot())
+        if self.real_time_factor:
+            sim_time_in_wall = self.wall_start + self.sim_time / self.real_time_factor
+            delay = sim_time_in_wall - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+    def render_frame(self):
+        """
+        Only publish the last state
+        """
+        self.worker.publish(self.snapshot())
+
+
+class SimulationWorker:
+    """
+    Run a mission's search in a worker thread, and draw it in the main thread
+    """
+
+    def __init__(self, start_pos, correct_barcode, queue_size=QUEUE_SIZE, **kwargs):
+        """
+        Make the mission's simulator (see Simulator for `kwargs`), with a
+        queue of at most `queue_size` snapshots
+        """
+        self.simulator = WorkerSimulator(self, start_pos, correct_barcode, **kwargs)
+        self.snapshots = queue.Queue(queue_size)
+        # The boxes before any got picked up, to draw snapshots with
+        self.box_list = list(self.simulator.backend.box_list)
+        self.finished = threading.Event()
+        self.thread = None
+        self.error = None
+        # Frame counts: published by the worker, dropped by it because the
+        # queue was full, skipped by the main thread for a later one, drawn
+        self.num_published = 0
+        self.num_dropped = 0
+        self.num_skipped = 0
+        self.num_drawn = 0
+
+    @classmethod
+    def from_scenario(cls, scenario, **kwargs):
+        """
+        Make a worker for a scenario, with its start home and target
+        """
+        return cls(scenario.start_pos, scenario.target_barcode, scenario=scenario, **kwargs)
+
+    def publish(self, snapshot):
+        """
+        Called in the worker thread: put a snapshot in the queue, dropping
+        the oldest one if the queue is full. Never blocks
+        """
+        self.num_published += 1
+        while True:
+            try:
+                self.snapshots.put_nowait(snapshot)
+                return
+            except queue.Full:
+                try:
+                    self.snapshots.get_nowait()
+                    self.num_dropped += 1
+                except queue.Empty:
+                    pass
+
+    def start(self):
+        """
+        Start the whole search in the worker thread
+        """
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        """
+        Worker thread: search the entire area
+        """
+        try:
+            self.simulator.search_entire_area()
+        except Exception as error:  # Raised again in the main thread
+            self.error = error
+        finally:
+            self.finished.set()
+
+    def latest_snapshot(self):
+        """
+        Drain the queue, return its newest snapshot (None if it was empty)
+        """
+        latest = None
+        while True:
+            try:
+                snapshot = self.snapshots.get_nowait()
+            except queue.Empty:
+                return latest
+            if latest is not None:
+                self.num_skipped += 1
+            latest = snapshot
+
+    def render(self, fps=30):
+        """
+        Main thread: draw the latest snapshot at most `fps` times per second
+        until the search is over, letting the GUI process its events in
+        between. Raise any error of the worker
+        """
+        artist = self.simulator.artist
+        renderer = SnapshotRenderer(artist, self.box_list, self.simulator.backend.rock_list)
+        frame_time = 1 / fps
+        next_frame = time.perf_counter()
+        while True:
+            finished = self.finished.is_set()
+            snapshot = self.latest_snapshot()
+            if snapshot is not None:
+                renderer.render(snapshot)
+                self.num_drawn += 1
+            if finished and snapshot is None:
+                break
+            next_frame += frame_time
+            artist.pause(max(next_frame - time.perf_counter(), MIN_PAUSE))
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
+
+    def run_and_render(self, fps=30):
+        """
+        Start the search in the worker thread and draw it until it is over
+        """
+        self.start()
+        self.render(fps)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the scenario")
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--real-time-factor", type=float, default=REAL_TIME_FACTOR,
+                        help="robot seconds per real second (default "
+                             f"{REAL_TIME_FACTOR}, 0 = as fast as possible)")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE)
+    args = parser.parse_args()
+
+    worker = SimulationWorker.from_scenario(Scenario.generate(args.seed),
+                                            queue_size=args.queue_size,
+                                            real_time_factor=args.real_time_factor or None)
+    wall_start = time.perf_counter()
+    worker.run_and_render(args.fps)
+    game = worker.simulator
+    print(f"{'found' if not game.robot.storage_empty else 'not found'} in "
+          f"{game.sim_time:.1f} robot seconds, {time.perf_counter() - wall_start:.2f} "
+          f"real seconds")
+    print(f"Frames: {worker.num_published} published, {worker.num_dropped} dropped, "
+          f"{worker.num_skipped} skipped, {worker.num_drawn} drawn")
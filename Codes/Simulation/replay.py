@@ -0,0 +1,47 @@
+"""
+Replay program for recorded ENED missions
+Record a mission with Simulator(..., record="mission.log"), then:
+    python replay.py mission.log                  # play the whole mission
+    python replay.py mission.log --frame 1200     # show one frame
+    python replay.py mission.log --start 500 --end 900 --fps 60
+"""
+
+import argparse
+import matplotlib.pyplot as plt
+from myfrontend import InvisibleArtist
+from myrecorder import MissionReplay
+
+
+def play(replay, artist, start, end, fps):
+    """
+    Play frames `start` to `end`, redrawing the background only when a box
+    gets picked up
+    """
+    last_picked = None
+    for _, robot, picked in replay.frames(start, end):
+        if picked != last_picked:
+            artist.render_background(replay.box_list(picked), replay.rock_list())
+            last_picked = picked
+        artist.render_surface(robot)
+        artist.pause(1 / fps)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", help="mission log to replay")
+    parser.add_argument("--frame", type=int, help="only show this frame")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--end", type=int, default=None)
+    parser.add_argument("--fps", type=float, default=60)
+    args = parser.parse_args()
+
+    replay = MissionReplay(args.log)
+    print(f"{replay.num_frames} frames, start {replay.start_pos}, "
+          f"target {replay.target_barcode}")
+    artist = InvisibleArtist(replay.target_barcode, layout=replay.layout)
+    if args.frame is not None:
+        replay.render(artist, args.frame)
+    else:
+        play(replay, artist, args.start, args.end, args.fps)
+    plt.show()
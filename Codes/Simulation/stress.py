@@ -0,0 +1,153 @@
+"""
+Stress test of the search on large warehouses
+For each scale, a warehouse about that many times the competition field's
+area (see mylayout.scaled_layout) gets seeded headless missions looking for
+a barcode no box has, so that every shelf line gets scanned. Report how the
+setup (boxes, rocks, board, planner grids), the visiting order and the
+search scale in runtime, and the peak memory of the visiting order and of
+the rest of a mission
+Each scale is measured after a warm-up mission, with the route and order
+caches cleared, so that neither the first run's one-off costs nor cached
+routes count. The visiting order is timed with both of its strategies for
+many lines: the heuristic one (up to myroute.HEURISTIC_LIMIT lines) and
+nearest neighbour, along with the travel each order estimates
+Example:
+    python stress.py --scales 1 10 100 --seeds 2
+"""
+
+import argparse
+import time
+import tracemalloc
+import myplanner
+import myroute
+from mylayout import scaled_layout
+from myscenario import Scenario
+from mysimulator import Simulator
+
+
+# A barcode no box has
+NO_BARCODE = (1, 1, 1, 1)
+
+
+def clear_caches():
+    """
+    Forget the planned routes and visiting orders of earlier missions
+    """
+    myplanner.PLAN_CACHE.clear()
+    myroute.ORDER_CACHE.clear()
+
+
+def run_mission(layout, seed):
+    """
+    Run a seeded headless full sweep of `layout`
+    Return (setup seconds, search seconds, the game), the visiting order
+    being left out of both
+    """
+    scenario = Scenario.generate(seed, layout.homes[seed % len(layout.homes)], NO_BARCODE,
+                                 layout=layout)
+    start = time.perf_counter()
+    game = Simulator.from_scenario(scenario, headless=True, visit_order="optimized")
+    setup_done = time.perf_counter()
+    myroute.visiting_order(scenario.start_pos, layout=layout)
+    route_done = time.perf_counter()
+    game.search_entire_area()
+    return setup_done - start, time.perf_counter() - route_done, game
+
+
+def time_strategies(layout, home):
+    """
+    Time the visiting orders of all the scan lines of `layout` from `home`
+    with estimated travel costs
+    Return (seconds to estimate the costs, {strategy: (seconds, estimated
+    travel)}), without the heuristic strategy past HEURISTIC_LIMIT lines
+    """
+    lines = myroute.scan_lines(layout.shelves)
+    start = time.perf_counter()
+    start_costs, costs = myroute.travel_costs(lines, home, myroute.home_direction(home))
+    costs_time = time.perf_counter() - start
+    strategies = {"nearest": myroute.nearest_order}
+    if len(lines) <= myroute.HEURISTIC_LIMIT:
+        strategies["heuristic"] = myroute.heuristic_order
+    timings = {}
+    for name, strategy in strategies.items():
+        start = time.perf_counter()
+        _, travel = strategy(start_costs, costs)
+        timings[name] = (time.perf_counter() - start, travel)
+    return costs_time, timings
+
+
+def peak_memory(layout, seed):
+    """
+    Peak memory allocated by the visiting order made from scratch, and by a
+    mission whose visiting order is already made (its routes are planned
+    again), in MB
+    Return (order MB, mission MB)
+    """
+    clear_caches()
+    tracemalloc.start()
+    myroute.visiting_order(layout.homes[seed % len(layout.homes)], layout=layout)
+    _, order_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    myplanner.PLAN_CACHE.clear()
+    tracemalloc.start()
+    run_mission(layout, seed)
+    _, mission_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return order_peak / 2**20, mission_peak / 2**20
+
+
+def stress(scales, seeds):
+    """
+    Run the missions of each scale, and print a row of averages per scale
+    (a "-" for the heuristic strategy where it is skipped)
+    """
+    print(f"{'scale':>6}{'arena':>11}{'shelves':>9}{'boxes':>7}{'setup s':>9}"
+          f"{'costs s':>9}{'heur s':>9}{'heur in':>9}{'near s':>9}{'near in':>9}"
+          f"{'search s':>10}{'inches':>9}{'us/inch':>9}{'order MB':>10}{'peak MB':>9}")
+    for scale in scales:
+        layout = scaled_layout(scale)
+        # Warm-up
+        run_mission(layout, seeds[0])
+        setup = search = costs = 0.0
+        inches = 0
+        strategies = {}
+        for seed in seeds:
+            # Time the visiting order of every seed's home from scratch
+            clear_caches()
+            setup_time, search_time, game = run_mission(layout, seed)
+            setup += setup_time
+            search += search_time
+            inches += game.num_steps
+            home = layout.homes[seed % len(layout.homes)]
+            costs_time, timings = time_strategies(layout, home)
+            costs += costs_time
+            for name, (seconds, travel) in timings.items():
+                total = strategies.setdefault(name, [0.0, 0.0])
+                total[0] += seconds
+                total[1] += travel
+        num = len(seeds)
+        arena = f"{layout.arena[2]}x{layout.arena[3]}"
+        columns = ""
+        for name in ("heuristic", "nearest"):
+            if name in strategies:
+                seconds, travel = strategies[name]
+                columns += f"{seconds / num:>9.3f}{travel / num:>9.0f}"
+            else:
+                columns += f"{'-':>9}{'-':>9}"
+        order_memory, mission_memory = peak_memory(layout, seeds[0])
+        print(f"{scale:>6g}{arena:>11}{len(layout.shelves):>9}{layout.num_boxes:>7}"
+              f"{setup / num:>9.3f}{costs / num:>9.3f}{columns}{search / num:>10.3f}"
+              f"{inches / num:>9.0f}{1e6 * search / inches:>9.1f}"
+              f"{order_memory:>10.1f}{mission_memory:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100],
+                        help="warehouse areas, in competition fields (default 1 10 100)")
+    parser.add_argument("--seeds", type=int, default=2,
+                        help="seeded missions per scale (default 2)")
+    args = parser.parse_args()
+
+    stress(args.scales, list(range(args.seeds)))
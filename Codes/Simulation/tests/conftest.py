@@ -0,0 +1,11 @@
+"""
+Shared setup of the simulation tests: the modules are imported the way the
+programs import them, from the Simulation directory, and matplotlib draws
+offscreen
+"""
+
+import os
+import sys
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,52 @@
+"""
+Tests of the digital board: updating it incrementally, robot move by robot
+move and box by box, leaves the same board as rebuilding it from scratch
+"""
+
+import numpy as np
+import pytest
+from myfleet import Fleet
+from myscenario import Scenario
+from mysimulator import Simulator
+
+
+def assert_matches_rebuild(backend):
+    board, static_board = backend.board.copy(), backend.static_board.copy()
+    backend.rebuild_digital_board()
+    assert np.array_equal(static_board, backend.static_board)
+    assert np.array_equal(board, backend.board)
+
+
+@pytest.mark.parametrize("macro_steps", [True, False])
+@pytest.mark.parametrize("seed", range(40))
+def test_board_after_mission_matches_rebuild(seed, macro_steps):
+    # Every 5th mission looks for a barcode no box has, to pick no box
+    target = (1, 1, 1, 1) if seed % 5 == 0 else None
+    game = Simulator.from_scenario(Scenario.generate(seed, target_barcode=target),
+                                   headless=True)
+    game.macro_steps = macro_steps
+    game.search_entire_area()
+    assert_matches_rebuild(game.backend)
+
+
+def test_board_during_mission_matches_rebuild(monkeypatch):
+    game = Simulator.from_scenario(Scenario.generate(2), headless=True)
+    game.macro_steps = False
+    tick = Simulator.tick
+    num_ticks = [0]
+
+    def checked_tick(simulator, duration, force_render=False):
+        num_ticks[0] += 1
+        if num_ticks[0] % 25 == 0:
+            assert_matches_rebuild(simulator.backend)
+        tick(simulator, duration, force_render)
+    monkeypatch.setattr(Simulator, "tick", checked_tick)
+    game.search_entire_area()
+    assert num_ticks[0] > 100
+
+
+@pytest.mark.parametrize("seed", [59, 68])
+def test_fleet_board_matches_rebuild(seed):
+    fleet = Fleet.from_scenario(Scenario.generate(seed), 3)
+    fleet.run()
+    assert_matches_rebuild(fleet.backend)
@@ -0,0 +1,68 @@
+"""
+Tests of the box index: every lookup agrees with a scan of the box list
+"""
+
+import random
+import matplotlib.pyplot as plt
+import pytest
+from mybackend import Backend
+from mybox import Box, BoxIndex
+from myconstants import BARCODE
+from myfrontend import InvisibleArtist
+
+
+@pytest.fixture
+def boxes():
+    return Backend(BARCODE[0], seed=0).box_list
+
+
+def test_lookups_match_scans(boxes):
+    index = BoxIndex(boxes)
+    assert len(index) == len(boxes)
+    assert sorted(map(id, index)) == sorted(map(id, boxes))
+    for box in boxes:
+        assert index.at_bottomleft(box.bottomleft) is box
+    assert index.at_bottomleft((0, 0)) is None
+    for barcode in BARCODE:
+        assert {id(box) for box in index.with_barcode(barcode)} == \
+            {id(box) for box in boxes if box.barcode == barcode}
+    rng = random.Random(0)
+    for _ in range(500):
+        point = (rng.randrange(110), rng.randrange(110))
+        covering = [box for box in boxes
+                    if box.bottomleft[0] <= point[0] <= box.bottomleft[0] + Box.SIDE
+                    and box.bottomleft[1] <= point[1] <= box.bottomleft[1] + Box.SIDE]
+        found = index.box_at(point)
+        assert (found is None) == (not covering)
+        assert found is None or any(found is box for box in covering)
+
+
+def test_in_row_is_an_x_range(boxes):
+    index = BoxIndex(boxes)
+    y = boxes[0].bottomleft[1]
+    assert [box.bottomleft[0] for box in index.in_row(y, 20, 60)] == \
+        sorted(box.bottomleft[0] for box in boxes
+               if box.bottomleft[1] == y and 20 <= box.bottomleft[0] <= 60)
+
+
+def test_remove(boxes):
+    index = BoxIndex(boxes)
+    removed = boxes[::3]
+    for box in removed:
+        index.remove(box)
+    assert len(index) == len(boxes) - len(removed)
+    for box in removed:
+        assert index.at_bottomleft(box.bottomleft) is None
+        assert all(other is not box for other in index.with_barcode(box.barcode))
+
+
+def test_frontend_marks_targets(boxes):
+    artist = InvisibleArtist(BARCODE[0], blit=False)
+    try:
+        for drawn in (boxes, BoxIndex(boxes)):
+            artist.draw_many_boxes(drawn)
+            edges = artist.background.collections[-1].get_edgecolors()
+            red = sum(1 for color in edges if tuple(color[:3]) == (1.0, 0.0, 0.0))
+            assert red == sum(1 for box in boxes if box.barcode == BARCODE[0])
+    finally:
+        plt.close(artist.fig)
@@ -0,0 +1,51 @@
+"""
+Tests of the offline export of mission logs
+"""
+
+import os
+import pytest
+from export import export_frames
+from mylayout import generate_layout
+from myrecorder import MissionReplay
+from myscenario import Scenario
+from mysimulator import Simulator
+
+
+@pytest.fixture(scope="module")
+def log(tmp_path_factory):
+    path = tmp_path_factory.mktemp("export") / "mission.log"
+    Simulator.from_scenario(Scenario.generate(0), headless=True,
+                            record=path).search_entire_area()
+    return str(path)
+
+
+def test_exports_every_step_th_frame(log, tmp_path):
+    paths = export_frames(log, tmp_path, start=3, end=11, step=4, workers=2)
+    assert [os.path.basename(path) for path in paths] == \
+        ["frame_000003.png", "frame_000007.png", "frame_000011.png"]
+    assert all(os.path.getsize(path) for path in paths)
+
+
+def test_end_is_clamped_to_the_log(log, tmp_path):
+    replay = MissionReplay(log)
+    last = replay.num_frames
+    replay.close()
+    paths = export_frames(log, tmp_path, start=last, end=last + 100, workers=1)
+    assert [os.path.basename(path) for path in paths] == [f"frame_{last:06d}.png"]
+
+
+@pytest.mark.parametrize("start, end, step", [(5, 4, 1), (-1, 4, 1), (10**6, None, 1),
+                                              (0, 4, 0)])
+def test_empty_range_is_rejected(log, tmp_path, start, end, step):
+    with pytest.raises(ValueError):
+        export_frames(log, tmp_path / "out", start, end, step, workers=1)
+    assert not (tmp_path / "out").exists()
+
+
+def test_exports_logs_of_other_layouts(tmp_path):
+    path = tmp_path / "mission.log"
+    layout = generate_layout(shelf_columns=3, shelf_rows=2)
+    Simulator.from_scenario(Scenario.generate(1, layout.homes[0], layout=layout),
+                            headless=True, record=path).search_entire_area()
+    paths = export_frames(str(path), str(tmp_path / "frames"), end=4, workers=1)
+    assert len(paths) == 5
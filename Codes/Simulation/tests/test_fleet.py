@@ -0,0 +1,87 @@
+"""
+Tests of robot fleets: robots never drive through each other, nor get stuck
+behind each other, and take each other for no boxes
+"""
+
+import pytest
+import myfleet
+from myconstants import HOME
+from mybackend import slices_overlap
+from myfleet import Fleet
+from mylayout import generate_layout
+from myrobot import Robot
+from myscenario import Scenario
+from mysimulator import Simulator
+
+
+@pytest.fixture
+def overlaps(monkeypatch):
+    """
+    Count the pairs of robots found overlapping on the board, at every tick
+    """
+    count = [0]
+    tick = myfleet.FleetRobot.tick
+
+    def checked_tick(fleet_robot, duration, force_render=False):
+        areas = list(fleet_robot.backend.robot_areas.values())
+        count[0] += sum(slices_overlap(first, second)
+                        for number, first in enumerate(areas) for second in areas[number + 1:])
+        tick(fleet_robot, duration, force_render)
+    monkeypatch.setattr(myfleet.FleetRobot, "tick", checked_tick)
+    return count
+
+
+def run_fleet(scenario, num_robots):
+    fleet = Fleet.from_scenario(scenario, num_robots)
+    fleet.run()
+    return fleet
+
+
+# Seeds 59 and 68 have 2 robots meet head-on between quads
+@pytest.mark.parametrize("seed, num_robots", [(59, 2), (68, 2), (0, 3), (1, 3), (2, 4), (3, 4)])
+def test_robots_keep_apart(overlaps, seed, num_robots):
+    scenario = Scenario.generate(seed)
+    game = Simulator.from_scenario(scenario, headless=True)
+    game.search_entire_area()
+    fleet = run_fleet(scenario, num_robots)
+    assert overlaps[0] == 0
+    assert fleet.num_stuck == 0
+    assert (fleet.time_to_find is None) == (game.time_to_find is None)
+
+
+def test_robots_waiting_in_each_others_way(overlaps):
+    # 2 robots each wait for a band the other one stands in
+    layout = generate_layout(shelf_columns=2, shelf_rows=2)
+    fleet = run_fleet(Scenario.generate(12, layout.homes[0], layout=layout), 2)
+    assert overlaps[0] == 0
+    assert fleet.num_stuck == 0
+    assert fleet.time_to_find is not None
+
+
+def test_robots_are_no_boxes():
+    game = Simulator(HOME[0], (1, 1, 1, 1), headless=True, seed=0)
+    assert not game.ultrasonic_detection()
+    # Another robot right in the ultrasonic vision
+    other = game.backend.add_robot()
+    x, y = game.robot.ultrasonic[-1]
+    # Facing down, so that its head is on the vision's point
+    other.set_robot_start((x, y + Robot.HLENGTH))
+    game.backend.update_digital_board(other)
+    assert game.robot.ultrasonic_detection(game.backend.board)
+    assert not game.ultrasonic_detection()
+
+
+def test_crashed_robot_leaves_the_board(monkeypatch):
+    fleet = Fleet.from_scenario(Scenario.generate(0), 2)
+    crashed = fleet.robots[1]
+    run_mission = myfleet.FleetRobot.run_mission
+
+    def crashing_mission(fleet_robot):
+        if fleet_robot is crashed:
+            raise RuntimeError("crash")
+        run_mission(fleet_robot)
+    monkeypatch.setattr(myfleet.FleetRobot, "run_mission", crashing_mission)
+    with pytest.raises(RuntimeError):
+        fleet.run()
+    assert crashed.robot not in fleet.backend.robot_areas
+    assert fleet.robots[0].done
@@ -0,0 +1,44 @@
+"""
+Tests of the IPS: trilateration locates points exactly from exact ranges,
+and beacons that can't locate points are rejected
+"""
+
+import numpy as np
+import pytest
+from myconstants import HOME
+from myips import IPS, RangeNoise
+from mylayout import STANDARD_LAYOUT, generate_layout
+
+
+@pytest.mark.parametrize("beacons", [(HOME[0], HOME[2], HOME[3]), HOME,
+                                     ((0, 0), (10, 0), (3, 7))])
+def test_exact_ranges_locate_exactly(beacons):
+    ips = IPS(beacons)
+    errors, _, _ = ips.error_map()
+    assert errors.max() < 1e-9
+    rng = np.random.default_rng(0)
+    points = rng.uniform(-20, 130, (50, 2))
+    assert np.allclose(ips.locate(points), points)
+    for point, ranges in zip(points, ips.ranges(points)):
+        assert np.allclose(ips.solve_one(ranges.tolist()), point)
+
+
+def test_noise_moves_points():
+    ips = IPS(HOME)
+    errors, _, _ = ips.error_map(RangeNoise(sigma=0.5), trials=4, seed=0, step=8)
+    assert 0 < errors.mean() < 2
+
+
+@pytest.mark.parametrize("beacons", [((0, 0), (10, 0), (25, 0)),
+                                     ((6, -6), (54, 54), (102, 114), (30, 24)),
+                                     ((0, 0), (10, 10)),
+                                     ((0, 0), (0, 0), (10, 10))])
+def test_beacons_on_one_line_are_rejected(beacons):
+    with pytest.raises(ValueError):
+        IPS(beacons)
+
+
+def test_layouts_locate_with_their_homes():
+    for layout in (STANDARD_LAYOUT, generate_layout(shelf_columns=3, shelf_rows=4)):
+        point = np.array([layout.homes[1]], dtype=float)
+        assert np.allclose(layout.ips.locate(point), point)
@@ -0,0 +1,79 @@
+"""
+Tests of warehouse layouts: generated layouts are consistent, layouts the
+search can't work on are rejected, and robots leave each home for its exit
+"""
+
+import pytest
+from myconstants import HOME, HOME_EXIT, SHELVES
+from mylayout import Layout, STANDARD_LAYOUT, generate_layout, scaled_layout
+from mysimulator import Simulator
+
+
+def standard_parts(**changes):
+    """
+    The arguments of STANDARD_LAYOUT, with some of them changed
+    """
+    layout = STANDARD_LAYOUT
+    parts = {"arena": layout.arena, "shelves": layout.shelves, "homes": layout.homes,
+             "quads": layout.quads, "vert_hallways": layout.vert_hallways,
+             "hori_hallways": layout.hori_hallways}
+    parts.update(changes)
+    return parts
+
+
+def test_default_generated_layout_is_the_standard_field():
+    layout = generate_layout()
+    assert layout.arena == STANDARD_LAYOUT.arena
+    assert sorted(layout.shelves) == sorted(STANDARD_LAYOUT.shelves)
+    assert layout.homes == STANDARD_LAYOUT.homes
+    assert layout.num_boxes == STANDARD_LAYOUT.num_boxes
+
+
+@pytest.mark.parametrize("columns, rows", [(1, 2), (3, 4), (4, 7)])
+def test_generated_layouts(columns, rows):
+    layout = generate_layout(shelf_columns=columns, shelf_rows=rows)
+    assert len(layout.shelves) == columns * rows
+    assert len(layout.quads) == 2 * columns
+    # Every shelf is in exactly one quad, and the quads start off the shelves
+    assert sorted(shelf for quad in range(len(layout.quads))
+                  for shelf in layout.quad_shelves(quad)) == sorted(layout.shelves)
+    assert layout.num_boxes == 4 * len(layout.shelves)
+    assert layout.home_exits == [layout.quads[layout.nearest_quad(home)].start
+                                 for home in layout.homes]
+    assert Layout.from_dict(layout.to_dict()).to_dict() == layout.to_dict()
+
+
+@pytest.mark.parametrize("kwargs", [{"shelf_columns": 0}, {"shelf_rows": 1},
+                                    {"hallway_width": 6}, {"shelf_width": 8},
+                                    {"beacons": HOME[:3]},
+                                    {"beacons": [(6, -6), (102, -6), (6, 114), (500, 114)]}])
+def test_bad_generation_parameters(kwargs):
+    with pytest.raises(ValueError):
+        generate_layout(**kwargs)
+
+
+@pytest.mark.parametrize("changes", [
+    {"shelves": []},
+    {"shelves": SHELVES[:-1] + [(60, 84, 36, 10)]},
+    {"shelves": SHELVES[:-1] + [(80, 84, 36, 12)]},
+    {"homes": HOME[:3]},
+    {"quads": []},
+    {"quads": STANDARD_LAYOUT.quads[:3]},
+    {"quads": STANDARD_LAYOUT.quads + STANDARD_LAYOUT.quads[:1]},
+])
+def test_bad_layouts_are_rejected(changes):
+    with pytest.raises(ValueError):
+        Layout(**standard_parts(**changes))
+
+
+def test_home_exits():
+    assert STANDARD_LAYOUT.home_exits == HOME_EXIT
+    with pytest.raises(ValueError):
+        Layout(**standard_parts(), home_exits=HOME_EXIT[:3])
+    for layout in (STANDARD_LAYOUT, scaled_layout(4)):
+        for home, exit_point in zip(layout.homes, layout.home_exits):
+            game = Simulator(home, (1, 1, 1, 1), headless=True, seed=0, layout=layout)
+            direction = game.robot.direction
+            game.escape_home()
+            assert game.robot.center == exit_point
+            assert game.robot.direction == direction
@@ -0,0 +1,88 @@
+"""
+Tests of the headless macro-steps: jumping a whole segment at once ends in
+the same mission, log and clock as taking it one primitive at a time
+"""
+
+import pytest
+from myconstants import HOME, LEFT, RIGHT, DODGE_TIME
+from mybackend import NO_DETECTION
+from mylayout import generate_layout
+from myrobot import Robot
+from myscenario import Scenario
+from mysimulator import Simulator
+
+
+def run(scenario, path, macro_steps, **kwargs):
+    game = Simulator.from_scenario(scenario, headless=True, record=path, **kwargs)
+    game.macro_steps = macro_steps
+    game.search_entire_area()
+    with open(path, "rb") as file:
+        log = file.read()
+    return log, (game.robot.center, game.robot.head, game.num_steps, game.num_turns,
+                 game.num_boxes_scanned, game.num_rocks_circumvented, game.sim_time,
+                 [box.box_tuple for box in game.removed_boxes])
+
+
+@pytest.mark.parametrize("visit_order", ["optimized", "fixed"])
+@pytest.mark.parametrize("seed", range(8))
+def test_macro_steps_match_per_step(tmp_path, seed, visit_order):
+    # Every 5th mission looks for a barcode no box has, to scan every shelf
+    target = (1, 1, 1, 1) if seed % 5 == 0 else None
+    scenario = Scenario.generate(seed, HOME[seed % 4], target)
+    macro = run(scenario, tmp_path / "macro.log", True, visit_order=visit_order)
+    per_step = run(scenario, tmp_path / "step.log", False, visit_order=visit_order)
+    assert macro == per_step
+
+
+def test_macro_steps_match_on_generated_layout(tmp_path):
+    layout = generate_layout(shelf_columns=3, shelf_rows=4)
+    scenario = Scenario.generate(1, layout.homes[2], (1, 1, 1, 1), layout=layout)
+    assert run(scenario, tmp_path / "macro.log", True) == \
+        run(scenario, tmp_path / "step.log", False)
+
+
+@pytest.mark.parametrize("side, backward", [(RIGHT, False), (LEFT, True)])
+def test_strafe_clock_is_the_per_step_sum(side, backward):
+    games = []
+    for macro_steps in (True, False):
+        game = Simulator(HOME[0], (1, 1, 1, 1), headless=True, seed=0)
+        game.macro_steps = macro_steps
+        game.robot_forward(20)
+        game.robot_strafe(side, 3, 5, backward, pause=DODGE_TIME)
+        games.append(game)
+    macro, per_step = games
+    assert macro.sim_time == per_step.sim_time
+    assert (macro.robot.center, macro.robot.head, macro.num_steps, macro.num_turns) == \
+        (per_step.robot.center, per_step.robot.head, per_step.num_steps, per_step.num_turns)
+
+
+def test_endless_detection_is_rejected(monkeypatch):
+    game = Simulator(HOME[0], (1, 1, 1, 1), headless=True, seed=0)
+    monkeypatch.setattr(Robot, "ultrasonic_detection", lambda robot, board: True)
+    monkeypatch.setattr(game.backend, "ultrasonic_range",
+                        lambda direction, clear=False: NO_DETECTION)
+    with pytest.raises(RuntimeError):
+        game.robot_strafe_while_detected(RIGHT)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_circumventing_rocks_matches_per_step(tmp_path, seed):
+    scenario = Scenario.generate(seed)
+    (x_rock, y_rock), size = scenario.rocks[0]
+    results = []
+    for macro_steps in (True, False):
+        game = Simulator.from_scenario(scenario, headless=True,
+                                       record=tmp_path / f"{macro_steps}.log")
+        game.macro_steps = macro_steps
+        # Head up to the rock, then drive straight on past it
+        robot = game.robot
+        robot.center = (x_rock + size // 2, y_rock - 8)
+        robot.head = (x_rock + size // 2, y_rock - 8 + Robot.HLENGTH)
+        game.backend.update_digital_board(robot)
+        game.robot_goto_y(y_rock + size + 8)
+        game.recorder.close()
+        assert game.num_rocks_circumvented == 1
+        with open(tmp_path / f"{macro_steps}.log", "rb") as file:
+            results.append((file.read(), robot.center, robot.head, game.num_steps,
+                            game.num_turns, game.sim_time))
+    assert results[0] == results[1]
@@ -0,0 +1,44 @@
+"""
+Tests of the Monte Carlo runner's episodes
+"""
+
+import signal
+import pytest
+import montecarlo
+from mysimulator import Simulator
+
+
+def test_episode_outcome():
+    result = montecarlo.run_episode(3)
+    assert result["seed"] == 3
+    assert result["outcome"] in ("found", "missed", "no_target")
+
+
+@pytest.mark.skipif(not hasattr(signal, "setitimer"), reason="no SIGALRM timer")
+def test_hung_episode_times_out(monkeypatch):
+    def hang(self):
+        while True:
+            pass
+    monkeypatch.setattr(Simulator, "search_entire_area", hang)
+    result = montecarlo.run_episode(3, timeout=0.2)
+    assert result["outcome"] == "timeout"
+    # The timer is off once the episode is over
+    assert signal.getitimer(signal.ITIMER_REAL) == (0.0, 0.0)
+
+
+@pytest.mark.skipif(not hasattr(signal, "setitimer"), reason="no SIGALRM timer")
+def test_failure_trace_dumped_with_timer_off(monkeypatch, tmp_path):
+    def crash(self):
+        raise RuntimeError("crash")
+    timers = []
+    monkeypatch.setattr(Simulator, "search_entire_area", crash)
+    monkeypatch.setattr(montecarlo.TRACER, "dump",
+                        lambda file: timers.append(signal.getitimer(signal.ITIMER_REAL)))
+    monkeypatch.chdir(tmp_path)
+    montecarlo.configure()
+    try:
+        result = montecarlo.run_episode(3, timeout=30)
+    finally:
+        montecarlo.TRACER.disable()
+    assert result["outcome"] == "error:RuntimeError"
+    assert timers == [(0.0, 0.0)]
@@ -0,0 +1,122 @@
+"""
+Tests of the A* planner: its routes are obstacle-free, end at the goal and
+are as cheap as Dijkstra's search finds, on a grid kept up to date
+"""
+
+import random
+from heapq import heappush, heappop
+import pytest
+from mybackend import Backend
+from myconstants import BARCODE, DISPLACEMENT, HOME
+from myplanner import DIRECTIONS, Planner, STEP_COST, TURN_COST
+from myrecorder import STEP_FORWARD, TURN_RIGHT, TURN_LEFT
+from myrobot import Robot
+
+
+def free_poses(planner):
+    num_x, num_y = planner.shape
+    return [((x, y - DISPLACEMENT), direction)
+            for x in range(num_x) for y in range(num_y) for direction in DIRECTIONS
+            if planner.is_free((x, y - DISPLACEMENT), direction)]
+
+
+def dijkstra_cost(planner, start, start_direction, goal, goal_direction):
+    """
+    Cheapest cost of steps and turns from a pose to the goal, by Dijkstra's
+    search
+    """
+    start_pose = (start, DIRECTIONS.index(start_direction))
+    done = set()
+    frontier = [(0, start_pose)]
+    while frontier:
+        cost, (point, d) = heappop(frontier)
+        if (point, d) in done:
+            continue
+        done.add((point, d))
+        if point == goal and (goal_direction is None or DIRECTIONS[d] == goal_direction):
+            return cost
+        dx, dy = DIRECTIONS[d]
+        for pose, move_cost in ((((point[0] + dx, point[1] + dy), d), STEP_COST),
+                                ((point, (d + 1) % 4), TURN_COST),
+                                ((point, (d - 1) % 4), TURN_COST)):
+            if pose not in done and planner.is_free(pose[0], DIRECTIONS[pose[1]]):
+                heappush(frontier, (cost + move_cost, pose))
+    return None
+
+
+def drive(planner, route, start, start_direction):
+    """
+    Drive a route with a probe robot, checking every pose on the way is free
+    Return the final pose and the route's cost
+    """
+    robot = Robot()
+    robot.center = start
+    robot.head = (start[0] + 3 * start_direction[0], start[1] + 3 * start_direction[1])
+    cost = 0
+    for opcode, count in route:
+        for _ in range(count):
+            if opcode == STEP_FORWARD:
+                robot.step_forward()
+                cost += STEP_COST
+            elif opcode == TURN_RIGHT:
+                robot.turn_right_90()
+                cost += TURN_COST
+            else:
+                assert opcode == TURN_LEFT
+                robot.turn_left_90()
+                cost += TURN_COST
+            assert planner.is_free(robot.center, robot.direction)
+    return robot.center, robot.direction, cost
+
+
+@pytest.fixture(scope="module")
+def planner():
+    return Planner(Backend(BARCODE[0], seed=0))
+
+
+def test_routes_are_shortest(planner):
+    poses = free_poses(planner)
+    rng = random.Random(0)
+    for _ in range(25):
+        start, start_direction = rng.choice(poses)
+        goal, goal_direction = rng.choice(poses)
+        goal_direction = rng.choice([goal_direction, None])
+        route = planner.search(start, start_direction, goal, goal_direction)
+        expected = dijkstra_cost(planner, start, start_direction, goal, goal_direction)
+        if expected is None:
+            assert route is None
+            continue
+        center, direction, cost = drive(planner, route, start, start_direction)
+        assert center == goal
+        assert goal_direction is None or direction == goal_direction
+        assert cost == expected
+
+
+def test_unreachable_goals(planner):
+    # Inside a shelf
+    assert planner.plan(HOME[0], (0, 1), (20, 20)) is None
+    assert planner.plan((20, 20), (0, 1), HOME[0]) is None
+
+
+def test_routes_are_cached(planner):
+    first = planner.plan(HOME[0], (0, 1), HOME[3])
+    assert planner.plan(HOME[0], (0, 1), HOME[3]) is first
+
+
+def test_grid_follows_the_board():
+    backend = Backend(BARCODE[0], seed=1)
+    planner = Planner(backend)
+    key = planner.grid_key
+    # Boxes are inside the shelves, so picking one up leaves the grid as is
+    backend.remove_box(backend.box_list[0].bottomleft)
+    planner.plan(HOME[0], (0, 1), HOME[3])
+    assert planner.static_version == backend.static_version
+    assert planner.grid_key == key
+    # A rock taken off the field frees its cells for the next plan
+    rock = backend.rock_list.pop()
+    backend.rebuild_digital_board()
+    planner.plan(HOME[0], (0, 1), HOME[3])
+    assert planner.grid_key != key
+    assert planner.free == Planner(backend).free
+    x, y = rock.bottomleft
+    assert planner.is_free((x + rock.size // 2, y + rock.size // 2), (0, 1))
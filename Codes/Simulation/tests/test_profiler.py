@@ -0,0 +1,60 @@
+"""
+Tests of the mission profiler: it only touches the simulator it profiles,
+and its entries add up to the mission
+"""
+
+import json
+import pytest
+from myprofiler import PROFILED_PRIMITIVES, PROFILED_SEQUENCES, PROFILED_SPLITS
+from myscenario import Scenario
+from mysimulator import Simulator
+
+
+def run_mission(seed, profile):
+    game = Simulator.from_scenario(Scenario.generate(seed), headless=True, profile=profile)
+    game.search_entire_area()
+    return game
+
+
+def check_entry(entry):
+    """
+    Check an entry's children add up to no more than the entry itself
+    """
+    children = entry["children"]
+    assert sum(child["inches"] for child in children) <= entry["inches"]
+    assert sum(child["turns"] for child in children) <= entry["turns"]
+    assert entry["self"] >= -1e-9
+    for child in children:
+        check_entry(child)
+
+
+def test_unprofiled_simulator_is_untouched():
+    profiled = run_mission(0, True)
+    game = run_mission(0, False)
+    assert game.profiler is None
+    for name in PROFILED_SEQUENCES + PROFILED_PRIMITIVES:
+        assert name not in vars(game)
+    for owner_name, method_name, _ in PROFILED_SPLITS:
+        assert method_name not in vars(getattr(game, owner_name))
+    # Profiling changes nothing to the mission
+    assert (game.num_steps, game.num_turns, game.sim_time) == \
+        (profiled.num_steps, profiled.num_turns, profiled.sim_time)
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_entries_add_up_to_the_mission(seed):
+    game = run_mission(seed, True)
+    profile = game.profiler.to_dict()
+    (mission,) = profile["children"]
+    assert mission["name"] == "search_entire_area"
+    assert (mission["inches"], mission["turns"]) == (game.num_steps, game.num_turns)
+    assert (profile["inches"], profile["turns"]) == (game.num_steps, game.num_turns)
+    check_entry(mission)
+
+
+def test_dump_writes_the_profile(tmp_path):
+    game = run_mission(4, True)
+    path = tmp_path / "profile.json"
+    game.profiler.dump(path)
+    with open(path) as file:
+        assert json.load(file) == game.profiler.to_dict()
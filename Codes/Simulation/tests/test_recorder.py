@@ -0,0 +1,99 @@
+"""
+Tests of the binary mission log: what a mission records replays into the
+same mission
+"""
+
+import pytest
+from myconstants import HOME
+from mylayout import STANDARD_LAYOUT, generate_layout
+from myrecorder import MissionReplay, NO_BOX, PICK
+from myscenario import Scenario
+from mysimulator import Simulator
+
+
+def record_mission(path, seed, layout=STANDARD_LAYOUT, **kwargs):
+    game = Simulator.from_scenario(Scenario.generate(seed, layout=layout), headless=True,
+                                   record=path, **kwargs)
+    game.search_entire_area()
+    return game
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2, 3, 7])
+def test_round_trip(tmp_path, seed):
+    path = tmp_path / "mission.log"
+    game = record_mission(path, seed)
+    replay = MissionReplay(path)
+    try:
+        assert replay.start_pos == Scenario.generate(seed).start_pos
+        assert replay.num_frames == game.num_steps + game.num_turns + len(game.removed_boxes)
+        robot, picked, _ = replay.seek(replay.num_frames)
+        assert (robot.center, robot.head) == (game.robot.center, game.robot.head)
+        assert robot.storage_empty == game.robot.storage_empty
+        picked_tuples = [replay.box_layout[index][0] for index in picked]
+        assert picked_tuples == [box.box_tuple for box in game.removed_boxes]
+        remaining = sorted(box.box_tuple for box in replay.box_list(picked))
+        assert remaining == sorted(box.box_tuple for box in game.backend.box_list)
+    finally:
+        replay.close()
+
+
+def test_seek_matches_frames(tmp_path):
+    path = tmp_path / "mission.log"
+    record_mission(path, 5)
+    replay = MissionReplay(path)
+    try:
+        for frame, robot, picked in replay.frames():
+            sought, sought_picked, _ = replay.seek(frame)
+            assert (sought.center, sought.head, sought.storage_empty, sought_picked) == \
+                (robot.center, robot.head, robot.storage_empty, picked)
+    finally:
+        replay.close()
+
+
+def test_pick_without_box_replays(tmp_path):
+    path = tmp_path / "mission.log"
+    game = Simulator(HOME[0], (1, 1, 1, 1), headless=True, record=path, seed=0)
+    # Nothing to pick at home, but the robot still counts as loaded
+    game.robot_pick_box()
+    game.recorder.close()
+    replay = MissionReplay(path)
+    try:
+        events = [(opcode, payload) for opcode, payload, _ in replay.events()]
+        assert events == [(PICK, NO_BOX)]
+        robot, picked, _ = replay.seek(replay.num_frames)
+        assert not robot.storage_empty
+        assert picked == ()
+    finally:
+        replay.close()
+
+
+def test_log_closed_when_mission_fails(tmp_path, monkeypatch):
+    path = tmp_path / "mission.log"
+    game = Simulator.from_scenario(Scenario.generate(0), headless=True, record=path)
+
+    def fail(*args):
+        game.robot_forward(3)
+        raise RuntimeError("lost")
+    monkeypatch.setattr(game, "search_lines", fail)
+    monkeypatch.setattr(game, "search_fixed_order", fail)
+    with pytest.raises(RuntimeError):
+        game.search_entire_area()
+    assert game.recorder.file.closed
+    replay = MissionReplay(path)
+    try:
+        assert replay.num_frames == 3
+    finally:
+        replay.close()
+
+
+def test_layout_round_trip(tmp_path):
+    path = tmp_path / "mission.log"
+    layout = generate_layout(shelf_columns=3, shelf_rows=2)
+    game = record_mission(path, 4, layout)
+    replay = MissionReplay(path)
+    try:
+        assert replay.layout.to_dict() == layout.to_dict()
+        robot, _, _ = replay.seek(replay.num_frames)
+        assert (robot.center, robot.head) == (game.robot.center, game.robot.head)
+    finally:
+        replay.close()
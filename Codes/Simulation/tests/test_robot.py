@@ -0,0 +1,61 @@
+"""
+Tests of the robot's geometry: the per-direction offset tables give the same
+body, sensors and storage as walking around the body from the head
+"""
+
+import random
+import pytest
+from myconstants import UP, DOWN, LEFT, RIGHT, HLENGTH
+from myrobot import Robot
+
+GEOMETRY = ("_direction", "_rectangle_coor", "_bottomleft", "_ultrasonic",
+            "_colorsensor", "_storage", "_color_beam")
+
+
+def geometry(robot):
+    return [getattr(robot, name) for name in GEOMETRY]
+
+
+@pytest.mark.parametrize("direction", [UP, DOWN, LEFT, RIGHT])
+def test_offset_tables_match_derivation(direction):
+    rng = random.Random(0)
+    for _ in range(50):
+        robot = Robot()
+        robot.center = (rng.randint(0, 108), rng.randint(-6, 114))
+        robot.head = (robot.center[0] + HLENGTH * direction[0],
+                      robot.center[1] + HLENGTH * direction[1])
+        robot.compute_geometry()
+        from_tables = geometry(robot)
+        robot.derive_geometry()
+        assert from_tables == geometry(robot)
+
+
+def test_moves_keep_geometry_up_to_date():
+    robot = Robot()
+    robot.set_robot_start((6, -6))
+    rng = random.Random(1)
+    moves = (Robot.step_forward, Robot.step_backward, Robot.turn_right_90,
+             Robot.turn_left_90, lambda robot: robot.move_forward(5))
+    for _ in range(200):
+        rng.choice(moves)(robot)
+        cached = (robot.direction, robot.rectangle_coor, robot.bottomleft, robot.ultrasonic,
+                  robot.colorsensor, robot.storage)
+        robot.derive_geometry()
+        assert cached == (robot.direction, robot.rectangle_coor, robot.bottomleft,
+                          robot.ultrasonic, robot.colorsensor, robot.storage)
+
+
+def test_setting_the_pose_invalidates_geometry():
+    robot = Robot()
+    robot.center = (20, 20)
+    robot.head = (20, 20 + HLENGTH)
+    assert robot.direction == UP
+    bottomleft = robot.bottomleft
+    robot.head = (20 + HLENGTH, 20)
+    assert robot.direction == RIGHT
+    assert robot.bottomleft != bottomleft
+    robot.center = (30, 20)
+    robot.head = (30 + HLENGTH, 20)
+    cached = robot.bottomleft
+    robot.derive_geometry()
+    assert cached == robot.bottomleft
@@ -0,0 +1,73 @@
+"""
+Tests of the visiting orders: Held-Karp is optimal, the heuristics give
+valid orders no better than it, and every shelf line is visited once
+"""
+
+import itertools
+import numpy as np
+import pytest
+import myroute
+from myconstants import HOME
+from mylayout import STANDARD_LAYOUT, generate_layout
+from mysimulator import Simulator
+
+
+def random_costs(num, seed, symmetric=False):
+    rng = np.random.default_rng(seed)
+    start_costs = rng.integers(1, 100, num).astype(float)
+    costs = rng.integers(1, 100, (num, num)).astype(float)
+    if symmetric:
+        costs = np.minimum(costs, costs.T)
+    np.fill_diagonal(costs, np.inf)
+    return start_costs, costs
+
+
+def brute_force(start_costs, costs):
+    return min(myroute.order_cost(list(order), start_costs, costs)
+               for order in itertools.permutations(range(len(start_costs))))
+
+
+@pytest.mark.parametrize("num", range(1, 8))
+@pytest.mark.parametrize("seed", range(5))
+def test_held_karp_is_optimal(num, seed):
+    start_costs, costs = random_costs(num, seed, symmetric=seed % 2)
+    order, total = myroute.exact_order(start_costs, costs)
+    assert sorted(order) == list(range(num))
+    assert total == myroute.order_cost(order, start_costs, costs)
+    assert total == brute_force(start_costs, costs)
+
+
+def test_held_karp_avoids_unreachable_legs():
+    start_costs, costs = random_costs(5, 0)
+    costs[0, :] = np.inf
+    costs[0, 1] = 1
+    order, total = myroute.exact_order(start_costs, costs)
+    assert np.isfinite(total)
+    assert order.index(0) == len(order) - 1 or order[order.index(0) + 1] == 1
+
+
+@pytest.mark.parametrize("strategy", [myroute.heuristic_order, myroute.nearest_order])
+@pytest.mark.parametrize("seed", range(5))
+def test_heuristics_are_valid_orders(strategy, seed):
+    start_costs, costs = random_costs(9, seed)
+    order, total = strategy(start_costs, costs)
+    assert sorted(order) == list(range(9))
+    assert total == myroute.order_cost(order, start_costs, costs)
+    assert total >= myroute.exact_order(start_costs, costs)[1]
+
+
+@pytest.mark.parametrize("layout", [STANDARD_LAYOUT, generate_layout(3, 6)],
+                         ids=["standard", "generated"])
+def test_every_line_visited_once(layout):
+    lines = myroute.visiting_order(layout.homes[0], layout=layout)
+    assert sorted((line.entry, line.direction) for line in lines) == \
+        sorted((line.entry, line.direction) for line in myroute.scan_lines(layout.shelves))
+
+
+def test_fixed_order_is_the_default():
+    assert Simulator(HOME[0], (1, 1, 1, 1), headless=True, seed=0).visit_order == "fixed"
+
+
+@pytest.mark.parametrize("home", HOME)
+def test_optimized_full_sweep_is_no_longer(home):
+    assert myroute.sweep_cost(home, "optimized", 0) <= myroute.sweep_cost(home, "fixed", 0)
@@ -0,0 +1,80 @@
+"""
+Tests of scenarios: a saved, loaded or packed scenario sets up the same game
+"""
+
+import numpy as np
+import pytest
+from mybackend import Backend
+from mylayout import STANDARD_LAYOUT, generate_layout
+from myscenario import Scenario, save_corpus, load_corpus
+from mysimulator import Simulator
+
+
+def same_scenario(first, second):
+    return (first.to_dict() == second.to_dict()
+            and first.layout.to_dict() == second.layout.to_dict())
+
+
+def run(scenario):
+    game = Simulator.from_scenario(scenario, headless=True)
+    game.search_entire_area()
+    return (game.robot.center, game.robot.head, game.num_steps, game.num_turns,
+            game.sim_time, [box.box_tuple for box in game.removed_boxes])
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_generate_matches_seeded_backend(seed):
+    scenario = Scenario.generate(seed)
+    backend = Backend(scenario.target_barcode, seed)
+    assert [(box.box_tuple, box.barcode) for box in backend.box_list] == \
+        [(box_tuple, barcode) for box_tuple, barcode, _ in scenario.boxes]
+    assert [(rock.bottomleft, rock.size) for rock in backend.rock_list] == scenario.rocks
+
+
+@pytest.mark.parametrize("seed", [0, 4, 9])
+def test_save_load_equivalence(tmp_path, seed):
+    scenario = Scenario.generate(seed)
+    path = tmp_path / "scenario.json"
+    scenario.save(path)
+    loaded = Scenario.load(path)
+    assert same_scenario(scenario, loaded)
+    assert loaded.layout is STANDARD_LAYOUT
+    assert run(loaded) == run(scenario)
+
+
+def test_loaded_board_is_identical(tmp_path):
+    scenario = Scenario.generate(3)
+    path = tmp_path / "scenario.json"
+    scenario.save(path)
+    original = Backend(scenario.target_barcode, scenario=scenario)
+    loaded = Backend(scenario.target_barcode, scenario=Scenario.load(path))
+    assert np.array_equal(original.board, loaded.board)
+
+
+def test_generated_layout_round_trip(tmp_path):
+    layout = generate_layout(shelf_columns=3, shelf_rows=4)
+    scenario = Scenario.generate(5, layout.homes[1], (1, 1, 1, 1), layout=layout)
+    path = tmp_path / "scenario.json"
+    scenario.save(path)
+    loaded = Scenario.load(path)
+    assert same_scenario(scenario, loaded)
+    assert run(loaded) == run(scenario)
+
+
+def test_corpus_round_trip(tmp_path):
+    scenarios = [Scenario.generate(seed) for seed in range(8)]
+    scenarios.append(Scenario(scenarios[0].boxes, scenarios[0].rocks,
+                              scenarios[0].start_pos, scenarios[0].target_barcode))
+    path = tmp_path / "corpus.bin"
+    save_corpus(path, scenarios)
+    loaded = load_corpus(path)
+    assert len(loaded) == len(scenarios)
+    for scenario, unpacked in zip(scenarios, loaded):
+        assert same_scenario(scenario, unpacked)
+    assert loaded[-1].seed is None
+
+
+def test_only_standard_scenarios_pack():
+    layout = generate_layout(shelf_columns=1, shelf_rows=2)
+    with pytest.raises(ValueError):
+        Scenario.generate(0, layout=layout).pack()
@@ -0,0 +1,68 @@
+"""
+Tests of the tracer: what gets recorded, how much of it is kept, and dumps
+"""
+
+import io
+import pytest
+from mytrace import (DEBUG, INFO, WARNING, MOVEMENT, DETECTION, SCANNING, NAVIGATION,
+                     TRACER, Tracer)
+from myscenario import Scenario
+from mysimulator import Simulator
+
+
+@pytest.fixture
+def tracer():
+    tracer = Tracer()
+    tracer.configure(level=DEBUG)
+    return tracer
+
+
+def test_off_by_default():
+    tracer = Tracer()
+    assert not tracer.enabled
+    assert not any(getattr(tracer, category)
+                   for category in (MOVEMENT, DETECTION, SCANNING, NAVIGATION))
+
+
+def test_disabled_categories_record_nothing():
+    TRACER.configure(level=DEBUG, categories=(SCANNING,))
+    TRACER.clear()
+    try:
+        Simulator.from_scenario(Scenario.generate(0), headless=True).search_entire_area()
+        records = TRACER.records()
+    finally:
+        TRACER.disable()
+        TRACER.clear()
+    assert records
+    assert {record.category for record in records} == {SCANNING}
+
+
+def test_level_filter(tracer):
+    tracer.configure(level=INFO)
+    tracer.trace(MOVEMENT, DEBUG, "hidden")
+    tracer.trace(MOVEMENT, INFO, "shown {x}", x=1)
+    tracer.trace(MOVEMENT, WARNING, "shown too")
+    assert [record.text() for record in tracer.records()] == ["shown 1", "shown too"]
+
+
+def test_ring_buffer_keeps_the_latest(tracer):
+    tracer.configure(level=DEBUG, capacity=3)
+    for number in range(10):
+        tracer.trace(NAVIGATION, INFO, "{number}", number=number)
+    assert [record.text() for record in tracer.records()] == ["7", "8", "9"]
+    assert [record.number for record in tracer.records()] == [7, 8, 9]
+
+
+def test_dump_to_path_and_file(tracer, tmp_path):
+    tracer.trace(DETECTION, INFO, "{x},{y} detected", x=3, y=4)
+    tracer.trace(SCANNING, WARNING, "bit {bit}", bit=1)
+    opened = io.StringIO()
+    tracer.dump(opened)
+    path = tmp_path / "trace.log"
+    tracer.dump(path)
+    tracer.dump(str(tmp_path / "other.log"))
+    lines = opened.getvalue().splitlines()
+    assert path.read_text() == (tmp_path / "other.log").read_text() == opened.getvalue()
+    assert len(lines) == 2
+    assert lines[0].endswith("3,4 detected")
+    assert "WARNING" in lines[1] and lines[1].endswith("bit 1")
@@ -0,0 +1,51 @@
+"""
+Tests of the simulation worker: publishing never blocks the mission, the
+main thread only draws the latest snapshot, and errors reach the main thread
+"""
+
+import pytest
+from myscenario import Scenario
+from myworker import SimulationWorker
+
+
+def make_worker(seed=0, **kwargs):
+    return SimulationWorker.from_scenario(Scenario.generate(seed), headless=True,
+                                          real_time_factor=None, **kwargs)
+
+
+def test_full_queue_drops_the_oldest():
+    worker = make_worker(queue_size=2)
+    for number in range(5):
+        worker.publish(number)
+    assert worker.num_published == 5
+    assert worker.num_dropped == 3
+    assert worker.latest_snapshot() == 4
+
+
+def test_latest_snapshot_skips_older_ones():
+    worker = make_worker(queue_size=3)
+    assert worker.latest_snapshot() is None
+    for number in range(3):
+        worker.publish(number)
+    assert worker.latest_snapshot() == 2
+    assert worker.num_skipped == 2
+    assert worker.latest_snapshot() is None
+
+
+def test_every_snapshot_is_drawn_dropped_or_skipped():
+    worker = make_worker(3)
+    worker.run_and_render(fps=1000)
+    assert worker.num_drawn > 0
+    assert worker.num_published == worker.num_drawn + worker.num_dropped + worker.num_skipped
+    assert worker.snapshots.empty()
+
+
+def test_worker_error_raised_in_main_thread(monkeypatch):
+    worker = make_worker()
+
+    def crash():
+        raise RuntimeError("crash")
+    monkeypatch.setattr(worker.simulator, "search_entire_area", crash)
+    with pytest.raises(RuntimeError, match="crash"):
+        worker.run_and_render(fps=1000)
+    assert not worker.thread.is_alive()